@@ -0,0 +1,81 @@
+"""Compare decoding Epic's freeGamesPromotions response with json, orjson and msgspec.
+
+Run it from the root of the repository:
+
+    python -m benchmarks.bench_epic_decode
+"""
+
+from __future__ import annotations
+
+import json
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from discord_free_game_notifier import fast_json
+from discord_free_game_notifier.epic_schema import FreeGamesPromotions
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "epic-api-2023-05-29.json"
+
+# The recorded response only has two games, a normal week has about a dozen.
+ELEMENTS = 12
+REPEAT = 5
+NUMBER = 200
+
+
+def payload() -> bytes:
+    """Make a response with as many games as a normal week.
+
+    Returns:
+        bytes: The JSON.
+    """
+    epic_api: dict = json.loads(FIXTURE.read_bytes())
+    elements: list[dict] = epic_api["data"]["Catalog"]["searchStore"]["elements"]
+    elements[:] = [{**elements[i % len(elements)], "id": str(i)} for i in range(ELEMENTS)]
+    return json.dumps(epic_api).encode()
+
+
+def peak_memory(decoder: Callable[[bytes], Any], content: bytes) -> int:
+    """Measure the most memory used while decoding and holding the result.
+
+    Args:
+        decoder: The decoder.
+        content: The JSON.
+
+    Returns:
+        int: The peak in bytes.
+    """
+    tracemalloc.start()
+    result: Any = decoder(content)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main() -> None:
+    """Time every decoder and measure its memory."""
+    content: bytes = payload()
+    decoders: dict[str, Callable[[bytes], Any]] = {"json (response.json())": json.loads}
+    if fast_json.orjson is not None:
+        decoders["orjson"] = fast_json.orjson.loads
+    if fast_json.msgspec is not None:
+        decoders["msgspec, pruned"] = lambda content: fast_json.msgspec.json.decode(content, type=FreeGamesPromotions)
+
+    logger.info(f"{len(content)} bytes, {ELEMENTS} games")
+    baseline: float | None = None
+    for name, decoder in decoders.items():
+        elapsed: float = min(timeit.repeat(lambda decoder=decoder: decoder(content), repeat=REPEAT, number=NUMBER)) / NUMBER * 1000
+        baseline = baseline or elapsed
+        peak: int = peak_memory(decoder, content)
+        logger.info(f"{name}: {elapsed:.3f} ms ({baseline / elapsed:.1f}x), peak memory {peak / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare parsing the store pages the old way with the strainers in html_parser.
+
+Run it from the root of the repository:
+
+    python -m benchmarks.bench_html_parser
+"""
+
+from __future__ import annotations
+
+import timeit
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from discord_free_game_notifier import html_parser
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from bs4 import SoupStrainer
+
+FIXTURES = Path(__file__).parent.parent / "tests"
+REPEAT = 5
+NUMBER = 20
+
+
+def gog_front_page_before(text: str) -> None:
+    """Parse the whole front page, and the giveaway a second time like gog.py used to.
+
+    Args:
+        text: The HTML.
+    """
+    soup = BeautifulSoup(text, "html.parser")
+    BeautifulSoup(str(soup.find("giveaway")), "html.parser").find("img", alt=True)
+
+
+def gog_store_page_before(text: str) -> None:
+    """Parse the whole store page.
+
+    Args:
+        text: The HTML.
+    """
+    BeautifulSoup(text, "html.parser").find("div", {"selenium-id": "paginatedProductsGrid"})
+
+
+def steam_search_page_before(text: str) -> None:
+    """Parse the whole search page.
+
+    Args:
+        text: The HTML.
+    """
+    BeautifulSoup(text, "html.parser").find_all("a", class_="search_result_row")
+
+
+def strained(only: SoupStrainer, parser: str) -> Callable[[str], None]:
+    """Parse only what the strainer matches.
+
+    Args:
+        only: The strainer.
+        parser: The parser BeautifulSoup uses.
+
+    Returns:
+        Callable[[str], None]: The benchmark.
+    """
+
+    def run(text: str) -> None:
+        BeautifulSoup(text, parser, parse_only=only)
+
+    return run
+
+
+def best_time(function: Callable[[str], None], text: str) -> float:
+    """Time a benchmark.
+
+    Args:
+        function: The benchmark.
+        text: The HTML.
+
+    Returns:
+        float: The fastest milliseconds per parse.
+    """
+    return min(timeit.repeat(lambda: function(text), repeat=REPEAT, number=NUMBER)) / NUMBER * 1000
+
+
+def main() -> None:
+    """Time every page with every way of parsing it."""
+    pages: list[tuple[str, Callable[[str], None], SoupStrainer]] = [
+        ("gog-front-page.html", gog_front_page_before, html_parser.GOG_GIVEAWAY),
+        ("gog-store-page.html", gog_store_page_before, html_parser.GOG_PRODUCTS_GRID),
+        ("steam-search-page.html", steam_search_page_before, html_parser.STEAM_SEARCH_RESULT_ROW),
+    ]
+    parsers: list[str] = ["html.parser"] if html_parser.PARSER == "html.parser" else ["html.parser", html_parser.PARSER]
+
+    for name, before, only in pages:
+        text: str = (FIXTURES / name).read_text(encoding="utf-8")
+        baseline: float = best_time(before, text)
+        logger.info(f"{name}: full tree with html.parser {baseline:.2f} ms")
+        for parser in parsers:
+            elapsed: float = best_time(strained(only, parser), text)
+            logger.info(f"{name}: strained with {parser} {elapsed:.2f} ms ({baseline / elapsed:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Circuit breaker for each source, so a store that is down doesn't slow down every cycle.
+
+After a few failures in a row the breaker opens and the source is skipped for a while.
+When the cool-down is over the source is tried once more (half-open). If that works the
+breaker closes, if not it opens again with twice the cool-down.
+
+The state is saved to a JSON file so a restart doesn't start hammering a broken store.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from discord_free_game_notifier import settings
+
+# How many failures in a row open the breaker.
+FAILURE_THRESHOLD = 3
+
+# How long an open breaker skips the source, doubled every time the probe fails.
+BASE_COOLDOWN = 5 * 60
+MAX_COOLDOWN = 6 * 60 * 60
+
+# How much the latest check counts in the average latency.
+LATENCY_WEIGHT = 0.3
+
+
+@dataclass(slots=True)
+class BreakerState:
+    """The failures and latency of one source."""
+
+    failures: int = 0
+    opened_at: float = 0.0
+    cooldown: float = 0.0
+    latency: float = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Check if the breaker has been opened.
+
+        Returns:
+            bool: True if the source is skipped until the cool-down is over.
+        """
+        return self.opened_at > 0
+
+    def retry_at(self) -> float:
+        """Get when the source is tried again.
+
+        Returns:
+            float: The Unix time the cool-down is over, 0 if the breaker is closed.
+        """
+        return self.opened_at + self.cooldown if self.is_open else 0.0
+
+
+class CircuitBreakers:
+    """The breaker of every source, saved to a JSON file."""
+
+    def __init__(self, path: Path) -> None:
+        """Create the breakers. The file is read the first time it is needed.
+
+        Args:
+            path: The JSON file the breakers are saved in.
+        """
+        self.path: Path = Path(path)
+        self.lock = threading.Lock()
+        self.states: dict[str, BreakerState] | None = None
+
+    def load(self) -> dict[str, BreakerState]:
+        """Read the breakers from the file, once.
+
+        Returns:
+            dict[str, BreakerState]: The breaker of each source.
+        """
+        if self.states is None:
+            self.states = {}
+            if self.path.is_file():
+                try:
+                    saved: dict[str, dict[str, float]] = json.loads(self.path.read_text(encoding="utf-8"))
+                    self.states = {name: BreakerState(**state) for name, state in saved.items()}
+                except (ValueError, TypeError):
+                    logger.warning(f"Could not read {self.path}, all breakers are closed")
+        return self.states
+
+    def save(self) -> None:
+        """Write the breakers to the file. The lock must be held."""
+        temporary_file: Path = self.path.with_suffix(".tmp")
+        temporary_file.write_text(json.dumps({name: asdict(state) for name, state in self.load().items()}, indent=4), encoding="utf-8")
+        temporary_file.replace(self.path)
+
+    def state(self, name: str) -> BreakerState:
+        """Get the breaker of a source.
+
+        Args:
+            name: The name of the source.
+
+        Returns:
+            BreakerState: The breaker, closed if we haven't seen the source before.
+        """
+        with self.lock:
+            return self.load().setdefault(name, BreakerState())
+
+    def allow(self, name: str, now: float | None = None) -> bool:
+        """Check if a source should be checked now.
+
+        Args:
+            name: The name of the source.
+            now: The Unix time, defaults to now.
+
+        Returns:
+            bool: False while the breaker is open, True when it is closed or the cool-down is over.
+        """
+        now = time.time() if now is None else now
+        state: BreakerState = self.state(name)
+        if not state.is_open:
+            return True
+
+        if now < state.retry_at():
+            logger.bind(game_name=name).info(f"Circuit open, skipping for {state.retry_at() - now:.0f} seconds")
+            return False
+
+        logger.bind(game_name=name).info("Circuit half-open, trying once more")
+        return True
+
+    def record_success(self, name: str, latency: float) -> None:
+        """Close the breaker after a source has been checked without errors.
+
+        Args:
+            name: The name of the source.
+            latency: How many seconds the check took.
+        """
+        with self.lock:
+            state: BreakerState = self.load().setdefault(name, BreakerState())
+            if state.is_open:
+                logger.bind(game_name=name).info("Circuit closed, the source works again")
+
+            state.failures = 0
+            state.opened_at = 0.0
+            state.cooldown = 0.0
+            state.latency = latency if not state.latency else state.latency + LATENCY_WEIGHT * (latency - state.latency)
+            self.save()
+
+    def record_failure(self, name: str, latency: float, now: float | None = None) -> None:
+        """Count a failed check, and open the breaker if the source keeps failing.
+
+        Args:
+            name: The name of the source.
+            latency: How many seconds the check took before it failed.
+            now: The Unix time, defaults to now.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            state: BreakerState = self.load().setdefault(name, BreakerState())
+            state.failures += 1
+            state.latency = latency if not state.latency else state.latency + LATENCY_WEIGHT * (latency - state.latency)
+
+            if state.is_open:
+                # The half-open probe failed.
+                state.cooldown = min(state.cooldown * 2, MAX_COOLDOWN)
+                state.opened_at = now
+            elif state.failures >= FAILURE_THRESHOLD:
+                state.cooldown = BASE_COOLDOWN
+                state.opened_at = now
+
+            if state.is_open:
+                logger.bind(game_name=name).warning(f"Circuit open after {state.failures} failures, waiting {state.cooldown:.0f} seconds")
+            self.save()
+
+
+breakers = CircuitBreakers(Path(settings.app_dir) / "breakers.json")
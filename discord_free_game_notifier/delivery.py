@@ -0,0 +1,384 @@
+"""Queue that sends messages to Discord webhooks from a pool of background threads.
+
+Discord tells us how many requests are left for each webhook with the X-RateLimit-*
+headers. Instead of sleeping through a 429 in the scheduler thread, the workers keep
+track of every webhook's bucket and schedule each message for when it can be sent.
+
+Different webhooks are sent to at the same time, but each webhook only has one
+request in flight, so its messages arrive in order.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import requests
+from loguru import logger
+
+from discord_free_game_notifier import http_client, settings
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+HTTP_BAD_REQUEST = 400
+HTTP_TOO_MANY_REQUESTS = 429
+HTTP_INTERNAL_SERVER_ERROR = 500
+
+# How many times we try to send a message that fails with a network error or is rate limited.
+MAX_ATTEMPTS = 5
+
+
+def is_permanent(response: requests.Response) -> bool:
+    """Check if Discord will never accept the message, e.g. a 400 for a bad embed or a 404 for a deleted webhook.
+
+    Args:
+        response: The response from Discord.
+
+    Returns:
+        bool: True for every 4xx error except 429 Too Many Requests.
+    """
+    return HTTP_BAD_REQUEST <= response.status_code < HTTP_INTERNAL_SERVER_ERROR and response.status_code != HTTP_TOO_MANY_REQUESTS
+
+
+@dataclass(order=True, slots=True)
+class Delivery:
+    """A message waiting to be sent to a webhook."""
+
+    not_before: float
+    sequence: int
+    url: str = field(compare=False)
+    payload: dict[str, Any] = field(compare=False)
+    game_service: str = field(default="", compare=False)
+    enqueued_at: float = field(default=0.0, compare=False)
+    attempts: int = field(default=0, compare=False)
+    outbox_ids: list[int] = field(default_factory=list, compare=False)
+
+
+@dataclass(slots=True)
+class Bucket:
+    """The rate limit of one webhook, from the last response Discord sent."""
+
+    remaining: int | None = None
+    reset_at: float = 0.0
+    name: str = ""
+
+    def ready_at(self, now: float) -> float:
+        """Get when the next request can be sent.
+
+        Args:
+            now: The current time.monotonic().
+
+        Returns:
+            float: The time.monotonic() when we can send, `now` if we can send right away.
+        """
+        if self.remaining == 0 and self.reset_at > now:
+            return self.reset_at
+        return now
+
+
+@dataclass(frozen=True, slots=True)
+class QueueStats:
+    """How the delivery queue is doing."""
+
+    depth: int
+    sent: int
+    oldest_wait: float
+    average_wait: float
+    webhooks: int
+
+
+class DeliveryQueue:
+    """Messages for Discord, sent by a worker thread as the rate limits allow."""
+
+    def __init__(
+        self,
+        send: Callable[..., requests.Response] | None = None,
+        on_failure: Callable[[Delivery, requests.Response | None], None] | None = None,
+        on_success: Callable[[Delivery, requests.Response], None] | None = None,
+        on_rejected: Callable[[Delivery, requests.Response], None] | None = None,
+        max_workers: int = settings.delivery_workers,
+    ) -> None:
+        """Create the queue. The workers are started when the first message is added.
+
+        Args:
+            send: Posts a message, defaults to http_client.post.
+            on_failure: Called when a message could not be sent and can be tried again later.
+            on_success: Called when Discord has accepted a message.
+            on_rejected: Called when Discord will never accept a message, defaults to on_failure.
+            max_workers: How many messages are sent at the same time.
+        """
+        self.send: Callable[..., requests.Response] = send or http_client.post
+        self.on_failure: Callable[[Delivery, requests.Response | None], None] | None = on_failure
+        self.on_success: Callable[[Delivery, requests.Response], None] | None = on_success
+        self.on_rejected: Callable[[Delivery, requests.Response], None] | None = on_rejected or on_failure
+        self.condition = threading.Condition()
+        self.heap: list[Delivery] = []
+        self.sequence = itertools.count()
+        self.buckets: dict[str, Bucket] = {}
+        self.global_ready_at: float = 0.0
+        self.in_flight: int = 0
+        self.busy: set[str] = set()
+        self.sent: int = 0
+        self.sent_per_webhook: dict[str, int] = {}
+        self.total_wait: float = 0.0
+        self.max_workers: int = max(max_workers, 1)
+        self.workers: list[threading.Thread] = []
+
+    def put(self, url: str, payload: dict[str, Any], game_service: str = "", outbox_ids: list[int] | None = None) -> Delivery:
+        """Add a message to the queue.
+
+        Args:
+            url: The webhook URL.
+            payload: The message, e.g. {"embeds": [...]}.
+            game_service: The name of the game service (Steam/GOG/Epic), used for logging.
+            outbox_ids: The outbox rows of the games in the message.
+
+        Returns:
+            Delivery: The queued message.
+        """
+        now: float = time.monotonic()
+        delivery = Delivery(
+            not_before=now,
+            sequence=next(self.sequence),
+            url=url,
+            payload=payload,
+            game_service=game_service,
+            enqueued_at=now,
+            outbox_ids=outbox_ids or [],
+        )
+        with self.condition:
+            heapq.heappush(self.heap, delivery)
+            self.condition.notify_all()
+
+        self.start()
+        return delivery
+
+    def start(self) -> None:
+        """Start the worker threads that aren't running."""
+        with self.condition:
+            self.workers = [worker for worker in self.workers if worker.is_alive()]
+            while len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self.run, name=f"delivery-{len(self.workers)}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every message has been sent.
+
+        Args:
+            timeout: The most seconds to wait, None to wait forever.
+
+        Returns:
+            bool: True if the queue is empty.
+        """
+        deadline: float | None = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.heap or self.in_flight:
+                remaining: float | None = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stats(self) -> QueueStats:
+        """Get the queue depth and how long messages have been waiting.
+
+        Returns:
+            QueueStats: The current stats.
+        """
+        now: float = time.monotonic()
+        with self.condition:
+            oldest: float = min((delivery.enqueued_at for delivery in self.heap), default=now)
+            return QueueStats(
+                depth=len(self.heap),
+                sent=self.sent,
+                oldest_wait=now - oldest,
+                average_wait=self.total_wait / self.sent if self.sent else 0.0,
+                webhooks=len(self.sent_per_webhook),
+            )
+
+    def ready_at(self, url: str, now: float) -> float:
+        """Get when the next message for a webhook can be sent.
+
+        Args:
+            url: The webhook URL.
+            now: The current time.monotonic().
+
+        Returns:
+            float: The time.monotonic() when we can send.
+        """
+        bucket: Bucket = self.buckets.get(url, Bucket())
+        return max(bucket.ready_at(now), self.global_ready_at)
+
+    def next_delivery(self) -> Delivery:
+        """Wait for the next message that can be sent and take it from the queue.
+
+        Messages for a webhook that is rate limited are moved back until the bucket resets,
+        and messages for a webhook that another worker is sending to are skipped, so they
+        don't hold up messages for other webhooks.
+
+        Returns:
+            Delivery: The message to send.
+        """
+        with self.condition:
+            while True:
+                now: float = time.monotonic()
+                delivery: Delivery | None = None
+                wait_until: float | None = None
+                skipped: list[Delivery] = []
+
+                while self.heap:
+                    candidate: Delivery = heapq.heappop(self.heap)
+                    if candidate.url in self.busy:
+                        skipped.append(candidate)
+                        continue
+
+                    ready_at: float = max(candidate.not_before, self.ready_at(candidate.url, now))
+                    if ready_at <= now:
+                        delivery = candidate
+                        break
+
+                    if ready_at > candidate.not_before:
+                        # Keep the sequence so messages for the same webhook stay in order.
+                        candidate.not_before = ready_at
+                        heapq.heappush(self.heap, candidate)
+                        continue
+
+                    heapq.heappush(self.heap, candidate)
+                    wait_until = ready_at
+                    break
+
+                for candidate in skipped:
+                    heapq.heappush(self.heap, candidate)
+
+                if delivery is not None:
+                    self.busy.add(delivery.url)
+                    self.in_flight += 1
+                    return delivery
+
+                # A worker that finishes a message wakes us up with notify_all().
+                self.condition.wait(None if wait_until is None else wait_until - now)
+
+    def update_bucket(self, url: str, response: requests.Response) -> None:
+        """Update the rate limit of a webhook from Discord's response headers.
+
+        Args:
+            url: The webhook URL.
+            response: The response from Discord.
+        """
+        now: float = time.monotonic()
+        headers = response.headers
+        with self.condition:
+            bucket: Bucket = self.buckets.setdefault(url, Bucket())
+            if (remaining := headers.get("X-RateLimit-Remaining")) is not None:
+                bucket.remaining = int(remaining)
+            if (reset_after := headers.get("X-RateLimit-Reset-After")) is not None:
+                bucket.reset_at = now + float(reset_after)
+            bucket.name = headers.get("X-RateLimit-Bucket", bucket.name)
+
+            if response.status_code == HTTP_TOO_MANY_REQUESTS:
+                retry_after: float = float(headers.get("Retry-After", 1))
+                with contextlib.suppress(ValueError):
+                    retry_after = float(response.json().get("retry_after", retry_after))
+
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, now + retry_after)
+                if headers.get("X-RateLimit-Global"):
+                    self.global_ready_at = now + retry_after
+                logger.warning(f"Webhook rate limited, sending again in {retry_after:.2f} seconds")
+
+    def requeue(self, delivery: Delivery, delay: float) -> None:
+        """Put a message back in the queue.
+
+        Args:
+            delivery: The message.
+            delay: How many seconds to wait before sending it again.
+        """
+        delivery.not_before = time.monotonic() + delay
+        with self.condition:
+            heapq.heappush(self.heap, delivery)
+            self.condition.notify_all()
+
+    def deliver(self, delivery: Delivery) -> None:
+        """Send one message and handle the response.
+
+        Args:
+            delivery: The message to send.
+        """
+        delivery.attempts += 1
+        try:
+            response: requests.Response = self.send(delivery.url, json=delivery.payload, params={"wait": "true"})
+        except requests.RequestException as e:
+            if delivery.attempts < MAX_ATTEMPTS:
+                logger.warning(f"Could not send message for {delivery.game_service}, retrying: {e}")
+                self.requeue(delivery, 2**delivery.attempts)
+            else:
+                logger.error(f"Giving up on message for {delivery.game_service}: {e}")
+                if self.on_failure:
+                    self.on_failure(delivery, None)
+            return
+
+        self.update_bucket(delivery.url, response)
+        if response.status_code == HTTP_TOO_MANY_REQUESTS:
+            if delivery.attempts < MAX_ATTEMPTS:
+                self.requeue(delivery, 0)
+                return
+            logger.error(f"Giving up on message for {delivery.game_service}, rate limited {delivery.attempts} times")
+
+        with self.condition:
+            self.sent += 1
+            self.sent_per_webhook[delivery.url] = self.sent_per_webhook.get(delivery.url, 0) + 1
+            self.total_wait += time.monotonic() - delivery.enqueued_at
+
+        self.finish(delivery, response)
+
+    def finish(self, delivery: Delivery, response: requests.Response) -> None:
+        """Call the callback for how Discord answered a message.
+
+        Args:
+            delivery: The message that was sent.
+            response: The response from Discord.
+        """
+        if response.ok:
+            if self.on_success:
+                self.on_success(delivery, response)
+        elif is_permanent(response):
+            if self.on_rejected:
+                self.on_rejected(delivery, response)
+        elif self.on_failure:
+            self.on_failure(delivery, response)
+
+    def hand_back(self, delivery: Delivery) -> None:
+        """Report a message that crashed a worker as failed, so its games aren't stuck as taken in the outbox.
+
+        Args:
+            delivery: The message that was being sent.
+        """
+        if not self.on_failure:
+            return
+
+        try:
+            self.on_failure(delivery, None)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"Could not hand back the message for {delivery.game_service}")
+
+    def run(self) -> None:
+        """Send messages until the process exits. Each worker thread runs this."""
+        while True:
+            delivery: Delivery = self.next_delivery()
+            try:
+                self.deliver(delivery)
+            except Exception:  # noqa: BLE001
+                logger.exception(f"Error when sending message for {delivery.game_service}")
+                self.hand_back(delivery)
+            finally:
+                with self.condition:
+                    self.busy.discard(delivery.url)
+                    self.in_flight -= 1
+                    self.condition.notify_all()
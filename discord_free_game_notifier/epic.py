@@ -1,282 +1,422 @@
 from __future__ import annotations
 
 import calendar
+import contextvars
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime
-from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from enum import Enum
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import pytz
-import requests
 from discord_webhook import DiscordEmbed
 from loguru import logger
-from requests.adapters import HTTPAdapter, Retry
 from requests.utils import requote_uri
 
-from discord_free_game_notifier import settings
-from discord_free_game_notifier.utils import already_posted
+from discord_free_game_notifier import fast_json, http_client, settings
+from discord_free_game_notifier.epic_schema import FreeGamesPromotions
+from discord_free_game_notifier.models import OFFER_TYPE_BUNDLE, OFFER_TYPE_DLC, OFFER_TYPE_GAME, FreeGame
 from discord_free_game_notifier.webhook import send_embed_webhook
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Callable, Generator
 
+    import requests
 
-def promotion_start(game: dict) -> int:
-    """Get the start date of a game's promotion.
+T = TypeVar("T")
 
-    offer["startDate"] = "2022-04-07T15:00:00.000Z"
+EPIC_API_URL = "https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions"
 
-    Args:
-        game: The game JSON.
+# Epic's offerType, as the offer types the subscription filters use. The rest, e.g. OTHERS, are unknown.
+EPIC_OFFER_TYPES: dict[str, str] = {
+    "BASE_GAME": OFFER_TYPE_GAME,
+    "EDITION": OFFER_TYPE_GAME,
+    "DLC": OFFER_TYPE_DLC,
+    "ADD_ON": OFFER_TYPE_DLC,
+    "BUNDLE": OFFER_TYPE_BUNDLE,
+}
 
-    Returns:
-        int: Returns the start date of the game's promotion.
-    """
-    start_date = 0
-    if game["promotions"]:
-        for promotion in game["promotions"]["promotionalOffers"]:
-            for offer in promotion["promotionalOffers"]:
-                if not offer["startDate"]:
-                    logger.bind(game_name=game["title"]).error("Start date is empty")
-                    return 0
-
-                start_date: int = calendar.timegm(
-                    time.strptime(offer["startDate"], "%Y-%m-%dT%H:%M:%S.%fZ"),
-                )
-    logger.bind(game_name=game["title"]).info(f"Starts in: {int(start_date)}")
-    return int(start_date)
+# Sellers Epic uses when there isn't a real one.
+EPIC_PLACEHOLDER_SELLERS: set[str] = {"Epic Dev Test Account", "Unknown"}
 
 
-def promotion_end(game: dict) -> int:
-    """Get the end date of a game's promotion.
+class EpicOffer(Enum):
+    """What kind of offer an element from Epic's API is."""
 
-    offer["endDate"] = "2022-04-07T15:00:00.000Z"
+    FREE_NOW = "free now"
+    VAULTED_FREE = "vaulted free"
+    UPCOMING = "upcoming"
+    NOT_FREE = "not free"
 
-    Args:
-        game: The game JSON.
 
-    Returns:
-        int: Returns the end date of the game's promotion.
-    """
-    end_date = 0
-    if game["promotions"]:
-        for promotion in game["promotions"]["promotionalOffers"]:
-            for offer in promotion["promotionalOffers"]:
-                if not offer["endDate"]:
-                    logger.bind(game_name=game["title"]).error("End date is empty")
-                    return 0
-
-                end_date: float = time.mktime(
-                    time.strptime(offer["endDate"], "%Y-%m-%dT%H:%M:%S.%fZ"),
-                )
+# When an offer is different in two countries, we keep the one that is free soonest.
+OFFER_RANK: dict[EpicOffer, int] = {
+    EpicOffer.FREE_NOW: 0,
+    EpicOffer.VAULTED_FREE: 0,
+    EpicOffer.UPCOMING: 1,
+    EpicOffer.NOT_FREE: 2,
+}
+
 
-    logger.bind(game_name=game["title"]).info(f"Ends in: {int(end_date)}")
-    return int(end_date)
+@dataclass(frozen=True, slots=True)
+class EpicGame:
+    """The parts of an element from Epic's API that we use, read in one pass.
 
+    Dates are Unix times, 0 when there isn't one.
+    """
 
-def game_image(game: dict) -> str:
-    """Get an image URL for the game.
+    offer_id: str
+    title: str
+    description: str
+    url: str
+    image: str
+    seller: str
+    original_price: int
+    discount: int
+    start: int = 0
+    end: int = 0
+    upcoming_start: int = 0
+    upcoming_end: int = 0
+    has_promotion: bool = False
+    vaulted: bool = False
+    offer_type: str = ""
+
+    # The countries in settings.epic_countries where the offer is free, set when the countries are merged.
+    regions: tuple[str, ...] = ()
+
+    @property
+    def final_price(self) -> int:
+        """Get the price after the discount.
+
+        Returns:
+            int: The price in cents.
+        """
+        return self.original_price - self.discount
+
+    @property
+    def free(self) -> bool:
+        """Check if a game that normally costs money is discounted to nothing.
+
+        Returns:
+            bool: True if the game is free right now.
+        """
+        return self.final_price == 0 and self.original_price != 0 and self.discount != 0
+
+
+def parse_date(date: str | None) -> int:
+    """Parse a date from Epic's API.
 
     Args:
-        game: The free game to get the image of.
+        date: The date, e.g. "2022-04-07T15:00:00.000Z".
 
     Returns:
-        str: Returns the image URL of the game.
+        int: The Unix time, 0 if the date is empty.
     """
-    image_url: str = ""
-    for image in game["keyImages"]:
-        if image["type"] in {"DieselStoreFrontWide", "Thumbnail"}:
-            image_url = image["url"]
-            logger.bind(game_name=game["title"]).debug(
-                f"Found image URL: {image_url} (type: {image['type']})",
-            )
+    return calendar.timegm(time.strptime(date, "%Y-%m-%dT%H:%M:%S.%fZ")) if date else 0
 
-    # This fixes https://github.com/TheLovinator1/discord-free-game-notifier/issues/70
-    if not image_url:
-        for image in game["keyImages"]:
-            if image["type"] == "OfferImageWide":
-                image_url = image["url"]
-                logger.bind(game_name=game["title"]).debug(
-                    f"Found image URL: {image_url} (type: {image['type']})",
-                )
-
-    logger.bind(game_name=game["title"]).info(f"Image URL: {requote_uri(image_url)}")
-    return requote_uri(image_url)
 
-
-def game_url(game: dict) -> str:
-    """If you click the game name, you'll be taken to the game's page on Epic.
+def parse_game(game: dict) -> EpicGame:  # noqa: C901, PLR0912
+    """Read an element from Epic's API.
 
     Args:
-        game: The game JSON
+        game: The game JSON.
 
     Returns:
-        str: Returns the URL of the game.
+        EpicGame: The game.
     """
-    url = "https://store.epicgames.com/"
+    promotions: dict | None = game["promotions"]
+
+    # The last current offer wins.
+    start: int = 0
+    end: int = 0
+    for promotion in promotions["promotionalOffers"] if promotions else []:
+        for offer in promotion["promotionalOffers"]:
+            start, end = parse_date(offer["startDate"]), parse_date(offer["endDate"])
+
+    # Epic announces next week's free games with a discountPercentage of 0.
+    upcoming_start: int = 0
+    upcoming_end: int = 0
+    for promotion in promotions["upcomingPromotionalOffers"] if promotions else []:
+        for offer in promotion["promotionalOffers"]:
+            if not upcoming_start and offer["startDate"] and offer["discountSetting"]["discountPercentage"] == 0:
+                upcoming_start, upcoming_end = parse_date(offer["startDate"]), parse_date(offer["endDate"])
+
+    # This fixes https://github.com/TheLovinator1/discord-free-game-notifier/issues/70
+    image: str = ""
+    wide_image: str = ""
+    vault_opened: bool = False
+    for key_image in game["keyImages"]:
+        if key_image["type"] in {"DieselStoreFrontWide", "Thumbnail"}:
+            image = key_image["url"]
+        elif key_image["type"] == "OfferImageWide":
+            wide_image = key_image["url"]
+        elif key_image["type"] == "VaultOpened":
+            vault_opened = True
+
+    url: str = "https://store.epicgames.com/"
     if product_slug := game["productSlug"]:
-        url: str = f"https://www.epicgames.com/en-US/p/{product_slug}"
+        url = f"https://www.epicgames.com/en-US/p/{product_slug}"
     else:
-        logger.bind(game_name=game["title"]).debug("Product slug is empty")
-        for offer in game["offerMappings"]:
+        for offer in game["offerMappings"] or []:
             if offer["pageSlug"]:
-                page_slug: str = offer["pageSlug"]
-                url = f"https://www.epicgames.com/en-US/p/{page_slug}"
-                logger.bind(game_name=game["title"]).debug("Found page slug")
+                url = f"https://www.epicgames.com/en-US/p/{offer['pageSlug']}"
 
-    logger.bind(game_name=game["title"]).info(f"URL: {requote_uri(url)}")
-    return requote_uri(url)
+    # Jotun had /home appended to the URL and that broke the link
+    # Broken: https://www.epicgames.com/en-US/p/jotun/home
+    # Fixed: https://www.epicgames.com/en-US/p/jotun
+    url = url.removesuffix("/home")
+
+    vaulted_category: bool = any(category["path"] == "freegames/vaulted" for category in game["categories"])
+
+    epic_game = EpicGame(
+        offer_id=game["id"],
+        title=game["title"],
+        description=game["description"] or "No description found",
+        url=requote_uri(url),
+        image=requote_uri(image or wide_image),
+        seller=game["seller"]["name"] if game["seller"] else "Unknown",
+        original_price=game["price"]["totalPrice"]["originalPrice"],
+        discount=game["price"]["totalPrice"]["discount"],
+        start=start,
+        end=end,
+        upcoming_start=upcoming_start,
+        upcoming_end=upcoming_end,
+        has_promotion=bool(promotions),
+        vaulted=vault_opened or (vaulted_category and game["status"] == "ACTIVE"),
+        offer_type=EPIC_OFFER_TYPES.get(game.get("offerType", ""), ""),
+    )
+    logger.bind(game_name=epic_game.title).debug(f"Parsed: {epic_game}")
+    return epic_game
 
 
-def check_promotion(game: dict) -> bool:
+def check_promotion(game: EpicGame) -> bool:
     """Check if the game has a promotion, only free games has these.
 
     Args:
-        game: The game JSON
+        game: The game.
 
     Returns:
         bool: True if game has promotion
     """
-    if not game["promotions"]:
-        game_name: str = game["title"]
-        logger.bind(game_name=game["title"]).info(
-            f"No promotions found for {game_name}, skipping",
-        )
+    if not game.has_promotion:
+        logger.bind(game_name=game.title).info(f"No promotions found for {game.title}, skipping")
         return False
     return True
 
 
-def get_response() -> requests.Response:
+def epic_url(country: str) -> str:
+    """Get the URL of the free games in a country.
+
+    Every country has its own URL, so each one has its own validators in the HTTP cache.
+
+    Args:
+        country: The country code, e.g. "US".
+
+    Returns:
+        str: The URL.
+    """
+    return f"{EPIC_API_URL}?locale=en-US&country={country}&allowCountries={country}"
+
+
+def get_response(country: str = "US") -> requests.Response | None:
     """Get the response from Epic.
 
+    Args:
+        country: The country code, e.g. "US".
+
+    Returns:
+        Response: The response from Epic, or None if nothing has changed since last time.
+    """
+    return http_client.get_if_modified(epic_url(country), timeout=10)
+
+
+def for_each_country(function: Callable[[str], T], countries: list[str]) -> list[T]:
+    """Call a function for every country at the same time.
+
+    The requests share the connection pool in http_client. Each thread gets a copy of
+    the caller's context, so the requests still stop at the source's deadline.
+
+    Args:
+        function: The function, e.g. get_response.
+        countries: The country codes.
+
+    Returns:
+        list[T]: What the function returned, in the same order as the countries.
+    """
+    if not countries:
+        return []
+
+    contexts: list[contextvars.Context] = [contextvars.copy_context() for _ in countries]
+    with ThreadPoolExecutor(max_workers=len(countries), thread_name_prefix="epic") as executor:
+        return list(executor.map(lambda context, country: context.run(function, country), contexts, countries))
+
+
+def download(country: str) -> requests.Response:
+    """Get the response from Epic, even if it hasn't changed since last time.
+
+    Args:
+        country: The country code, e.g. "US".
+
     Returns:
         Response: The response from Epic.
     """
-    session = requests.Session()
-    session.mount(
-        "https://",
-        HTTPAdapter(
-            max_retries=Retry(
-                total=5,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-            ),
-        ),
-    )
-    response: requests.Response = session.get(
-        "https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions",
-        timeout=10,
-    )
-    logger.debug(f"Response: {response.status_code} - {response.reason}")
-    return response
+    return http_client.get(epic_url(country), timeout=10)
+
+
+def get_responses(countries: list[str]) -> dict[str, requests.Response] | None:
+    """Get the response from Epic for every country.
+
+    If one country has changed, the ones that haven't are downloaded again, so we know
+    every country a game is free in.
+
+    Args:
+        countries: The country codes.
 
+    Returns:
+        dict[str, requests.Response] | None: The responses by country, or None if nothing has changed since last time.
+    """
+    changed: list[requests.Response | None] = for_each_country(get_response, countries)
+    if all(response is None for response in changed):
+        return None
+
+    unchanged: list[str] = [country for country, response in zip(countries, changed, strict=True) if response is None]
+    downloaded: dict[str, requests.Response] = dict(zip(unchanged, for_each_country(download, unchanged), strict=True))
 
-def if_mystery_game(game: dict) -> bool:
+    responses: dict[str, requests.Response] = {
+        country: downloaded[country] if response is None else response for country, response in zip(countries, changed, strict=True)
+    }
+    for response in responses.values():
+        response.raise_for_status()
+    return responses
+
+
+def if_mystery_game(game: EpicGame) -> bool:
     """Check if the game is a mystery game.
 
     Mystery games are not free games, but games that are coming soon.
 
     Args:
-        game: The game JSON
+        game: The game.
 
     Returns:
         bool: True if game is a mystery game
     """
-    if game.get("title", "") == "Mystery Game":
-        logger.bind(game_name=game["title"]).info("Mystery game, skipping")
+    if game.title == "Mystery Game":
+        logger.bind(game_name=game.title).info("Mystery game, skipping")
         return True
     return False
 
 
-def get_free_epic_games() -> Generator[DiscordEmbed | None, Any, None]:  # noqa: C901, PLR0912
-    """Get the free games from Epic.
+def classify(game: EpicGame) -> EpicOffer:
+    """Decide once what kind of offer a game is.
 
-    Yields:
-        Embed: The embed with the free game we will send to Discord.
+    Args:
+        game: The game.
+
+    Returns:
+        EpicOffer: What we should do with the game.
     """
-    previous_games: Path = Path(settings.app_dir) / "epic.txt"
-    if not Path.exists(previous_games):
-        logger.bind(game_name="Epic").info("Creating file for previous games")
-        with Path.open(previous_games, "w") as f:
-            f.write("")
-
-    response: requests.Response = get_response()
-    for game in response.json()["data"]["Catalog"]["searchStore"]["elements"]:
-        game_name: str = game["title"]
-        logger.bind(game_name=game["title"]).info(f"Checking {game_name}")
-
-        if if_mystery_game(game):
-            continue
+    if if_mystery_game(game) or not check_promotion(game):
+        return EpicOffer.NOT_FREE
 
-        original_price: int = game["price"]["totalPrice"]["originalPrice"]
-        discount: int = game["price"]["totalPrice"]["discount"]
-        final_price: int = original_price - discount
+    if game.free:
+        return EpicOffer.FREE_NOW
 
-        logger.bind(game_name=game["title"]).info(f"Original price: {original_price}")
-        logger.bind(game_name=game["title"]).info(f"Discount: {discount}")
-        logger.bind(game_name=game["title"]).info(f"Final price: {final_price}")
+    # This fixes https://github.com/TheLovinator1/discord-free-game-notifier/issues/70
+    if game.vaulted:
+        return EpicOffer.VAULTED_FREE
 
-        for image in game["keyImages"]:
-            if image["type"] == "VaultOpened":
-                if check_promotion is False:
-                    continue
+    # The game is sent when the promotion starts, see main.schedule_upcoming().
+    if game.upcoming_start:
+        return EpicOffer.UPCOMING
 
-                if already_posted(previous_games, game_name):
-                    continue
+    return EpicOffer.NOT_FREE
 
-                yield create_embed(previous_games, game)
 
-            # This fixes https://github.com/TheLovinator1/discord-free-game-notifier/issues/70
-            for cat in game["categories"]:
-                if cat["path"] == "freegames/vaulted" and game["status"] == "ACTIVE":
-                    if check_promotion is False:
-                        continue
+def merge_offers(payloads: dict[str, FreeGamesPromotions]) -> list[tuple[EpicGame, EpicOffer]]:
+    """Merge the games from every country into one list, with each offer once.
 
-                    if already_posted(previous_games, game_name):
-                        continue
+    When an offer is different in two countries, the one that is free soonest is kept,
+    and tagged with the countries where it is the same.
 
-                    yield create_embed(previous_games, game)
+    Args:
+        payloads: The responses from Epic by country.
 
-        if final_price == 0 and (original_price != 0 and discount != 0):
-            logger.bind(game_name=game["title"]).info("Game is free")
-            if check_promotion is False:
-                continue
+    Returns:
+        list[tuple[EpicGame, EpicOffer]]: The games, with what kind of offer they are.
+    """
+    merged: dict[str, tuple[EpicGame, EpicOffer]] = {}
+    regions: dict[str, list[str]] = {}
+    for country, payload in payloads.items():
+        for element in payload["data"]["Catalog"]["searchStore"]["elements"]:
+            game: EpicGame = parse_game(element)
+            offer: EpicOffer = classify(game)
+            best: tuple[EpicGame, EpicOffer] | None = merged.get(game.offer_id)
+            if best is None or OFFER_RANK[offer] < OFFER_RANK[best[1]]:
+                merged[game.offer_id] = (game, offer)
+                regions[game.offer_id] = [country]
+            elif OFFER_RANK[offer] == OFFER_RANK[best[1]] and country not in regions[game.offer_id]:
+                regions[game.offer_id].append(country)
+
+    return [
+        (replace(game, regions=() if offer is EpicOffer.NOT_FREE else tuple(regions[offer_id])), offer)
+        for offer_id, (game, offer) in merged.items()
+    ]
+
+
+def get_free_epic_games() -> Generator[FreeGame | None, Any, None]:
+    """Get the free games from Epic in every country in settings.epic_countries.
+
+    Games that have been posted are yielded again. An offer can become free in another
+    country after we posted it, and the ledger only adds it to the outbox of the webhooks
+    that haven't got it yet, e.g. a tenant that only wants games free in that country.
 
-            if already_posted(previous_games, game_name):
-                continue
+    Yields:
+        FreeGame: The free game with the embed we will send to Discord, at most one per offer.
+    """
+    responses: dict[str, requests.Response] | None = get_responses(settings.epic_countries)
+    if responses is None:
+        logger.bind(game_name="Epic").info("No changes since last time, skipping")
+        return
+
+    payloads: dict[str, FreeGamesPromotions] = {
+        country: fast_json.decode(response.content, FreeGamesPromotions) for country, response in responses.items()
+    }
+    for game, offer in merge_offers(payloads):
+        regions: str = ", ".join(game.regions) or "no country"
+        price: str = f"{game.final_price}/{game.original_price}"
+        logger.bind(game_name=game.title).info(f"Checking {game.title}: {offer.value} in {regions}, price {price}")
+        if offer is EpicOffer.NOT_FREE:
+            continue
+
+        if offer is EpicOffer.UPCOMING:
+            yield create_free_game(game, game.upcoming_start, game.upcoming_end)
+        else:
+            yield create_free_game(game)
 
-            yield create_embed(previous_games, game)
+    for country in responses:
+        http_client.commit_validators(epic_url(country))
 
 
-def create_embed(previous_games: Path, game: dict) -> DiscordEmbed | None:
+def create_embed(game: EpicGame, start_time: int | None = None, end_time: int | None = None) -> DiscordEmbed | None:
     """Create the embed for the game.
 
     Args:
-        previous_games: The file where we store old games in.
-        game: The game JSON
+        game: The game.
+        start_time: When the promotion starts, defaults to the current promotion.
+        end_time: When the promotion ends, defaults to the current promotion.
 
     Returns:
         Embed: The embed with the free game we will send to Discord.
     """
-    description: str = game["description"] or "No description found"
-    logger.bind(game_name=game["title"]).info(f"Description: {description}")
-    embed = DiscordEmbed(description=description)
-    url = game_url(game)
-    game_name: str = game["title"]
-
-    # Jotun had /home appended to the URL and that broke the link
-    # Broken: https://www.epicgames.com/en-US/p/jotun/home
-    # Fixed: https://www.epicgames.com/en-US/p/jotun
-    if url.endswith("/home"):
-        logger.bind(game_name=game["title"]).debug("URL ends with /home")
-        url: str = url[:-5]
-
-    embed.set_author(name=game_name, url=url, icon_url=settings.epic_icon)
+    embed = DiscordEmbed(description=game.description)
+    embed.set_author(name=game.title, url=game.url, icon_url=settings.epic_icon)
 
     curr_dt: datetime = datetime.now(tz=pytz.UTC)
     current_time = int(round(curr_dt.timestamp()))
-    end_time: int = promotion_end(game)
-    start_time: int = promotion_start(game)
+    end_time = game.end if end_time is None else end_time
+    start_time = game.start if start_time is None else start_time
 
     if end_time > current_time or (end_time == 0 and start_time != 0):
         if start_time != 0:
@@ -284,32 +424,58 @@ def create_embed(previous_games: Path, game: dict) -> DiscordEmbed | None:
         if end_time != 0:
             embed.add_embed_field(name="End", value=f"<t:{end_time}:R>")
 
-        seller: str = game["seller"]["name"] if game["seller"] else "Unknown"
-
-        if seller not in {"Epic Dev Test Account", "Unknown"}:
-            logger.bind(game_name=game["title"]).info(f"Seller: {seller}")
-            embed.set_footer(text=f"{seller}")
+        # Only worth showing when some of the countries we check don't get the game.
+        if 0 < len(game.regions) < len(settings.epic_countries):
+            embed.add_embed_field(name="Free in", value=", ".join(game.regions))
 
-        if image_url := game_image(game):
-            logger.bind(game_name=game["title"]).info(f"Image: {image_url}")
-            embed.set_image(url=image_url)
+        if game.seller not in EPIC_PLACEHOLDER_SELLERS:
+            embed.set_footer(text=f"{game.seller}")
 
-        with Path.open(previous_games, "a+", encoding="utf-8") as file:
-            logger.bind(game_name=game["title"]).info("Saving game to file")
-            file.write(f"{game_name}\n")
+        if game.image:
+            embed.set_image(url=game.image)
 
         return embed
 
-    logger.bind(game_name=game["title"]).info(
+    logger.bind(game_name=game.title).info(
         f"Game has ended, skipping. End time: {end_time}. Current time: {current_time}",
     )
     return None
 
 
+def create_free_game(game: EpicGame, start_time: int | None = None, end_time: int | None = None) -> FreeGame | None:
+    """Create the embed for the game and remember when the promotion runs.
+
+    Args:
+        game: The game.
+        start_time: When the promotion starts, defaults to the current promotion.
+        end_time: When the promotion ends, defaults to the current promotion.
+
+    Returns:
+        FreeGame: The free game, or None if the promotion has ended.
+    """
+    embed: DiscordEmbed | None = create_embed(game, start_time, end_time)
+    if embed is None:
+        return None
+
+    return FreeGame(
+        store="epic",
+        # Two offers can have the same title, e.g. a game and its edition, so the ledger uses the offer ID.
+        game_id=game.offer_id,
+        embed=embed,
+        promotion_start=(game.start if start_time is None else start_time) or None,
+        promotion_end=(game.end if end_time is None else end_time) or None,
+        offer_type=game.offer_type,
+        original_price=game.original_price,
+        seller="" if game.seller in EPIC_PLACEHOLDER_SELLERS else game.seller,
+        regions=game.regions,
+        legacy_id=game.title,
+    )
+
+
 if __name__ == "__main__":
     for free_game in get_free_epic_games():
         if free_game:
-            webhook_response: requests.Response = send_embed_webhook(free_game)
+            webhook_response: requests.Response = send_embed_webhook(free_game.embed)
             if not webhook_response.ok:
                 msg: str = (
                     "Error when checking game for Epic:\n"
@@ -0,0 +1,116 @@
+"""The fields of Epic's freeGamesPromotions response that epic.parse_game() reads.
+
+With msgspec installed the response is decoded straight into these, and everything
+else (tags, customAttributes, items, catalogNs, ...) is skipped while decoding.
+The names match the JSON keys.
+"""
+
+from __future__ import annotations
+
+from typing import NotRequired, TypedDict
+
+
+class DiscountSetting(TypedDict):
+    """How much an offer is discounted."""
+
+    discountPercentage: int
+
+
+class PromotionalOffer(TypedDict):
+    """When an offer starts and ends."""
+
+    startDate: str | None
+    endDate: str | None
+    discountSetting: DiscountSetting
+
+
+class PromotionalOffers(TypedDict):
+    """A group of offers."""
+
+    promotionalOffers: list[PromotionalOffer]
+
+
+class Promotions(TypedDict):
+    """The current and upcoming offers of a game."""
+
+    promotionalOffers: list[PromotionalOffers]
+    upcomingPromotionalOffers: list[PromotionalOffers]
+
+
+class TotalPrice(TypedDict):
+    """The price in cents."""
+
+    originalPrice: int
+    discount: int
+
+
+class Price(TypedDict):
+    """The price of a game."""
+
+    totalPrice: TotalPrice
+
+
+class Seller(TypedDict):
+    """Who sells the game."""
+
+    name: str
+
+
+class KeyImage(TypedDict):
+    """One of the images of a game."""
+
+    type: str
+    url: str
+
+
+class Category(TypedDict):
+    """A category the game is in, e.g. freegames/vaulted."""
+
+    path: str
+
+
+class OfferMapping(TypedDict):
+    """A store page of the game."""
+
+    pageSlug: str | None
+
+
+class Element(TypedDict):
+    """A game in the response."""
+
+    id: str
+    title: str
+    description: str | None
+    status: str
+    productSlug: str | None
+    offerMappings: list[OfferMapping] | None
+    keyImages: list[KeyImage]
+    categories: list[Category]
+    seller: Seller | None
+    price: Price
+    promotions: Promotions | None
+    offerType: NotRequired[str]
+
+
+class SearchStore(TypedDict):
+    """The games."""
+
+    elements: list[Element]
+
+
+class Catalog(TypedDict):
+    """The catalog."""
+
+    searchStore: SearchStore
+
+
+class Data(TypedDict):
+    """The data of the response."""
+
+    Catalog: Catalog
+
+
+class FreeGamesPromotions(TypedDict):
+    """The response from the freeGamesPromotions endpoint."""
+
+    data: Data
@@ -0,0 +1,58 @@
+"""Decode JSON with the fastest library that is installed.
+
+msgspec can decode straight into the types we ask for and skip every field that isn't
+in them, orjson is a faster json.loads, and the standard library is always there.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, TypeVar
+
+from loguru import logger
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+T = TypeVar("T")
+
+
+def loads(content: bytes | str) -> Any:  # noqa: ANN401
+    """Decode all of a JSON document.
+
+    Args:
+        content: The JSON.
+
+    Returns:
+        Any: The decoded JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode(content: bytes | str, schema: type[T]) -> T:
+    """Decode only the fields of a JSON document that are in a schema.
+
+    Without msgspec the whole document is decoded, so the result has more keys than the schema.
+
+    Args:
+        content: The JSON.
+        schema: A TypedDict with the fields we read.
+
+    Returns:
+        T: The decoded JSON.
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(content, type=schema)
+        except msgspec.ValidationError as e:
+            logger.warning(f"JSON doesn't match {schema.__name__}, decoding all of it: {e}")
+    return loads(content)
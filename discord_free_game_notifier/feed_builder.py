@@ -0,0 +1,256 @@
+"""Build a versioned feed with deltas from the curated pages/*.json files.
+
+First the games that have ended are moved from pages/epic.json, pages/steam.json and
+pages/ubisoft.json to the same file in pages/archive/, so the published files only
+have active and upcoming games. They are sorted by start date, so a client can stop
+reading at the first game that hasn't started yet.
+
+Then the games are written to pages/feed/ as:
+
+- feed.json: the games from every store, with the current version.
+- delta-<version>.json: the games that were added or changed in that version, and the
+  ones that were removed.
+- index.json: the current version and the deltas that are still published.
+
+Every file also gets a .gz copy, and a .br copy when brotli is installed
+(`poetry install --extras feed` or `pip install brotli`).
+
+A client remembers the last version it has seen and downloads index.json. If the
+version is the same there is nothing new. If the delta after its version is still
+in the index it downloads the deltas up to the current version, otherwise feed.json.
+
+It runs after create_json_file() when a curated feed is updated, e.g.
+`python -m discord_free_game_notifier.epic_json`, or on its own:
+
+    python -m discord_free_game_notifier.feed_builder
+"""
+
+from __future__ import annotations
+
+import datetime
+import gzip
+import json
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from discord_free_game_notifier.feeds import FEEDS, parse_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAGES_DIR = Path("pages")
+FEED_DIR: Path = PAGES_DIR / "feed"
+ARCHIVE_DIR: Path = PAGES_DIR / "archive"
+
+# Clients that are further behind than this download feed.json instead.
+MAX_DELTAS = 100
+
+
+def game_key(game: dict[str, Any]) -> str:
+    """Get what identifies a game in the combined feed.
+
+    Args:
+        game: The game, with its store.
+
+    Returns:
+        str: The store and ID, e.g. "epic:the_sims_4_my_first_pet_stuff".
+    """
+    return f"{game['store']}:{game['id']}"
+
+
+def feed_file(url: str) -> str:
+    """Get the file name of a curated feed.
+
+    Args:
+        url: The URL of the feed on GitHub Pages.
+
+    Returns:
+        str: The file name in pages/, e.g. "epic.json".
+    """
+    return url.rsplit("/", 1)[-1]
+
+
+def has_ended(game: dict[str, Any], now: int) -> bool:
+    """Check if a game from a curated feed isn't free anymore.
+
+    Args:
+        game: The game JSON.
+        now: The Unix time.
+
+    Returns:
+        bool: True if the game has an end date in the past.
+    """
+    return parse_date(game.get("end_date"), now) < now
+
+
+def write_pages(path: Path, games: list[dict[str, Any]]) -> None:
+    """Write a curated feed the same way create_json_file() does.
+
+    Args:
+        path: The file.
+        games: The games.
+    """
+    path.write_text(f"{json.dumps({'free_games': games}, indent=4)}\n", encoding="utf-8")
+
+
+def prune_feed(path: Path, archive_path: Path, now: int) -> int:
+    """Move the games that have ended from a curated feed to its archive, and sort the rest by start date.
+
+    Args:
+        path: The curated feed, e.g. pages/epic.json.
+        archive_path: The archive, e.g. pages/archive/epic.json.
+        now: The Unix time.
+
+    Returns:
+        int: How many games were archived.
+    """
+    games: list[dict[str, Any]] = json.loads(path.read_text(encoding="utf-8"))["free_games"]
+    ended: list[dict[str, Any]] = [game for game in games if has_ended(game, now)]
+    active: list[dict[str, Any]] = sorted(
+        (game for game in games if not has_ended(game, now)),
+        key=lambda game: parse_date(game.get("start_date"), 0),
+    )
+
+    if ended:
+        archived: list[dict[str, Any]] = read_json(archive_path, {"free_games": []})["free_games"]
+        archived_ids: set[str] = {game["id"] for game in archived}
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        write_pages(archive_path, [*archived, *(game for game in ended if game["id"] not in archived_ids)])
+
+    write_pages(path, active)
+    logger.info(f"{path.name}: {len(active)} active or upcoming, {len(ended)} archived")
+    return len(ended)
+
+
+def prune_pages(pages_dir: Path = PAGES_DIR, archive_dir: Path = ARCHIVE_DIR, now: int | None = None) -> int:
+    """Archive the games that have ended in every curated feed.
+
+    Args:
+        pages_dir: The directory with epic.json, steam.json and ubisoft.json.
+        archive_dir: Where the archived games are saved.
+        now: The Unix time, defaults to now.
+
+    Returns:
+        int: How many games were archived.
+    """
+    now = int(datetime.datetime.now(tz=datetime.UTC).timestamp()) if now is None else now
+    return sum(prune_feed(pages_dir / feed_file(feed.url), archive_dir / feed_file(feed.url), now) for feed in FEEDS)
+
+
+def load_games(pages_dir: Path = PAGES_DIR) -> list[dict[str, Any]]:
+    """Read the games from every curated feed.
+
+    Args:
+        pages_dir: The directory with epic.json, steam.json and ubisoft.json.
+
+    Returns:
+        list[dict[str, Any]]: The games, with the store they are from.
+    """
+    games: list[dict[str, Any]] = []
+    for feed in FEEDS:
+        path: Path = pages_dir / feed_file(feed.url)
+        games.extend({"store": feed.store, **game} for game in json.loads(path.read_text(encoding="utf-8"))["free_games"])
+    return games
+
+
+def compact(data: dict[str, Any]) -> bytes:
+    """Encode JSON without whitespace, with the keys sorted so unchanged data gives the same bytes.
+
+    Args:
+        data: The JSON.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+
+
+def write(path: Path, data: bytes) -> None:
+    """Write a file and its compressed copies.
+
+    Args:
+        path: Where to write the file.
+        data: What to write.
+    """
+    path.write_bytes(data)
+    path.with_name(f"{path.name}.gz").write_bytes(gzip.compress(data, mtime=0))
+    if brotli is not None:
+        path.with_name(f"{path.name}.br").write_bytes(brotli.compress(data))
+
+
+def remove(path: Path) -> None:
+    """Remove a file and its compressed copies.
+
+    Args:
+        path: The file.
+    """
+    for name in (path.name, f"{path.name}.gz", f"{path.name}.br"):
+        path.with_name(name).unlink(missing_ok=True)
+
+
+def read_json(path: Path, default: dict[str, Any]) -> dict[str, Any]:
+    """Read a file we wrote before.
+
+    Args:
+        path: The file.
+        default: What to return if the file doesn't exist.
+
+    Returns:
+        dict[str, Any]: The JSON.
+    """
+    return json.loads(path.read_bytes()) if path.is_file() else default
+
+
+def build_feed(games: list[dict[str, Any]], feed_dir: Path = FEED_DIR) -> int:
+    """Write a new version of the feed if any game has been added, changed or removed.
+
+    Args:
+        games: Every game, with the store it is from.
+        feed_dir: Where to write the feed.
+
+    Returns:
+        int: The current version.
+    """
+    feed_dir.mkdir(parents=True, exist_ok=True)
+    index: dict[str, Any] = read_json(feed_dir / "index.json", {"version": 0, "deltas": []})
+    previous: dict[str, dict[str, Any]] = {game_key(game): game for game in read_json(feed_dir / "feed.json", {"games": []})["games"]}
+    current: dict[str, dict[str, Any]] = {game_key(game): game for game in games}
+
+    changed: list[dict[str, Any]] = [game for key, game in sorted(current.items()) if previous.get(key) != game]
+    removed: list[dict[str, str]] = [
+        {"store": game["store"], "id": game["id"]} for key, game in sorted(previous.items()) if key not in current
+    ]
+    if index["version"] and not changed and not removed:
+        logger.info(f"Nothing has changed, the feed is still at version {index['version']}")
+        return index["version"]
+
+    version: int = index["version"] + 1
+    write(feed_dir / f"delta-{version}.json", compact({"version": version, "since": version - 1, "games": changed, "removed": removed}))
+    write(feed_dir / "feed.json", compact({"version": version, "games": [game for _, game in sorted(current.items())]}))
+
+    deltas: list[int] = [*index["deltas"], version]
+    for old_version in deltas[:-MAX_DELTAS]:
+        remove(feed_dir / f"delta-{old_version}.json")
+    deltas = deltas[-MAX_DELTAS:]
+
+    write(feed_dir / "index.json", compact({"version": version, "feed": "feed.json", "deltas": deltas}))
+    logger.info(f"Feed version {version}: {len(changed)} added or changed, {len(removed)} removed")
+    return version
+
+
+def build_pages() -> int:
+    """Archive the games that have ended in pages/*.json, and build the feed from the rest.
+
+    Returns:
+        int: The current version of the feed.
+    """
+    prune_pages()
+    return build_feed(load_games())
+
+
+if __name__ == "__main__":
+    build_pages()
@@ -0,0 +1,249 @@
+"""Check the JSON feeds on GitHub Pages for free games the scrapers don't find.
+
+Every feed has the same format, see pages/*.json, so one engine reads all of them.
+Each feed is its own source in main.sources, so they are fetched at the same time
+and have their own schedule and circuit breaker. To add a feed, add it to FEEDS.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, NotRequired, TypedDict
+
+from discord_webhook import DiscordEmbed
+from loguru import logger
+
+from discord_free_game_notifier import fast_json, http_client, settings
+from discord_free_game_notifier.models import FreeGame
+from discord_free_game_notifier.utils import already_posted
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    import requests
+
+PAGES_URL = "https://thelovinator1.github.io/discord-free-game-notifier"
+
+
+class FeedGame(TypedDict):
+    """A game in a feed, as it is in the JSON."""
+
+    id: str
+    game_name: str
+    game_url: str
+    description: str
+    start_date: str | None
+    end_date: str | None
+    image_link: NotRequired[str]
+    developer: NotRequired[str]
+
+    # For the subscription filters: game, dlc or bundle, and the normal price in cents.
+    # Set offer_type on every curated game, a game without one gets past the offer_types filter.
+    offer_type: NotRequired[str]
+    original_price: NotRequired[int]
+
+
+class FeedFile(TypedDict):
+    """A feed, as it is in the JSON."""
+
+    free_games: list[FeedGame]
+
+
+class FeedError(ValueError):
+    """The feed doesn't have the format we expect."""
+
+
+@dataclass(frozen=True, slots=True)
+class Feed:
+    """A JSON feed and how its games are shown in Discord."""
+
+    name: str
+    game_service: str
+    store: str
+    url: str
+    icon: str
+
+    # Shown under every game, defaults to the developer of the game.
+    footer: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class FeedEntry:
+    """A game from a feed, with the dates as Unix times."""
+
+    game_id: str
+    game_name: str
+    game_url: str
+    description: str
+    image_link: str
+    developer: str
+    start: int
+    end: int
+    offer_type: str = ""
+    original_price: int | None = None
+
+
+EPIC_FEED = Feed("Epic (JSON)", "Epic", "epic", f"{PAGES_URL}/epic.json", settings.epic_icon)
+STEAM_FEED = Feed("Steam (JSON)", "Steam", "steam", f"{PAGES_URL}/steam.json", settings.steam_icon)
+UBISOFT_FEED = Feed("Ubisoft", "Ubisoft", "ubisoft", f"{PAGES_URL}/ubisoft.json", settings.ubisoft_icon, footer="Ubisoft")
+
+FEEDS: list[Feed] = [EPIC_FEED, STEAM_FEED, UBISOFT_FEED]
+
+
+def parse_date(date: str | None, now: int) -> int:
+    """Parse a date from a feed.
+
+    Args:
+        date: The date in ISO 8601, e.g. "2023-12-01T11:00:00+00:00".
+        now: The Unix time to use when the date is empty.
+
+    Returns:
+        int: The Unix time.
+    """
+    return int(datetime.datetime.fromisoformat(date).timestamp()) if date else now
+
+
+def parse_entry(game: FeedGame, now: int) -> FeedEntry:
+    """Read a game from a feed.
+
+    Args:
+        game: The game JSON.
+        now: The Unix time, used for empty dates.
+
+    Returns:
+        FeedEntry: The game.
+
+    Raises:
+        FeedError: If a field is missing or has the wrong type.
+    """
+    for key in ("id", "game_name", "game_url", "description"):
+        if not isinstance(game.get(key), str):
+            msg: str = f"{key} should be a string, not {game.get(key)!r}"
+            raise FeedError(msg)
+
+    if not isinstance(game.get("original_price"), int | None):
+        msg = f"original_price should be a number of cents, not {game.get('original_price')!r}"
+        raise FeedError(msg)
+
+    try:
+        return FeedEntry(
+            game_id=game["id"],
+            game_name=game["game_name"],
+            game_url=game["game_url"],
+            description=game["description"],
+            image_link=game.get("image_link") or "",
+            developer=game.get("developer") or "",
+            start=parse_date(game.get("start_date"), now),
+            end=parse_date(game.get("end_date"), now),
+            offer_type=game.get("offer_type") or "",
+            original_price=game.get("original_price"),
+        )
+    except (TypeError, ValueError) as e:
+        msg = f"Invalid date: {e}"
+        raise FeedError(msg) from e
+
+
+def parse_feed(feed: Feed, content: bytes | str) -> list[FeedEntry]:
+    """Decode a feed and read every game in it.
+
+    Games that don't have the right format are logged and skipped.
+
+    Args:
+        feed: The feed.
+        content: The JSON.
+
+    Returns:
+        list[FeedEntry]: The games.
+
+    Raises:
+        FeedError: If the feed isn't an object with a list of free_games.
+    """
+    payload: Any = fast_json.decode(content, FeedFile)
+    if not isinstance(payload, dict) or not isinstance(payload.get("free_games"), list):
+        msg: str = f"{feed.url} doesn't have a list of free_games"
+        raise FeedError(msg)
+
+    now = int(datetime.datetime.now(tz=datetime.UTC).timestamp())
+    entries: list[FeedEntry] = []
+    for game in payload["free_games"]:
+        try:
+            entries.append(parse_entry(game, now))
+        except (FeedError, AttributeError) as e:  # noqa: PERF203
+            logger.bind(game_name=feed.name).warning(f"Skipping invalid game {game!r}: {e}")
+    return entries
+
+
+def create_embed(feed: Feed, entry: FeedEntry) -> DiscordEmbed:
+    """Create the embed that we will send to Discord.
+
+    Args:
+        feed: The feed the game is from.
+        entry: The game.
+
+    Returns:
+        DiscordEmbed: The embed.
+    """
+    embed = DiscordEmbed(description=entry.description)
+    embed.set_author(name=entry.game_name, url=entry.game_url, icon_url=feed.icon)
+    if entry.image_link:
+        embed.set_image(url=entry.image_link)
+    embed.set_timestamp()
+    embed.add_embed_field(name="Start", value=f"<t:{entry.start}:R>")
+    embed.add_embed_field(name="End", value=f"<t:{entry.end}:R>")
+    if footer := feed.footer or entry.developer:
+        embed.set_footer(text=footer)
+    return embed
+
+
+def feed_game(feed: Feed, entry: FeedEntry) -> FreeGame:
+    """Turn a game from a feed into a free game we can send.
+
+    Args:
+        feed: The feed the game is from.
+        entry: The game.
+
+    Returns:
+        FreeGame: The game, with the fields the subscription filters look at.
+    """
+    return FreeGame(
+        store=feed.store,
+        game_id=entry.game_id,
+        embed=create_embed(feed, entry),
+        promotion_start=entry.start,
+        promotion_end=entry.end,
+        offer_type=entry.offer_type,
+        original_price=entry.original_price,
+        seller=entry.developer,
+    )
+
+
+def get_feed_games(feed: Feed) -> Generator[FreeGame, Any, None]:
+    """Get the free games in a feed that we haven't posted.
+
+    Errors are raised, so the source's circuit breaker sees them.
+
+    Args:
+        feed: The feed.
+
+    Yields:
+        FreeGame: The free games, with the embeds we will send to Discord.
+    """
+    response: requests.Response | None = http_client.get_if_modified(feed.url)
+    if response is None:
+        logger.bind(game_name=feed.name).info("No changes since last time, skipping")
+        return
+
+    response.raise_for_status()
+    now = int(datetime.datetime.now(tz=datetime.UTC).timestamp())
+    for entry in parse_feed(feed, response.content):
+        if already_posted(feed.store, entry.game_id):
+            continue
+
+        if entry.end < now:
+            logger.bind(game_name=entry.game_name).info(f"{entry.game_name} is no longer free")
+            continue
+
+        yield feed_game(feed, entry)
+
+    http_client.commit_validators(feed.url)
@@ -1,23 +1,46 @@
 from __future__ import annotations
 
-from pathlib import Path
 from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
 
 import requests
-from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4 import NavigableString, Tag
 from discord_webhook import DiscordEmbed
 from loguru import logger
 
-from discord_free_game_notifier import settings
+from discord_free_game_notifier import html_parser, http_client, settings
+from discord_free_game_notifier.models import OFFER_TYPE_BUNDLE, OFFER_TYPE_DLC, OFFER_TYPE_GAME, FreeGame
 from discord_free_game_notifier.utils import already_posted
 from discord_free_game_notifier.webhook import send_embed_webhook
 
 if TYPE_CHECKING:
     from collections.abc import Generator
 
+GOG_STORE_URL = "https://www.gog.com/en/games?priceRange=0,0&discounted=true"
+GOG_FRONT_PAGE_URL = "https://www.gog.com/"
+
+# The JSON API behind the store page, filtered to products that are free because of a discount.
+GOG_CATALOG_URL = "https://catalog.gog.com/v1/catalog"
+GOG_CATALOG_PARAMS: dict[str, str | int] = {
+    "limit": 48,
+    "price": "between:0,0",
+    "discounted": "eq:true",
+    "productType": "in:game,pack",
+    # Trending changes all the time, the release date keeps the pages in the same order.
+    "order": "desc:releaseDate",
+    "countryCode": "US",
+    "locale": "en-US",
+    "currencyCode": "USD",
+}
+
+# The catalog's productType, as the offer types the subscription filters use.
+GOG_OFFER_TYPES: dict[str, str] = {"game": OFFER_TYPE_GAME, "pack": OFFER_TYPE_BUNDLE, "dlc": OFFER_TYPE_DLC}
+
+# There are never this many free games, but we don't want to loop forever if the API misbehaves.
+GOG_CATALOG_MAX_PAGES = 10
+
 
 def create_embed(
-    previous_games: Path,
     game_name: str = "",
     image_url: str = "",
     game_url: str = "",
@@ -27,7 +50,6 @@ def create_embed(
     """Create the embed that we will send to Discord.
 
     Args:
-        previous_games: The file where we store old games in.
         game_name: The game name.
         game_url: URL to the game.
         image_url: Game image.
@@ -65,31 +87,154 @@ def create_embed(
 
         embed.set_image(url=image_url)
 
-    with Path.open(previous_games, "a+", encoding="utf-8") as file:
-        file.write(f"{game_name}\n")
-
     return embed
 
 
-def get_free_gog_game_from_store() -> Generator[DiscordEmbed | None, Any, None]:
+def catalog_url(page: int) -> str:
+    """Get the URL of a page of free games in GOG's catalog API.
+
+    Every page has its own URL, get_free_gog_games_from_catalog() fingerprints them together.
+
+    Args:
+        page: The page number, starting at 1.
+
+    Returns:
+        str: The URL.
+    """
+    return f"{GOG_CATALOG_URL}?{urlencode({**GOG_CATALOG_PARAMS, 'page': page})}"
+
+
+def is_free(product: dict) -> bool:
+    """Check if a product from the catalog API costs nothing.
+
+    Args:
+        product: The product JSON.
+
+    Returns:
+        bool: True if the final price is 0.
+    """
+    try:
+        return float(product["price"]["finalMoney"]["amount"]) == 0
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def base_price(product: dict) -> int | None:
+    """Get what a product from the catalog API costs without the discount.
+
+    Args:
+        product: The product JSON.
+
+    Returns:
+        int | None: The price in cents, None if the catalog doesn't have it.
+    """
+    try:
+        return round(float(product["price"]["baseMoney"]["amount"]) * 100)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def catalog_games(catalog: dict) -> Generator[FreeGame, Any, None]:
+    """Get the free games on one page of the catalog API.
+
+    Args:
+        catalog: The JSON of the page.
+
+    Yields:
+        FreeGame: The free GOG games we haven't posted.
+    """
+    for product in catalog.get("products", []):
+        game_name: str = product["title"]
+        if not is_free(product):
+            logger.bind(game_name=game_name).debug("Not free, skipping")
+            continue
+
+        if already_posted("gog", game_name):
+            continue
+
+        game_url: str = product.get("storeLink") or f"https://www.gog.com/en/game/{product['slug']}"
+        embed: DiscordEmbed = create_embed(
+            game_name=game_name,
+            game_url=game_url,
+            image_url=product.get("coverHorizontal") or "",
+            no_claim=True,
+        )
+        yield FreeGame(
+            store="gog",
+            game_id=game_name,
+            embed=embed,
+            offer_type=GOG_OFFER_TYPES.get(product.get("productType", ""), ""),
+            original_price=base_price(product),
+            seller=", ".join(product.get("publishers") or []),
+        )
+
+
+def get_free_gog_games_from_catalog() -> list[FreeGame] | None:
+    """Get the free games from GOG's catalog API, page by page.
+
+    Every page is requested on every check, so a new game on a later page isn't missed
+    when the first page stays the same. The pages are fingerprinted together.
+
+    Returns:
+        list[FreeGame] | None: The free GOG games, None if no page has changed since last time.
+    """
+    responses: list[requests.Response] = [http_client.get(catalog_url(1), timeout=30)]
+    responses[0].raise_for_status()
+
+    pages: int = min(int(responses[0].json().get("pages", 1)), GOG_CATALOG_MAX_PAGES)
+    for page in range(2, pages + 1):
+        page_response: requests.Response = http_client.get(catalog_url(page), timeout=30)
+        page_response.raise_for_status()
+        responses.append(page_response)
+
+    if not http_client.changed_since_last_time(GOG_CATALOG_URL, b"\n".join(response.content for response in responses)):
+        return None
+
+    games: list[FreeGame] = []
+    for response in responses:
+        games.extend(catalog_games(response.json()))
+
+    logger.bind(game_name="GOG").info(f"Found {len(games)} new free games in {pages} catalog pages")
+    http_client.commit_validators(GOG_CATALOG_URL)
+    return games
+
+
+def get_free_gog_game_from_store() -> Generator[FreeGame | None, Any, None]:
     """Check if free GOG game from games store.
 
+    We use the catalog API, and only fall back to the HTML store page if it fails.
+
     Yields:
-        DiscordEmbed: Embed for the free GOG games.
+        FreeGame: The free GOG games.
     """
-    previous_games: Path = Path(settings.app_dir) / "gog.txt"
-
-    if not Path.exists(previous_games):
-        with Path.open(previous_games, "w", encoding="utf-8") as file:
-            file.write("")
-    request: requests.Response = requests.get(
-        "https://www.gog.com/en/games?priceRange=0,0&discounted=true",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
-        },
-        timeout=30,
-    )
-    soup = BeautifulSoup(request.text, "html.parser")
+    try:
+        games: list[FreeGame] | None = get_free_gog_games_from_catalog()
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.bind(game_name="GOG").warning(f"Could not use the catalog API, using the store page instead: {e}")
+        yield from get_free_gog_game_from_store_page()
+        return
+
+    if games is None:
+        logger.bind(game_name="GOG").info("No changes since last time, skipping")
+        return
+
+    yield from games
+
+
+def get_free_gog_game_from_store_page() -> Generator[FreeGame | None, Any, None]:
+    """Check if free GOG game from the HTML games store page.
+
+    Yields:
+        FreeGame: The free GOG games.
+    """
+    request: requests.Response | None = http_client.get_if_modified(GOG_STORE_URL, timeout=30)
+    if request is None:
+        logger.bind(game_name="GOG").info("No changes since last time, skipping")
+        return
+
+    request.raise_for_status()
+
+    soup = html_parser.parse(request.text, only=html_parser.GOG_PRODUCTS_GRID)
 
     games: Tag | NavigableString | None = soup.find(
         "div",
@@ -130,17 +275,19 @@ def get_free_gog_game_from_store() -> Generator[DiscordEmbed | None, Any, None]:
         else:
             image_url = ""
 
-        if already_posted(previous_games, game_name):
-            yield None
+        if already_posted("gog", game_name):
+            continue
 
         # Create the embed and add it to the list of free games.
-        yield create_embed(
-            previous_games=previous_games,
+        embed: DiscordEmbed = create_embed(
             game_name=game_name,
             game_url=game_url,
             image_url=image_url,
             no_claim=True,
         )
+        yield FreeGame(store="gog", game_id=game_name, embed=embed)
+
+    http_client.commit_validators(GOG_STORE_URL)
 
 
 def get_giveaway_link(giveaway: Tag | NavigableString | None, game_name: str) -> str:
@@ -168,7 +315,7 @@ def get_giveaway_link(giveaway: Tag | NavigableString | None, game_name: str) ->
     return giveaway_link
 
 
-def get_game_image(giveaway: BeautifulSoup, game_name: str) -> str:
+def get_game_image(giveaway: Tag, game_name: str) -> str:
     """Get the game image from the GOG giveaway.
 
     Args:
@@ -211,17 +358,16 @@ def get_game_image(giveaway: BeautifulSoup, game_name: str) -> str:
     return image_url
 
 
-def get_game_name(giveaway_soup: BeautifulSoup, giveaway: Tag | NavigableString | None) -> str:
+def get_game_name(giveaway: Tag) -> str:
     """Get the game name from the GOG giveaway.
 
     Args:
-        giveaway_soup: The giveaway tag.
         giveaway: The giveaway tag.
 
     Returns:
         The game name. Defaults to "GOG Giveaway" if not found.
     """
-    img_tag: Tag | NavigableString | None = giveaway_soup.find("img", alt=True)
+    img_tag: Tag | NavigableString | None = giveaway.find("img", alt=True)
     if not hasattr(img_tag, "attrs"):
         logger.bind(game_name="GOG").error("No img tag found on GOG for {}", giveaway)
         return "GOG Giveaway"
@@ -241,56 +387,46 @@ def get_game_name(giveaway_soup: BeautifulSoup, giveaway: Tag | NavigableString
     return game_name
 
 
-def get_free_gog_game() -> DiscordEmbed | None:
+def get_free_gog_game() -> FreeGame | None:
     """Check if free GOG game.
 
     Returns:
         DiscordEmbed: Embed for the free GOG games.
     """
-    # Save previous free games to a file, so we don't post the same games again.
-    previous_games: Path = Path(settings.app_dir) / "gog.txt"
-
-    # Create the file if it doesn't exist
-    if not Path.exists(previous_games):
-        with Path.open(previous_games, "w", encoding="utf-8") as file:
-            file.write("")
-
-    request: requests.Response = requests.get(
-        "https://www.gog.com/",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
-        },
-        timeout=30,
-    )
+    request: requests.Response | None = http_client.get_if_modified(GOG_FRONT_PAGE_URL, timeout=30)
+    if request is None:
+        logger.bind(game_name="GOG").info("No changes since last time, skipping")
+        return None
+
+    request.raise_for_status()
 
-    soup = BeautifulSoup(request.text, "html.parser")
-    giveaway: Tag | NavigableString | None = soup.find("giveaway")
-    giveaway_soup: BeautifulSoup = BeautifulSoup(str(giveaway), "html.parser")
+    giveaway: Tag | NavigableString | None = html_parser.parse(request.text, only=html_parser.GOG_GIVEAWAY).find("giveaway")
+    http_client.commit_validators(GOG_FRONT_PAGE_URL)
 
-    if giveaway is None:
+    if not isinstance(giveaway, Tag):
         return None
 
     # Get the game name
-    game_name: str = get_game_name(giveaway_soup=giveaway_soup, giveaway=giveaway)
+    game_name: str = get_game_name(giveaway=giveaway)
 
-    if already_posted(previous_games=previous_games, game_name=game_name):
+    if already_posted(store="gog", game_id=game_name):
         return None
 
     giveaway_link: str = get_giveaway_link(giveaway=giveaway, game_name=game_name)
-    image_url: str = get_game_image(giveaway=giveaway_soup, game_name=game_name)
+    image_url: str = get_game_image(giveaway=giveaway, game_name=game_name)
 
     # Create the embed and add it to the list of free games.
-    return create_embed(
-        previous_games=previous_games,
+    embed: DiscordEmbed = create_embed(
         game_name=game_name,
         game_url=giveaway_link,
         image_url=image_url,
     )
+    return FreeGame(store="gog", game_id=game_name, embed=embed)
 
 
 if __name__ == "__main__":
-    if gog_embed := get_free_gog_game():
-        response: requests.Response = send_embed_webhook(gog_embed)
+    if gog_game := get_free_gog_game():
+        response: requests.Response = send_embed_webhook(gog_game.embed)
         if not response.ok:
             logger.error(
                 "Error when checking game for GOG:\n{} - {}: {}",
@@ -303,7 +439,7 @@ if __name__ == "__main__":
         if game is None:
             continue
 
-        response: requests.Response = send_embed_webhook(game)
+        response: requests.Response = send_embed_webhook(game.embed)
         if not response.ok:
             logger.error(
                 "Error when checking game for GOG:\n{} - {}: {}",
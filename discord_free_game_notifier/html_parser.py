@@ -0,0 +1,39 @@
+"""Parse the HTML pages of the stores, only the parts we need.
+
+BeautifulSoup uses lxml when it is installed, which is a lot faster than Python's
+own html.parser. The strainers below make it skip everything outside the elements
+we read, so no tree is built for the header, menus, scripts and footer of the page.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional, html.parser is always there.
+PARSER: str = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# The giveaway banner on GOG's front page.
+GOG_GIVEAWAY = SoupStrainer("giveaway")
+
+# The list of games on GOG's store page.
+GOG_PRODUCTS_GRID = SoupStrainer("div", attrs={"selenium-id": "paginatedProductsGrid"})
+
+# The games on Steam's search page. The class attribute isn't split into a list while
+# parsing, so a plain string would only match tags where it is the only class.
+STEAM_SEARCH_RESULT_ROW = SoupStrainer("a", class_=re.compile(r"\bsearch_result_row\b"))
+
+
+def parse(markup: str | bytes, only: SoupStrainer | None = None) -> BeautifulSoup:
+    """Parse an HTML page with the fastest parser we have.
+
+    Args:
+        markup: The HTML.
+        only: Only keep the elements this strainer matches, and everything inside them.
+
+    Returns:
+        BeautifulSoup: The parsed page.
+    """
+    return BeautifulSoup(markup, PARSER, parse_only=only)
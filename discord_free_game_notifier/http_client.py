@@ -0,0 +1,329 @@
+"""One HTTP session for everything we download from the stores and send to Discord.
+
+The session keeps a connection pool per host, so each cycle reuses the TCP and TLS
+connections from the last one instead of connecting again for every request.
+
+get_if_modified() sends the ETag and Last-Modified we got last time, so the server
+can answer with an empty 304 Not Modified when nothing has changed. Servers that
+don't support that are checked against a CRC32 fingerprint of the last body instead.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter, Retry
+
+from discord_free_game_notifier import settings
+
+HTTP_NOT_MODIFIED = 304
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0"
+
+# Retry failed GET requests with 1, 2, 4... seconds between them.
+# POST requests are not retried by urllib3, webhook.py handles Discord's rate limits.
+retry = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[429, 500, 502, 503, 504],
+    respect_retry_after_header=True,
+)
+
+# One pool for each host we talk to (Epic, Steam, GOG, GitHub Pages, Discord...).
+adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=max(settings.max_workers, settings.delivery_workers, 10),
+    max_retries=retry,
+)
+
+session = requests.Session()
+session.headers["User-Agent"] = USER_AGENT
+session.mount("https://", adapter)
+session.mount("http://", adapter)
+
+
+class DeadlineExceededError(requests.Timeout):
+    """The source has run out of time, main.check_free_games() isn't waiting for it anymore."""
+
+
+# When the source that is being checked in this thread has to be done, in time.monotonic().
+source_deadline: ContextVar[float | None] = ContextVar("source_deadline", default=None)
+
+
+def deadline_exceeded() -> bool:
+    """Check if the source that is being checked in this thread has run out of time.
+
+    Returns:
+        bool: True if the deadline has passed.
+    """
+    deadline: float | None = source_deadline.get()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def get(url: str, timeout: float = 30, **kwargs: Any) -> requests.Response:  # noqa: ANN401
+    """Send a GET request with the shared session.
+
+    The timeout is shortened so the request doesn't outlive the source's deadline.
+
+    Args:
+        url: The URL to get.
+        timeout: How many seconds to wait for the server.
+        **kwargs: Passed to requests, e.g. params or headers.
+
+    Returns:
+        requests.Response: The response.
+
+    Raises:
+        DeadlineExceededError: If the source has already run out of time.
+    """
+    if (deadline := source_deadline.get()) is not None:
+        remaining: float = deadline - time.monotonic()
+        if remaining <= 0:
+            msg: str = f"Deadline exceeded before GET {url}"
+            raise DeadlineExceededError(msg)
+        timeout = min(timeout, remaining)
+
+    response: requests.Response = session.get(url, timeout=timeout, **kwargs)
+    logger.debug(f"GET {url}: {response.status_code} - {response.reason}")
+    return response
+
+
+def post(url: str, timeout: float = 30, **kwargs: Any) -> requests.Response:  # noqa: ANN401
+    """Send a POST request with the shared session.
+
+    Args:
+        url: The URL to post to.
+        timeout: How many seconds to wait for the server.
+        **kwargs: Passed to requests, e.g. json or params.
+
+    Returns:
+        requests.Response: The response.
+    """
+    response: requests.Response = session.post(url, timeout=timeout, **kwargs)
+
+    # Only log the host, webhook URLs contain the token.
+    logger.debug(f"POST {urlsplit(url).netloc}: {response.status_code} - {response.reason}")
+    return response
+
+
+# The source that is being checked in this thread, set by main.fetch_games().
+current_source: ContextVar[str] = ContextVar("current_source", default="")
+
+# If each source had anything new the last time it was checked.
+source_changed: dict[str, bool] = {}
+
+
+def record_change(*, changed: bool) -> None:
+    """Remember if the current source got anything new.
+
+    A source that downloads several URLs has changed if any of them has.
+
+    Args:
+        changed: If the response was new.
+    """
+    if source := current_source.get():
+        source_changed[source] = source_changed.get(source, False) or changed
+
+
+def fingerprint(body: bytes) -> str:
+    """Get a fast, non-cryptographic fingerprint of a response body.
+
+    Args:
+        body: The response body.
+
+    Returns:
+        str: The length and CRC32 of the body.
+    """
+    return f"{len(body)}-{zlib.crc32(body):08x}"
+
+
+class ValidatorCache:
+    """The ETag, Last-Modified and body fingerprint we got for each URL, saved to a JSON file.
+
+    New validators are only saved with commit(), after the response has been handled.
+    If handling it failed we will download the whole response again next time.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Create the cache. The file is read the first time it is needed.
+
+        Args:
+            path: The JSON file the validators are saved in.
+        """
+        self.path: Path = Path(path)
+        self.lock = threading.Lock()
+        self.validators: dict[str, dict[str, str]] | None = None
+        self.pending: dict[str, dict[str, str]] = {}
+
+    def load(self) -> dict[str, dict[str, str]]:
+        """Read the validators from the file, once.
+
+        Returns:
+            dict[str, dict[str, str]]: The validators for each URL.
+        """
+        if self.validators is None:
+            self.validators = {}
+            if self.path.is_file():
+                try:
+                    self.validators = json.loads(self.path.read_text(encoding="utf-8"))
+                except ValueError:
+                    logger.warning(f"Could not read {self.path}, starting with an empty HTTP cache")
+        return self.validators
+
+    def headers(self, url: str) -> dict[str, str]:
+        """Get the conditional request headers for a URL.
+
+        Args:
+            url: The URL we are going to request.
+
+        Returns:
+            dict[str, str]: If-None-Match and If-Modified-Since, if we have them.
+        """
+        with self.lock:
+            validators: dict[str, str] = self.load().get(url, {})
+
+        headers: dict[str, str] = {}
+        if etag := validators.get("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := validators.get("last_modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def stage(self, url: str, response: requests.Response) -> None:
+        """Remember the validators of a response until commit() is called.
+
+        Args:
+            url: The URL that was requested.
+            response: The response from the server.
+        """
+        validators: dict[str, str] = {"fingerprint": fingerprint(response.content)}
+        if etag := response.headers.get("ETag"):
+            validators["etag"] = etag
+        if last_modified := response.headers.get("Last-Modified"):
+            validators["last_modified"] = last_modified
+
+        with self.lock:
+            self.pending[url] = validators
+
+    def stage_fingerprint(self, url: str, content: bytes) -> None:
+        """Remember the fingerprint of a body we put together ourselves until commit() is called.
+
+        Args:
+            url: The key to save the fingerprint under.
+            content: The body.
+        """
+        with self.lock:
+            self.pending[url] = {"fingerprint": fingerprint(content)}
+
+    def unchanged(self, url: str, content: bytes) -> bool:
+        """Check if the body is the same as the last one we handled.
+
+        Args:
+            url: The URL that was requested.
+            content: The body of the response.
+
+        Returns:
+            bool: True if the fingerprint is the same as last time.
+        """
+        with self.lock:
+            last_fingerprint: str = self.load().get(url, {}).get("fingerprint", "")
+        return last_fingerprint == fingerprint(content)
+
+    def commit(self, url: str) -> None:
+        """Save the staged validators for a URL to the file.
+
+        Args:
+            url: The URL that was requested.
+        """
+        with self.lock:
+            validators: dict[str, str] | None = self.pending.pop(url, None)
+            if validators is None:
+                return
+
+            self.load()[url] = validators
+            temporary_file: Path = self.path.with_suffix(".tmp")
+            temporary_file.write_text(json.dumps(self.load(), indent=4), encoding="utf-8")
+            temporary_file.replace(self.path)
+
+
+validator_cache = ValidatorCache(Path(settings.app_dir) / "http_cache.json")
+
+
+def get_if_modified(url: str, timeout: float = 30, **kwargs: Any) -> requests.Response | None:  # noqa: ANN401
+    """Send a conditional GET request with the validators from last time.
+
+    If the server doesn't answer 304 Not Modified, the body is compared against the
+    fingerprint of the last one. Call commit_validators() when the response has been handled.
+
+    Args:
+        url: The URL to get.
+        timeout: How many seconds to wait for the server.
+        **kwargs: Passed to requests, e.g. params.
+
+    Returns:
+        requests.Response | None: The response, or None if it hasn't changed since last time.
+    """
+    response: requests.Response = get(url, timeout=timeout, headers=validator_cache.headers(url), **kwargs)
+    if response.status_code == HTTP_NOT_MODIFIED:
+        logger.info(f"{url} has not changed since last time (304 Not Modified)")
+        record_change(changed=False)
+        return None
+
+    if response.ok:
+        if validator_cache.unchanged(url, response.content):
+            logger.info(f"{url} has not changed since last time (same fingerprint)")
+            record_change(changed=False)
+            return None
+
+        validator_cache.stage(url, response)
+
+    record_change(changed=True)
+    return response
+
+
+def changed_since_last_time(url: str, content: bytes) -> bool:
+    """Compare a body we put together ourselves, e.g. from several pages, against the fingerprint of the last one.
+
+    Call commit_validators() when the body has been handled.
+
+    Args:
+        url: The key to save the fingerprint under.
+        content: The body.
+
+    Returns:
+        bool: True if the body has changed since last time.
+    """
+    if validator_cache.unchanged(url, content):
+        logger.info(f"{url} has not changed since last time (same fingerprint)")
+        record_change(changed=False)
+        return False
+
+    validator_cache.stage_fingerprint(url, content)
+    record_change(changed=True)
+    return True
+
+
+def commit_validators(url: str) -> None:
+    """Save the validators from get_if_modified() so the next request can be conditional.
+
+    If the source ran out of time its games are thrown away, so the validators are too.
+    Otherwise we would get a 304 next time and never send those games.
+
+    Args:
+        url: The URL that was requested.
+    """
+    if deadline_exceeded():
+        logger.warning(f"Not saving the validators for {url}, the deadline has passed")
+        with validator_cache.lock:
+            validator_cache.pending.pop(url, None)
+        return
+
+    validator_cache.commit(url)
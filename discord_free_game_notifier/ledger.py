@@ -0,0 +1,494 @@
+"""SQLite ledger with every game we have sent to Discord.
+
+One row per (store, game ID, webhook).
+
+New games are first written to the outbox table. They are moved to the posted
+table when Discord has accepted them, so a failed webhook, or a restart, doesn't
+lose them. Games whose promotion hasn't started yet wait in the outbox until it
+does, so they are sent after a restart even if the store's response hasn't changed.
+Games Discord will never accept, e.g. for a deleted webhook, are moved
+to the rejected table instead, so they aren't sent again.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from discord_free_game_notifier import settings
+
+if TYPE_CHECKING:
+    from discord_free_game_notifier.models import FreeGame
+
+# The stores that used to have their own text file in the app directory.
+LEGACY_STORES: tuple[str, ...] = ("epic", "steam", "gog", "ubisoft")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posted (
+    store TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    webhook TEXT NOT NULL DEFAULT '',
+    promotion_start INTEGER,
+    promotion_end INTEGER,
+    posted_at INTEGER NOT NULL,
+    message_id TEXT,
+    PRIMARY KEY (store, game_id, webhook)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS posted_promotion_start ON posted (promotion_start);
+CREATE INDEX IF NOT EXISTS posted_promotion_end ON posted (promotion_end);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY,
+    imported_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    webhook TEXT NOT NULL,
+    game_service TEXT NOT NULL DEFAULT '',
+    embed TEXT NOT NULL,
+    promotion_start INTEGER,
+    promotion_end INTEGER,
+    created_at INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT '',
+    UNIQUE (store, game_id, webhook)
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt_at ON outbox (next_attempt_at);
+CREATE TABLE IF NOT EXISTS rejected (
+    store TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    webhook TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    rejected_at INTEGER NOT NULL,
+    PRIMARY KEY (store, game_id, webhook)
+) WITHOUT ROWID;
+"""
+
+# Wait 1, 2, 4... minutes before sending a failed message again, at most an hour.
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 3600
+# 2**6 minutes is more than an hour, a bigger exponent would only overflow.
+OUTBOX_MAX_BACKOFF_EXPONENT = 6
+# Give up on a game after about two days of failed messages, and move it to the rejected table.
+OUTBOX_MAX_ATTEMPTS = 50
+# The status code in the rejected table for games we gave up on, Discord never answered with a 4xx.
+GAVE_UP_STATUS_CODE = 0
+
+
+@dataclass(slots=True)
+class PostedGame:
+    """A game that has been sent to Discord."""
+
+    store: str
+    game_id: str
+    webhook: str = ""
+    promotion_start: int | None = None
+    promotion_end: int | None = None
+    posted_at: int = 0
+    message_id: str | None = None
+
+
+@dataclass(slots=True)
+class OutboxEntry:
+    """A game that is waiting to be sent to a webhook."""
+
+    id: int
+    store: str
+    game_id: str
+    webhook: str
+    game_service: str
+    embed: dict[str, Any]
+    promotion_start: int | None
+    promotion_end: int | None
+    attempts: int
+
+
+class Ledger:
+    """The games we have posted, stored in SQLite.
+
+    The keys are also kept in a set so lookups never have to touch the database.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open the ledger, creating the database if needed.
+
+        Args:
+            path: Where the SQLite database is stored.
+        """
+        self.path: Path = Path(path)
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        # The outbox didn't know which source found a game before withdraw() needed it.
+        if "source" not in {column for _, column, *_ in self.connection.execute("PRAGMA table_info(outbox)")}:
+            self.connection.execute("ALTER TABLE outbox ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+
+        self.posted: set[tuple[str, str]] = set(self.connection.execute("SELECT store, game_id FROM posted"))
+        logger.debug(f"Loaded {len(self.posted)} posted games from {self.path}")
+
+        # Games in the outbox, and the outbox rows that are being sent right now.
+        self.queued: set[tuple[str, str]] = set(self.connection.execute("SELECT store, game_id FROM outbox"))
+        self.in_flight: set[int] = set()
+
+    def already_posted(self, store: str, game_id: str) -> bool:
+        """Check if the game has already been posted to any webhook, or is waiting in the outbox.
+
+        Args:
+            store: The store the game is from, e.g. "epic".
+            game_id: The ID of the game in that store.
+
+        Returns:
+            bool: True if already has been posted.
+        """
+        with self.lock:
+            return (store, game_id) in self.posted or (store, game_id) in self.queued
+
+    def history(self, store: str = "", active_at: int | None = None) -> list[PostedGame]:
+        """Get the posted games, newest first.
+
+        Args:
+            store: Only get games from this store.
+            active_at: Only get games whose promotion was running at this Unix time.
+
+        Returns:
+            list[PostedGame]: The posted games.
+        """
+        query = "SELECT store, game_id, webhook, promotion_start, promotion_end, posted_at, message_id FROM posted WHERE 1"
+        parameters: list[str | int] = []
+        if store:
+            query += " AND store = ?"
+            parameters.append(store)
+        if active_at is not None:
+            query += " AND promotion_start <= ? AND promotion_end >= ?"
+            parameters.extend((active_at, active_at))
+        query += " ORDER BY posted_at DESC"
+
+        with self.lock:
+            rows: list[tuple] = self.connection.execute(query, parameters).fetchall()
+        return list(itertools.starmap(PostedGame, rows))
+
+    def import_text_file(self, store: str, previous_games: Path) -> int:
+        """Import one of the old text files with one posted game per line.
+
+        A file is only imported once, even if it still exists on the next start.
+
+        Args:
+            store: The store the games are from.
+            previous_games: The text file.
+
+        Returns:
+            int: How many games were imported.
+        """
+        previous_games = Path(previous_games)
+        if not previous_games.is_file():
+            return 0
+
+        with self.lock:
+            if self.connection.execute("SELECT 1 FROM imported_files WHERE name = ?", (previous_games.name,)).fetchone():
+                return 0
+
+        posted_at = int(previous_games.stat().st_mtime)
+        with Path.open(previous_games, "r", encoding="utf-8") as file:
+            game_ids: set[str] = {line.rstrip("\n") for line in file if line.strip()}
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO posted (store, game_id, posted_at) VALUES (?, ?, ?)",
+                [(store, game_id, posted_at) for game_id in game_ids],
+            )
+            self.connection.execute(
+                "INSERT INTO imported_files (name, imported_at) VALUES (?, ?)",
+                (previous_games.name, int(time.time())),
+            )
+            self.posted.update((store, game_id) for game_id in game_ids)
+
+        logger.info(f"Imported {len(game_ids)} posted games from {previous_games}")
+        return len(game_ids)
+
+    def add_to_outbox(self, games: list[FreeGame], webhook: str, game_service: str = "", source: str = "") -> int:
+        """Save games that should be sent to a webhook, before we try to send them.
+
+        Games whose promotion starts in the future aren't sent before it starts.
+
+        Games that are already in the outbox for the webhook, have been posted to it, or
+        were rejected by it, are skipped. This is checked in the same transaction, so two
+        sources that find the same game at the same time can't both post it. Games from
+        the old text files have no webhook and count as posted to every webhook, they are
+        looked up by the game's legacy_id when it has one.
+
+        Args:
+            games: The games.
+            webhook: The webhook URL.
+            game_service: The name of the game service (Steam/GOG/Epic)
+            source: The name of the source that found the games, for withdraw().
+
+        Returns:
+            int: How many games were added.
+        """
+        now = int(time.time())
+        added: int = 0
+        with self.lock, self.connection:
+            for game in games:
+                cursor: sqlite3.Cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO outbox"
+                    " (store, game_id, webhook, game_service, embed, promotion_start, promotion_end, created_at, next_attempt_at, source)"
+                    " SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?11"
+                    " WHERE NOT EXISTS (SELECT 1 FROM posted WHERE store = ?1 AND game_id = ?2 AND webhook IN (?3, ''))"
+                    " AND NOT EXISTS (SELECT 1 FROM posted WHERE store = ?1 AND game_id = ?10 AND webhook = '')"
+                    " AND NOT EXISTS (SELECT 1 FROM rejected WHERE store = ?1 AND game_id = ?2 AND webhook = ?3)",
+                    (
+                        game.store,
+                        game.game_id,
+                        webhook,
+                        game_service,
+                        json.dumps(game.embed.__dict__),
+                        game.promotion_start,
+                        game.promotion_end,
+                        now,
+                        game.promotion_start if (game.promotion_start or 0) > now else 0,
+                        game.legacy_id or game.game_id,
+                        source,
+                    ),
+                )
+                if cursor.rowcount:
+                    added += 1
+                    self.queued.add((game.store, game.game_id))
+        return added
+
+    def withdraw(self, source: str, games: list[FreeGame]) -> int:
+        """Remove the games waiting for their promotion to start that a source no longer returns.
+
+        Games the source returns with another start are removed too, so they are added
+        again with the new dates. Only for sources that return every game they know about.
+
+        Args:
+            source: The name of the source.
+            games: Every game the source returned this time.
+
+        Returns:
+            int: How many outbox rows were removed.
+        """
+        current: set[tuple[str, str, int | None]] = {(game.store, game.game_id, game.promotion_start) for game in games}
+        with self.lock, self.connection:
+            rows: list[tuple] = self.connection.execute(
+                "SELECT id, store, game_id, promotion_start FROM outbox WHERE source = ? AND attempts = 0 AND next_attempt_at > 0",
+                (source,),
+            ).fetchall()
+            withdrawn: list[tuple] = [row for row in rows if row[0] not in self.in_flight and tuple(row[1:]) not in current]
+            self.connection.executemany("DELETE FROM outbox WHERE id = ?", [(outbox_id,) for outbox_id, *_ in withdrawn])
+            for _, store, game_id, _ in withdrawn:
+                self.queued.discard((store, game_id))
+
+        if withdrawn:
+            logger.info(f"{source} no longer has {len(withdrawn)} upcoming games, or has changed their dates, not sending them")
+        return len(withdrawn)
+
+    def take_outbox(self) -> list[OutboxEntry]:
+        """Get the games in the outbox that are due, oldest first.
+
+        The games are not returned again until delivered(), delivery_failed() or release() is called.
+
+        Returns:
+            list[OutboxEntry]: The games to send.
+        """
+        with self.lock:
+            rows: list[tuple] = self.connection.execute(
+                "SELECT id, store, game_id, webhook, game_service, embed, promotion_start, promotion_end, attempts"
+                " FROM outbox WHERE next_attempt_at <= ? ORDER BY id",
+                (int(time.time()),),
+            ).fetchall()
+
+            entries: list[OutboxEntry] = []
+            for row in rows:
+                if row[0] in self.in_flight:
+                    continue
+                self.in_flight.add(row[0])
+                entries.append(OutboxEntry(*row[:5], json.loads(row[5]), *row[6:]))
+        return entries
+
+    def delivered(self, outbox_ids: list[int], message_id: str | None = None) -> None:
+        """Move games from the outbox to the posted games, after Discord accepted them.
+
+        Args:
+            outbox_ids: The outbox rows that were sent.
+            message_id: The ID of the Discord message.
+        """
+        now = int(time.time())
+        placeholders: str = ", ".join("?" * len(outbox_ids))
+        with self.lock, self.connection:
+            rows: list[tuple] = self.connection.execute(
+                f"SELECT store, game_id, webhook, promotion_start, promotion_end FROM outbox WHERE id IN ({placeholders})",  # noqa: S608
+                outbox_ids,
+            ).fetchall()
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO posted"
+                " (store, game_id, webhook, promotion_start, promotion_end, posted_at, message_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*row, now, message_id) for row in rows],
+            )
+            self.connection.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", outbox_ids)  # noqa: S608
+
+            self.in_flight.difference_update(outbox_ids)
+            for store, game_id, *_ in rows:
+                self.posted.add((store, game_id))
+                self.queued.discard((store, game_id))
+
+    def delivery_failed(self, outbox_ids: list[int]) -> None:
+        """Keep games in the outbox and try again later.
+
+        Games that have failed OUTBOX_MAX_ATTEMPTS times are moved to the rejected games.
+
+        Args:
+            outbox_ids: The outbox rows that could not be sent.
+        """
+        now = int(time.time())
+        placeholders: str = ", ".join("?" * len(outbox_ids))
+        with self.lock, self.connection:
+            query: str = (
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? + min(? * (1 << min(attempts, ?)), ?)"  # noqa: S608
+                f" WHERE id IN ({placeholders})"
+            )
+            self.connection.execute(query, [now, OUTBOX_RETRY_DELAY, OUTBOX_MAX_BACKOFF_EXPONENT, OUTBOX_MAX_RETRY_DELAY, *outbox_ids])
+            self.in_flight.difference_update(outbox_ids)
+
+            exhausted: list[int] = [
+                outbox_id
+                for (outbox_id,) in self.connection.execute(
+                    f"SELECT id FROM outbox WHERE attempts >= ? AND id IN ({placeholders})",  # noqa: S608
+                    [OUTBOX_MAX_ATTEMPTS, *outbox_ids],
+                )
+            ]
+            rows: list[tuple] = self.reject(exhausted, GAVE_UP_STATUS_CODE, now)
+
+        if rows:
+            logger.error(f"Could not send {', '.join(game_id for _, game_id, _ in rows)} in {OUTBOX_MAX_ATTEMPTS} tries, giving up")
+
+    def release(self, outbox_ids: list[int]) -> None:
+        """Let take_outbox() return games that were taken but never handed to Discord.
+
+        Args:
+            outbox_ids: The outbox rows that were taken.
+        """
+        with self.lock:
+            self.in_flight.difference_update(outbox_ids)
+
+    def delivery_rejected(self, outbox_ids: list[int], status_code: int) -> None:
+        """Move games Discord will never accept from the outbox to the rejected games.
+
+        Args:
+            outbox_ids: The outbox rows that were rejected.
+            status_code: The HTTP status code Discord answered with.
+        """
+        with self.lock, self.connection:
+            rows: list[tuple] = self.reject(outbox_ids, status_code, int(time.time()))
+
+        logger.error(f"Discord rejected {', '.join(game_id for _, game_id, _ in rows)} with {status_code}, not sending them again")
+
+    def reject(self, outbox_ids: list[int], status_code: int, now: int) -> list[tuple]:
+        """Move games from the outbox to the rejected games. The lock must be held.
+
+        Args:
+            outbox_ids: The outbox rows to move.
+            status_code: The HTTP status code Discord answered with, GAVE_UP_STATUS_CODE if we gave up.
+            now: The Unix time the games were rejected.
+
+        Returns:
+            list[tuple]: The (store, game_id, webhook) of the moved games.
+        """
+        if not outbox_ids:
+            return []
+
+        placeholders: str = ", ".join("?" * len(outbox_ids))
+        rows: list[tuple] = self.connection.execute(
+            f"SELECT store, game_id, webhook FROM outbox WHERE id IN ({placeholders})",  # noqa: S608
+            outbox_ids,
+        ).fetchall()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO rejected (store, game_id, webhook, status_code, rejected_at) VALUES (?, ?, ?, ?, ?)",
+            [(*row, status_code, now) for row in rows],
+        )
+        self.connection.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", outbox_ids)  # noqa: S608
+
+        self.in_flight.difference_update(outbox_ids)
+        for store, game_id, _ in rows:
+            self.queued.discard((store, game_id))
+        return rows
+
+    def upcoming_starts(self) -> list[int]:
+        """Get when the promotions of the games waiting in the outbox start.
+
+        Returns:
+            list[int]: The Unix times in the future, in order.
+        """
+        with self.lock:
+            rows: list[tuple[int]] = self.connection.execute(
+                "SELECT DISTINCT next_attempt_at FROM outbox WHERE attempts = 0 AND next_attempt_at > ? ORDER BY next_attempt_at",
+                (int(time.time()),),
+            ).fetchall()
+        return [start for (start,) in rows]
+
+    def outbox_size(self) -> int:
+        """Get how many games are waiting in the outbox.
+
+        Returns:
+            int: The number of games.
+        """
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self.lock:
+            self.connection.close()
+
+
+ledger: Ledger | None = None
+ledger_lock = threading.Lock()
+
+
+def open_ledger(path: Path) -> Ledger:
+    """Open the ledger that already_posted() and the outbox use.
+
+    Args:
+        path: Where the SQLite database is stored.
+
+    Returns:
+        Ledger: The opened ledger.
+    """
+    global ledger  # noqa: PLW0603
+    if ledger is not None:
+        ledger.close()
+
+    ledger = Ledger(path)
+    return ledger
+
+
+def get_ledger() -> Ledger:
+    """Get the ledger in the app directory, opening it on first use.
+
+    The first time, the old text files (epic.txt, steam.txt...) are imported.
+
+    Returns:
+        Ledger: The ledger.
+    """
+    with ledger_lock:
+        if ledger is not None:
+            return ledger
+
+        opened: Ledger = open_ledger(Path(settings.app_dir) / "ledger.sqlite3")
+        for store in LEGACY_STORES:
+            opened.import_text_file(store, Path(settings.app_dir) / f"{store}.txt")
+        return opened
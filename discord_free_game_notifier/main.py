@@ -1,28 +1,41 @@
 from __future__ import annotations
 
+import contextlib
 import datetime
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
 from typing import TYPE_CHECKING
 
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, JobExecutionEvent
 from apscheduler.schedulers.blocking import BlockingScheduler
+from discord_webhook import DiscordEmbed
 from loguru import logger
 
-from discord_free_game_notifier import settings
+from discord_free_game_notifier import http_client, settings
+from discord_free_game_notifier.breaker import breakers
+from discord_free_game_notifier.delivery import DeliveryQueue
 from discord_free_game_notifier.epic import get_free_epic_games
-from discord_free_game_notifier.epic_json import scrape_epic_json
+from discord_free_game_notifier.feeds import FEEDS, get_feed_games
 from discord_free_game_notifier.gog import (
     get_free_gog_game,
     get_free_gog_game_from_store,
 )
+from discord_free_game_notifier.ledger import get_ledger
+from discord_free_game_notifier.models import Source
+from discord_free_game_notifier.scheduler import HOT_INTERVAL, PollSchedule, epic_rotations
 from discord_free_game_notifier.steam import get_free_steam_games
-from discord_free_game_notifier.steam_json import scrape_steam_json
-from discord_free_game_notifier.ubisoft import get_ubisoft_free_games
-from discord_free_game_notifier.webhook import send_embed_webhook, send_webhook
+from discord_free_game_notifier.tenants import router
+from discord_free_game_notifier.webhook import batch_embeds, get_webhook_urls
 
 if TYPE_CHECKING:
-    from discord_webhook import DiscordEmbed
     from requests import Response
 
+    from discord_free_game_notifier.delivery import Delivery, QueueStats
+    from discord_free_game_notifier.ledger import OutboxEntry
+    from discord_free_game_notifier.models import FreeGame
+
 sched = BlockingScheduler()
 
 
@@ -32,96 +45,413 @@ def my_listener(event: JobExecutionEvent) -> None:
         logger.error("Job failed: {}", event.exception)
 
 
-def send_games(game: DiscordEmbed | None, game_service: str = "Unknown") -> None:
-    """Send the embed to Discord.
+def report_failure(delivery: Delivery, response: Response | None) -> None:
+    """Send a message to the webhook when a message could not be sent.
 
     Args:
-        game: The embed.
-        game_service: The name of the game service (Steam/GOG/Epic)
+        delivery: The message that failed.
+        response: The response from Discord, None if we couldn't connect.
     """
-    if game:
-        response: Response = send_embed_webhook(game, game_service)
-
-        if not response.ok:
-            msg: str = f"Error when checking game for {game_service}:\n{response.status_code} - {response.reason}: {response.text}"
-            logger.error(msg)
-            send_webhook(msg)
+    if response is None:
+        msg: str = f"Error when sending games for {delivery.game_service}: could not connect to Discord"
     else:
+        msg = f"Error when checking game for {delivery.game_service}:\n{response.status_code} - {response.reason}: {response.text}"
+    logger.error(msg)
+
+    # The games stay in the outbox and are sent again later.
+    if delivery.outbox_ids:
+        get_ledger().delivery_failed(delivery.outbox_ids)
+
+    # Don't report errors about error messages, or we could loop forever.
+    if "content" not in delivery.payload and settings.webhook_url:
+        delivery_queue.put(settings.webhook_url, {"content": msg})
+
+
+def mark_delivered(delivery: Delivery, response: Response) -> None:
+    """Move the games in a message from the outbox to the posted games.
+
+    Args:
+        delivery: The message Discord accepted.
+        response: The response from Discord, with the message we created.
+    """
+    if not delivery.outbox_ids:
+        return
+
+    message_id: str | None = None
+    with contextlib.suppress(ValueError, AttributeError):
+        message_id = response.json().get("id")
+
+    get_ledger().delivered(delivery.outbox_ids, message_id)
+
+
+def reject_delivery(delivery: Delivery, response: Response) -> None:
+    """Stop sending a message Discord will never accept, e.g. for a deleted webhook.
+
+    Args:
+        delivery: The message that was rejected.
+        response: The 4xx response from Discord.
+    """
+    msg: str = f"Discord rejected the games for {delivery.game_service}:\n{response.status_code} - {response.reason}: {response.text}"
+    logger.error(msg)
+
+    if delivery.outbox_ids:
+        get_ledger().delivery_rejected(delivery.outbox_ids, response.status_code)
+
+    # Don't report errors about error messages, or we could loop forever.
+    if "content" not in delivery.payload and settings.webhook_url:
+        delivery_queue.put(settings.webhook_url, {"content": msg})
+
+
+delivery_queue = DeliveryQueue(on_failure=report_failure, on_success=mark_delivered, on_rejected=reject_delivery)
+
+
+def send_games(games: list[FreeGame], game_service: str = "Unknown", source_name: str = "") -> None:
+    """Save the games to the outbox for every webhook that wants them and queue them for Discord.
+
+    Each webhook has its own outbox rows, so a webhook that fails doesn't make us send
+    the games again to the others. The messages are sent by the delivery workers, this
+    returns right away.
+
+    Args:
+        games: The free games.
+        game_service: The name of the game service (Steam/GOG/Epic)
+        source_name: The name of the source that found the games.
+    """
+    if not games:
         logger.bind(game_name=f"{game_service}").info("No free games found")
+        return
 
+    # Every webhook of the store gets every game, the tenants only the games that pass their filters.
+    everything: list[str] = get_webhook_urls(game_service)
+    routes: dict[str, list[FreeGame]] = dict.fromkeys(everything, games)
+    for game in games:
+        for webhook_url in router.webhooks(game):
+            if webhook_url not in everything:
+                routes.setdefault(webhook_url, []).append(game)
 
-def check_free_games() -> None:  # noqa: C901, PLR0912
-    """Check for free games on Epic, Steam, GOG and Ubisoft and send them to Discord."""
-    logger.info("Checking for free games")
+    for webhook_url, routed in routes.items():
+        get_ledger().add_to_outbox(routed, webhook_url, game_service, source_name)
+    drain_outbox()
 
-    try:
-        for game in get_free_epic_games():
-            send_games(game, "Epic")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking Epic for free games: {e}"
-        logger.error(msg)
 
-    try:
-        for game in get_free_steam_games():
-            send_games(game, "Steam")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking Steam for free games: {e}"
-        logger.error(msg)
+def drain_outbox() -> int:
+    """Queue the games in the outbox that are due, up to 10 in each message.
 
-    try:
-        for game in get_free_gog_game_from_store():
-            send_games(game, "GOG")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking GOG (search page) for free games: {e}"
-        logger.error(msg)
+    Returns:
+        int: How many games were queued.
+    """
+    entries: list[OutboxEntry] = get_ledger().take_outbox()
 
-    try:
-        if gog_embed := get_free_gog_game():
-            send_games(gog_embed, "GOG")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking GOG (front page) free games: {e}"
-        logger.error(msg)
+    groups: dict[tuple[str, str], list[OutboxEntry]] = {}
+    for entry in entries:
+        groups.setdefault((entry.webhook, entry.game_service), []).append(entry)
 
+    queued: set[int] = set()
     try:
-        for game in get_ubisoft_free_games():
-            send_games(game, "Ubisoft")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking Ubisoft for free games: {e}"
-        logger.error(msg)
+        for (webhook_url, game_service), group in groups.items():
+            embeds: list[DiscordEmbed] = [DiscordEmbed(**entry.embed) for entry in group]
+
+            # batch_embeds() keeps the order, so the outbox rows are in the same batches.
+            start: int = 0
+            for batch in batch_embeds(embeds):
+                outbox_ids: list[int] = [entry.id for entry in group[start : start + len(batch)]]
+                start += len(batch)
+                delivery_queue.put(webhook_url, {"embeds": [embed.__dict__ for embed in batch]}, game_service, outbox_ids)
+                queued.update(outbox_ids)
+    finally:
+        # If something went wrong, the games that never reached the queue are taken again next time.
+        get_ledger().release([entry.id for entry in entries if entry.id not in queued])
+
+    return len(entries)
+
+
+def get_free_gog_front_page_game() -> list[FreeGame | None]:
+    """Get the GOG giveaway from the front page.
+
+    Returns:
+        list[FreeGame | None]: The giveaway, in a list like the other sources return.
+    """
+    return [get_free_gog_game()]
+
+
+# The JSON feeds are updated by hand and change rarely, GOG giveaways come in bursts.
+sources: list[Source] = [
+    Source("Epic", "Epic", get_free_epic_games, rotations=epic_rotations, complete=True),
+    Source("Steam", "Steam", get_free_steam_games),
+    Source("GOG (search page)", "GOG", get_free_gog_game_from_store, interval=10 * 60, max_interval=30 * 60),
+    Source("GOG (front page)", "GOG", get_free_gog_front_page_game, interval=10 * 60, max_interval=30 * 60),
+    *[Source(feed.name, feed.game_service, partial(get_feed_games, feed), interval=30 * 60, max_interval=6 * 60 * 60) for feed in FEEDS],
+]
+
+poll_schedule = PollSchedule()
+
+# The workers are shared by every cycle. A source that is abandoned keeps its worker until
+# it returns, and isn't started again until then, so stuck checks can't pile up.
+source_pool = ThreadPoolExecutor(max_workers=settings.max_workers, thread_name_prefix="source")
+running: dict[str, Future[list[FreeGame]]] = {}
+
+
+def schedule_upcoming(starts: list[int]) -> None:
+    """Add a one-shot job for each time a promotion starts, to send the games waiting for it.
+
+    The games are saved in the outbox, so the jobs can be added again after a restart.
+
+    Args:
+        starts: The Unix times the promotions start.
+    """
+    now: float = time.time()
+    for promotion_start in sorted(set(starts)):
+        if promotion_start <= now:
+            continue
+
+        start: datetime.datetime = datetime.datetime.fromtimestamp(promotion_start, tz=datetime.UTC)
+        sched.add_job(
+            post_upcoming,
+            "date",
+            run_date=start,
+            id=f"upcoming-{promotion_start}",
+            replace_existing=True,
+            misfire_grace_time=None,
+        )
+        logger.info(f"Will send the games that start at {start.isoformat()} then")
+
+
+def post_upcoming() -> None:
+    """Send the games whose promotion has just started, with the embeds we already have.
+
+    The sources that return every game are checked first, so a promotion the store has
+    withdrawn or moved since we saw it is removed from the outbox before it is sent.
+    """
+    logger.info("Promotion has started, checking the stores again before sending the games")
+    check_free_games([source for source in sources if source.complete])
+
+
+@dataclass(slots=True)
+class CycleReport:
+    """What happened when the due sources were checked."""
+
+    checked: list[str] = field(default_factory=list)
+    games: dict[str, int] = field(default_factory=dict)
+    failed: dict[str, str] = field(default_factory=dict)
+    timed_out: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    still_running: list[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    def summary(self) -> str:
+        """Describe the cycle in one line for the log.
+
+        Returns:
+            str: The summary.
+        """
+        summary: str = f"Checked {len(self.checked)} sources in {self.duration:.1f}s, found {sum(self.games.values())} games."
+        if self.failed:
+            summary += f" Failed: {', '.join(self.failed)}."
+        if self.timed_out:
+            summary += f" Deadline exceeded: {', '.join(self.timed_out)}."
+        if self.skipped:
+            summary += f" Circuit open: {', '.join(self.skipped)}."
+        if self.still_running:
+            summary += f" Still running from an earlier cycle: {', '.join(self.still_running)}."
+        return summary
+
+
+def fetch_games(source: Source, deadline: float, started: dict[str, float]) -> list[FreeGame]:
+    """Get all the free games from a source.
+
+    This runs in a worker thread, so it must not send anything to Discord.
+    The result and how long it took are given to the source's circuit breaker.
+
+    Args:
+        source: The source to check.
+        deadline: When the whole cycle has to be done, in time.monotonic().
+        started: When each source started, so check_free_games() knows its deadline.
+
+    Returns:
+        list[FreeGame]: The new free games.
+    """
+    start: float = time.monotonic()
+    started[source.name] = start
+    http_client.current_source.set(source.name)
+    http_client.source_deadline.set(min(deadline, start + settings.source_timeout))
+    http_client.source_changed.pop(source.name, None)
 
     try:
-        for game in scrape_epic_json():
-            send_games(game, "Epic")
-    except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking Epic (JSON) for free games: {e}"
-        logger.error(msg)
+        games: list[FreeGame] = [game for game in source.get_games() if game]
+    except Exception:
+        # check_free_games() has already counted it when the deadline passed.
+        if not http_client.deadline_exceeded():
+            breakers.record_failure(source.name, time.monotonic() - start)
+        raise
 
+    if not http_client.deadline_exceeded():
+        breakers.record_success(source.name, time.monotonic() - start)
+    return games
+
+
+def handle_games(source: Source, future: Future[list[FreeGame]], report: CycleReport) -> None:
+    """Send the games from a source that is done, and schedule its next check.
+
+    Args:
+        source: The source.
+        future: The finished fetch_games() call.
+        report: The report of this cycle.
+    """
     try:
-        for game in scrape_steam_json():
-            send_games(game, "Steam")
+        games: list[FreeGame] = future.result()
     except Exception as e:  # noqa: BLE001
-        msg: str = f"Error when checking Steam (JSON) for free games: {e}"
+        msg: str = f"Error when checking {source.name} for free games: {e}"
         logger.error(msg)
+        report.failed[source.name] = str(e)
+        poll_schedule.record(source, changed=False)
+        return
+
+    changed: bool = http_client.source_changed.get(source.name, True)
+    if changed:
+        logger.bind(game_name=source.name).info("Reparsed, the response had changed")
+    else:
+        logger.bind(game_name=source.name).info("Skipped, nothing has changed since last time")
+
+    # Games that haven't started wait in the outbox, check the store around the start too in case the promotion changed.
+    now: float = time.time()
+    starts: list[int] = [game.promotion_start for game in games if game.promotion_start and game.promotion_start > now]
+    schedule_upcoming(starts)
+    poll_schedule.add_hot_times(source.game_service.lower(), [*starts, *(game.promotion_end for game in games)])
+    next_run: float = poll_schedule.record(source, changed=changed)
+    logger.bind(game_name=source.name).info(f"Checking again in {next_run - time.time():.0f} seconds")
+
+    # A source that has changed has told us about every game it still has.
+    if source.complete and changed:
+        get_ledger().withdraw(source.name, games)
+
+    report.games[source.name] = len(games)
+    send_games(games, source.game_service, source.name)
+
+
+def update_hot_times() -> None:
+    """Tell the poll schedule when the promotions we have posted end, the stores usually have new games then."""
+    now = int(time.time())
+    for game in get_ledger().history(active_at=now):
+        poll_schedule.add_hot_times(game.store, [game.promotion_end])
+
+
+def check_due_sources() -> None:
+    """Check the sources whose poll schedule says they are due."""
+    if due := poll_schedule.due(sources):
+        check_free_games(due)
+
+
+def check_free_games(selected: list[Source] | None = None) -> CycleReport:
+    """Check for free games on Epic, Steam, GOG and Ubisoft and send them to Discord.
+
+    All sources are fetched at the same time. The games are sent from this thread as soon
+    as their source is done, so a slow store doesn't hold back the others.
+
+    A source that takes longer than SOURCE_TIMEOUT, or is still running when CYCLE_TIMEOUT
+    is up, is abandoned. Its worker may keep running in the background, but what it finds
+    is thrown away and it doesn't save its HTTP validators. The source isn't checked again
+    until that worker is done.
+
+    Args:
+        selected: The sources to check, defaults to all of them.
+
+    Returns:
+        CycleReport: What happened to each source.
+    """
+    start: float = time.monotonic()
+    report = CycleReport()
+    selected = sources if selected is None else selected
+    report.skipped = [source.name for source in selected if not breakers.allow(source.name)]
+    for source in selected:
+        if source.name in report.skipped:
+            poll_schedule.postpone(source, breakers.state(source.name).retry_at())
+    report.still_running = [source.name for source in selected if source.name in running and not running[source.name].done()]
+    selected = [source for source in selected if source.name not in report.skipped and source.name not in report.still_running]
+    report.checked = [source.name for source in selected]
+    logger.info(f"Checking for free games on {', '.join(report.checked) or 'no sources'}")
+
+    # Open the ledger before the workers need it.
+    get_ledger()
+    update_hot_times()
+
+    cycle_deadline: float = start + settings.cycle_timeout
+    started: dict[str, float] = {}
+    futures: dict[Future[list[FreeGame]], Source] = {
+        source_pool.submit(fetch_games, source, cycle_deadline, started): source for source in selected
+    }
+    running.update({source.name: future for future, source in futures.items()})
+
+    def deadline(source: Source) -> float:
+        """Get when we stop waiting for a source.
+
+        Args:
+            source: The source.
+
+        Returns:
+            float: The monotonic time. SOURCE_TIMEOUT after the source started, but never after the cycle deadline.
+        """
+        if source.name in started:
+            return min(cycle_deadline, started[source.name] + settings.source_timeout)
+        return cycle_deadline
+
+    pending: set[Future[list[FreeGame]]] = set(futures)
+    while pending:
+        timeout: float = max(0.0, min(deadline(futures[future]) for future in pending) - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            handle_games(futures[future], future, report)
+
+        now: float = time.monotonic()
+        for future in [future for future in pending if deadline(futures[future]) <= now]:
+            source: Source = futures[future]
+            pending.discard(future)
+            # A source that hasn't started yet is cancelled, one that is stuck keeps its worker.
+            future.cancel()
+            logger.bind(game_name=source.name).error("Deadline exceeded, throwing away the results")
+            report.timed_out.append(source.name)
+            breakers.record_failure(source.name, now - started.get(source.name, start))
+            poll_schedule.record(source, changed=False)
+
+    # Send the games that failed in an earlier cycle and are due again.
+    if retried := drain_outbox():
+        logger.info(f"Sending {retried} games from the outbox again")
+
+    stats: QueueStats = delivery_queue.stats()
+    logger.info(
+        f"Delivery queue: {stats.depth} messages waiting, oldest for {stats.oldest_wait:.1f}s."
+        f" {stats.sent} sent to {stats.webhooks} webhooks, waited {stats.average_wait:.1f}s on average."
+        f" {get_ledger().outbox_size()} games in the outbox",
+    )
+
+    report.duration = time.monotonic() - start
+    logger.info(report.summary())
+    return report
 
 
 def main() -> None:
     """Main function for discord_free_game_notifier.
 
-    This function will check for free games every 15 minutes.
+    Every minute we check the sources that are due. Each source has its own interval,
+    see scheduler.py.
     """
     logger.info(
-        "Starting discord_free_game_notifier, checking for free games every 15 minutes",
+        "Starting discord_free_game_notifier, checking each store on its own schedule",
     )
     sched.add_listener(my_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
 
     logger.info("Adding job to scheduler")
     sched.add_job(
-        check_free_games,
-        "cron",
-        minute="*/15",
+        check_due_sources,
+        "interval",
+        seconds=HOT_INTERVAL,
         replace_existing=True,
+        coalesce=True,
+        max_instances=1,
         next_run_time=datetime.datetime.now(tz=datetime.UTC),
     )
+    # The games that are waiting for their promotion to start are in the outbox.
+    schedule_upcoming(get_ledger().upcoming_starts())
+
     logger.info("Starting scheduler")
     sched.start()
 
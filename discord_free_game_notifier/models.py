@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from discord_webhook import DiscordEmbed
+
+
+@dataclass(slots=True)
+class FreeGame:
+    """A free game found by one of the scrapers, ready to be sent to Discord.
+
+    The game is only saved as posted after Discord has accepted the embed.
+    """
+
+    store: str
+    game_id: str
+    embed: DiscordEmbed
+    promotion_start: int | None = None
+    promotion_end: int | None = None
+
+    # What the subscription filters look at, empty or None when the store doesn't tell us.
+    offer_type: str = ""
+    original_price: int | None = None
+    seller: str = ""
+
+    # The countries the game is free in, empty when the store doesn't tell us.
+    regions: tuple[str, ...] = ()
+
+    # What the old text files called the game, when it isn't the game ID, e.g. the title of an Epic offer.
+    legacy_id: str = ""
+
+    @property
+    def name(self) -> str:
+        """Get the name of the game, as shown in Discord.
+
+        Returns:
+            str: The name.
+        """
+        author: dict | None = self.embed.author
+        return author.get("name", self.game_id) if author else self.game_id
+
+
+# The offer types the scrapers give a game, so the subscription filters don't need to know each store's names.
+OFFER_TYPE_GAME = "game"
+OFFER_TYPE_DLC = "dlc"
+OFFER_TYPE_BUNDLE = "bundle"
+
+
+@dataclass(frozen=True, slots=True)
+class Source:
+    """A place we check for free games, and how often we check it."""
+
+    name: str
+    game_service: str
+    get_games: Callable[[], Iterable[FreeGame | None]]
+
+    # Seconds between checks, growing up to max_interval while nothing changes.
+    interval: float = 15 * 60
+    max_interval: float = 60 * 60
+
+    # Gets the Unix times around a given time when the store usually has new games.
+    rotations: Callable[[float], list[float]] | None = None
+
+    # The source returns every game it knows about, also the ones we have posted, so a game
+    # waiting for its promotion to start that it no longer returns has been withdrawn.
+    complete: bool = False
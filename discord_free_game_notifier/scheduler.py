@@ -0,0 +1,192 @@
+"""Decide when each source should be checked again.
+
+Every source has its own interval. When a source hasn't changed since last time the
+interval grows, up to a maximum, and when it changes it goes back to the normal one.
+Around the times we expect new games, Epic's weekly rotation and when known
+promotions start or end, sources are checked every minute. A bit of jitter is added
+so we don't hit the stores at the exact same second every time.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytz
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from discord_free_game_notifier.models import Source
+
+# How often sources are checked around an expected rotation.
+HOT_INTERVAL = 60
+
+# How long before and after an expected rotation we check that often.
+HOT_WINDOW_BEFORE = 60
+HOT_WINDOW_AFTER = 10 * 60
+
+# How much the interval grows every time a source hasn't changed.
+BACKOFF_FACTOR = 1.5
+
+# Up to this part of the interval is added as jitter.
+JITTER = 0.1
+
+# Epic switches the free games on Thursdays at 11:00 in New York.
+EPIC_TIMEZONE = pytz.timezone("America/New_York")
+EPIC_ROTATION_WEEKDAY = 3
+EPIC_ROTATION_HOUR = 11
+
+
+def epic_rotations(now: float) -> list[float]:
+    """Get the Epic rotations in the week before, the week of and the week after a time.
+
+    Args:
+        now: The Unix time.
+
+    Returns:
+        list[float]: The Unix times of the rotations.
+    """
+    local: datetime = datetime.fromtimestamp(now, tz=EPIC_TIMEZONE)
+    days_ahead: int = (EPIC_ROTATION_WEEKDAY - local.weekday()) % 7
+    rotation: datetime = (local.replace(tzinfo=None) + timedelta(days=days_ahead)).replace(
+        hour=EPIC_ROTATION_HOUR,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+    return [EPIC_TIMEZONE.localize(rotation + timedelta(weeks=weeks)).timestamp() for weeks in (-1, 0, 1)]
+
+
+@dataclass(slots=True)
+class SourceSchedule:
+    """When a source is checked next, and how long we wait when it hasn't changed."""
+
+    interval: float
+    next_run: float = 0.0
+    last_change: float = 0.0
+
+
+@dataclass
+class PollSchedule:
+    """The schedule of every source, and the times we expect new games for each store."""
+
+    rng: random.Random = field(default_factory=random.Random)
+    schedules: dict[str, SourceSchedule] = field(default_factory=dict)
+    hot_times: dict[str, set[float]] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def schedule(self, source: Source) -> SourceSchedule:
+        """Get the schedule of a source. New sources are due right away.
+
+        Args:
+            source: The source.
+
+        Returns:
+            SourceSchedule: The schedule.
+        """
+        return self.schedules.setdefault(source.name, SourceSchedule(interval=source.interval))
+
+    def add_hot_times(self, store: str, times: Iterable[float | None]) -> None:
+        """Remember when we expect new games from a store, e.g. when a promotion ends.
+
+        Args:
+            store: The store, e.g. "epic".
+            times: Unix times, None is ignored.
+        """
+        oldest: float = time.time() - HOT_WINDOW_AFTER
+        with self.lock:
+            store_times: set[float] = self.hot_times.setdefault(store, set())
+            store_times.update(hot_time for hot_time in times if hot_time and hot_time > oldest)
+            store_times.difference_update({hot_time for hot_time in store_times if hot_time <= oldest})
+
+    def expected_rotations(self, source: Source, now: float) -> list[float]:
+        """Get the times we expect new games from a source.
+
+        Args:
+            source: The source.
+            now: The Unix time.
+
+        Returns:
+            list[float]: The Unix times, in order.
+        """
+        rotations: set[float] = set(self.hot_times.get(source.game_service.lower(), ()))
+        if source.rotations:
+            rotations.update(source.rotations(now))
+        return sorted(rotations)
+
+    def is_hot(self, source: Source, now: float) -> bool:
+        """Check if we are close to a time we expect new games, and haven't seen them yet.
+
+        Args:
+            source: The source.
+            now: The Unix time.
+
+        Returns:
+            bool: True if the source should be checked every minute.
+        """
+        last_change: float = self.schedule(source).last_change
+        return any(
+            rotation - HOT_WINDOW_BEFORE <= now <= rotation + HOT_WINDOW_AFTER and last_change < rotation
+            for rotation in self.expected_rotations(source, now)
+        )
+
+    def due(self, sources: Iterable[Source], now: float | None = None) -> list[Source]:
+        """Get the sources that should be checked now.
+
+        Args:
+            sources: All the sources.
+            now: The Unix time, defaults to now.
+
+        Returns:
+            list[Source]: The sources to check.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            return [source for source in sources if self.schedule(source).next_run <= now]
+
+    def postpone(self, source: Source, until: float) -> None:
+        """Don't check a source before a time, e.g. while its circuit breaker is open.
+
+        Args:
+            source: The source.
+            until: The Unix time.
+        """
+        with self.lock:
+            self.schedule(source).next_run = until
+
+    def record(self, source: Source, *, changed: bool, now: float | None = None) -> float:
+        """Schedule the next check of a source after it has been checked.
+
+        Args:
+            source: The source that was checked.
+            changed: If the source had anything new.
+            now: The Unix time, defaults to now.
+
+        Returns:
+            float: The Unix time of the next check.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            schedule: SourceSchedule = self.schedule(source)
+            if changed:
+                schedule.interval = source.interval
+                schedule.last_change = now
+            else:
+                schedule.interval = min(schedule.interval * BACKOFF_FACTOR, source.max_interval)
+
+            interval: float = HOT_INTERVAL if self.is_hot(source, now) else schedule.interval
+            next_run: float = now + interval + self.rng.uniform(0, interval * JITTER)
+
+            # Don't sleep through the next rotation.
+            for rotation in self.expected_rotations(source, now):
+                if now < rotation - HOT_WINDOW_BEFORE < next_run:
+                    next_run = rotation - HOT_WINDOW_BEFORE
+                    break
+
+            schedule.next_run = next_run
+            return next_run
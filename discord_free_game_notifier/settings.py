@@ -59,6 +59,41 @@ steam_webhook: str = os.getenv("STEAM_WEBHOOK", "")
 epic_webhook: str = os.getenv("EPIC_WEBHOOK", "")
 ubisoft_webhook: str = os.getenv("UBISOFT_WEBHOOK", "")
 
+# The countries we get Epic's free games for, some giveaways are only in some regions.
+epic_countries: list[str] = [country.strip().upper() for country in os.getenv("EPIC_COUNTRIES", "US").split(",") if country.strip()] or [
+    "US"
+]
+
+# How many stores we check at the same time.
+max_workers: int = int(os.getenv("MAX_WORKERS", "4"))
+
+# How many seconds a check of all the due sources, and of one source, may take.
+cycle_timeout: float = float(os.getenv("CYCLE_TIMEOUT", "600"))
+source_timeout: float = float(os.getenv("SOURCE_TIMEOUT", "120"))
+
+# How many webhook messages we send at the same time. Each webhook only gets one at a time.
+delivery_workers: int = int(os.getenv("DELIVERY_WORKERS", "8"))
+
+# More webhooks for each store, e.g. for other Discord servers. One URL per line:
+# [epic]
+# webhooks =
+#     https://discord.com/api/webhooks/1234/abc
+#     https://discord.com/api/webhooks/5678/def
+#
+# Sections named "tenant <name>" only get the games that match their filters, see tenants.py.
+webhooks_file: Path = Path(os.getenv("WEBHOOKS_FILE", str(Path(app_dir) / "webhooks.conf")))
+webhooks_config = configparser.ConfigParser()
+subscriptions: dict[str, list[str]] = {}
+
+if webhooks_file.exists():
+    webhooks_config.read(webhooks_file)
+    subscriptions = {
+        store.lower(): webhooks_config.get(store, "webhooks", fallback="").split()
+        for store in webhooks_config.sections()
+        if not store.lower().startswith("tenant ")
+    }
+    logger.info(f"Loaded {sum(map(len, subscriptions.values()))} webhooks from {webhooks_file}")
+
 if not webhook_url:
     if gog_webhook:
         logger.info("Will be sending GOG games to Discord.")
@@ -68,7 +103,10 @@ if not webhook_url:
         logger.info("Will be sending Epic Games to Discord.")
     if ubisoft_webhook:
         logger.info("Will be sending Ubisoft games to Discord.")
-    if not gog_webhook and not steam_webhook and not epic_webhook:
+    if subscriptions:
+        logger.info(f"Will be sending games to the webhooks in {webhooks_file}.")
+    has_tenants: bool = any(section.lower().startswith("tenant ") for section in webhooks_config.sections())
+    if not any((gog_webhook, steam_webhook, epic_webhook, ubisoft_webhook, *subscriptions.values(), has_tenants)):
         msg: str = "Please set the WEBHOOK_URL environment variable."
         logger.critical(msg)
         sys.exit(1)
@@ -1,40 +1,149 @@
 from __future__ import annotations
 
-from pathlib import Path
+import re
 from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
 
 import requests
-from bs4 import BeautifulSoup, ResultSet, Tag
 from discord_webhook import DiscordEmbed
 from loguru import logger
 
-from discord_free_game_notifier import settings
+from discord_free_game_notifier import html_parser, http_client, settings
+from discord_free_game_notifier.models import OFFER_TYPE_BUNDLE, FreeGame
 from discord_free_game_notifier.utils import already_posted
 from discord_free_game_notifier.webhook import send_embed_webhook
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Generator, Iterator
 
+    from bs4 import ResultSet, Tag
 
-def get_free_steam_games() -> Generator[DiscordEmbed, Any, None]:
+STEAM_SEARCH_URL = "https://store.steampowered.com/search/?maxprice=free&specials=1"
+
+# The same search, but as JSON with only the name and logo of each result.
+STEAM_SEARCH_JSON_URL = "https://store.steampowered.com/search/results/"
+STEAM_SEARCH_PAGE_SIZE = 50
+
+# There are never this many free games, but we don't want to loop forever if the API misbehaves.
+STEAM_SEARCH_MAX_PAGES = 20
+
+# https://shared.cloudflare.steamstatic.com/store_item_assets/steam/apps/1234/capsule_sm_120.jpg
+STEAM_LOGO_ID = re.compile(r"/(apps|subs|bundles)/(\d+)/")
+STEAM_STORE_PATHS: dict[str, str] = {"apps": "app", "subs": "sub", "bundles": "bundle"}
+
+
+def search_url(start: int) -> str:
+    """Get the URL of a page of free games from Steam's search in JSON mode.
+
+    Args:
+        start: How many results to skip.
+
+    Returns:
+        str: The URL.
+    """
+    parameters: dict[str, str | int] = {"maxprice": "free", "specials": 1, "json": 1, "start": start, "count": STEAM_SEARCH_PAGE_SIZE}
+    return f"{STEAM_SEARCH_JSON_URL}?{urlencode(parameters)}"
+
+
+def search_result_game(item: dict) -> FreeGame | None:
+    """Create the free game for one search result, reading only its name and logo.
+
+    The logo URL has the app ID, which gives us the store page and header image.
+
+    Args:
+        item: The search result, {"name": ..., "logo": ...}.
+
+    Returns:
+        FreeGame | None: The game, None if it has already been posted.
+    """
+    game_name: str = item["name"]
+    if already_posted("steam", game_name):
+        return None
+
+    logo: str = item.get("logo", "")
+    game_url: str = "https://store.steampowered.com/"
+    image_url: str = logo
+    if match := STEAM_LOGO_ID.search(logo):
+        kind, steam_id = match.groups()
+        game_url = f"https://store.steampowered.com/{STEAM_STORE_PATHS[kind]}/{steam_id}/"
+        if kind == "apps":
+            image_url = f"https://cdn.cloudflare.steamstatic.com/steam/apps/{steam_id}/header.jpg"
+
+    logger.bind(game_name=game_name).info(f"URL: {game_url}")
+    embed = DiscordEmbed()
+    embed.set_author(name=game_name, url=game_url, icon_url=settings.steam_icon)
+    embed.set_image(url=image_url)
+
+    # Apps can be games or DLC, the search results don't tell us which.
+    offer_type: str = OFFER_TYPE_BUNDLE if match and match.group(1) != "apps" else ""
+    return FreeGame(store="steam", game_id=game_name, embed=embed, offer_type=offer_type)
+
+
+def search_results(first_page: list[dict]) -> Iterator[dict]:
+    """Go through the search results page by page, until a page isn't full.
+
+    Only one page is kept in memory at a time.
+
+    Args:
+        first_page: The results on the first page.
+
+    Yields:
+        dict: Each search result.
+    """
+    items: list[dict] = first_page
+    for page in range(1, STEAM_SEARCH_MAX_PAGES + 1):
+        yield from items
+        if len(items) < STEAM_SEARCH_PAGE_SIZE:
+            return
+
+        response: requests.Response = http_client.get(search_url(page * STEAM_SEARCH_PAGE_SIZE), timeout=30)
+        response.raise_for_status()
+        items = response.json().get("items", [])
+
+
+def get_free_steam_games() -> Generator[FreeGame, Any, None]:
     """Go to the Steam store and check for free games and return them.
 
+    We use the search's JSON mode, and only fall back to the HTML search page if it fails.
+
     Yields:
-        Generator[DiscordEmbed, Any, None]: A generator with Discord
+        Generator[FreeGame, Any, None]: A generator with the free games
     """
-    previous_games: Path = Path(settings.app_dir) / "steam.txt"
-    if not Path.exists(previous_games):
-        with Path.open(previous_games, "w", encoding="utf-8") as file:
-            file.write("")
-
-    request: requests.Response = requests.get(
-        "https://store.steampowered.com/search/?maxprice=free&specials=1",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
-        },
-        timeout=30,
-    )
-    soup = BeautifulSoup(request.text, "html.parser")
+    first_page_url: str = search_url(0)
+    try:
+        response: requests.Response | None = http_client.get_if_modified(first_page_url, timeout=30)
+        if response is None:
+            logger.bind(game_name="Steam").info("No changes since last time, skipping")
+            return
+
+        response.raise_for_status()
+        first_page: list[dict] = response.json()["items"]
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.bind(game_name="Steam").warning(f"Could not use the JSON search, using the search page instead: {e}")
+        yield from get_free_steam_games_from_page()
+        return
+
+    for item in search_results(first_page):
+        if game := search_result_game(item):
+            yield game
+
+    http_client.commit_validators(first_page_url)
+
+
+def get_free_steam_games_from_page() -> Generator[FreeGame, Any, None]:
+    """Go to the Steam store search page and check for free games and return them.
+
+    Yields:
+        Generator[FreeGame, Any, None]: A generator with the free games
+    """
+    request: requests.Response | None = http_client.get_if_modified(STEAM_SEARCH_URL, timeout=30)
+    if request is None:
+        logger.bind(game_name="Steam").info("No changes since last time, skipping")
+        return
+
+    request.raise_for_status()
+
+    soup = html_parser.parse(request.text, only=html_parser.STEAM_SEARCH_RESULT_ROW)
     games: ResultSet[Any] = soup.find_all("a", class_="search_result_row")
     for game in games:
         embed = DiscordEmbed()
@@ -42,17 +151,15 @@ def get_free_steam_games() -> Generator[DiscordEmbed, Any, None]:
         game_url: str = get_game_url(game)
         image_url: str = get_game_image(game)
 
-        if already_posted(previous_games, game_name):
+        if already_posted("steam", game_name):
             continue
 
         embed.set_author(name=game_name, url=game_url, icon_url=settings.steam_icon)
         embed.set_image(url=image_url)
 
-        with Path.open(previous_games, "a+", encoding="utf-8") as file:
-            file.write(f"{game_name}\n")
+        yield FreeGame(store="steam", game_id=game_name, embed=embed)
 
-        yield embed
-    return
+    http_client.commit_validators(STEAM_SEARCH_URL)
 
 
 def get_game_image(game: dict) -> str:
@@ -102,7 +209,7 @@ def get_game_name(game: dict) -> str:
 if __name__ == "__main__":
     for free_game in get_free_steam_games():
         if free_game:
-            response: requests.Response = send_embed_webhook(free_game)
+            response: requests.Response = send_embed_webhook(free_game.embed)
             if not response.ok:
                 logger.error(
                     f"Error when checking game for Steam:\n{response.status_code} - {response.reason}: {response.text}",
@@ -0,0 +1,288 @@
+"""Send each server only the free games it wants.
+
+A tenant is a section in webhooks.conf named "tenant <name>", with its webhooks and
+the filters a game has to pass, e.g.:
+
+    [tenant cozy-server]
+    webhooks = https://discord.com/api/webhooks/...
+    stores = epic, gog
+    offer_types = game
+    min_original_price = 1000
+    regions = DE, BR
+    seller_blocklist =
+        Wargaming Group Limited
+    keywords =
+        roguelike
+        puzzle
+
+The filters are turned into predicates once, when the file is read, and the tenants
+are indexed by store, so a game is only checked against the tenants that want games
+from its store. A filter only removes the games it knows don't match: a game without
+an offer type, price, seller or regions passes the filter that looks at it.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from discord_free_game_notifier import settings
+from discord_free_game_notifier.models import OFFER_TYPE_BUNDLE, OFFER_TYPE_DLC, OFFER_TYPE_GAME
+
+if TYPE_CHECKING:
+    import configparser
+    from collections.abc import Callable, Iterable
+
+    from discord_free_game_notifier.models import FreeGame
+
+    Predicate = Callable[[FreeGame], bool]
+
+TENANT_PREFIX = "tenant "
+STORES: frozenset[str] = frozenset({"epic", "gog", "steam", "ubisoft"})
+OFFER_TYPES: frozenset[str] = frozenset({OFFER_TYPE_GAME, OFFER_TYPE_DLC, OFFER_TYPE_BUNDLE})
+
+
+class TenantConfigError(ValueError):
+    """A tenant section in webhooks.conf can't be used."""
+
+
+@dataclass(frozen=True, slots=True)
+class Tenant:
+    """A server that gets the games that pass all of its filters."""
+
+    name: str
+    webhooks: tuple[str, ...]
+
+    # Empty means every store.
+    stores: frozenset[str] = frozenset()
+    predicates: tuple[Predicate, ...] = ()
+
+    def matches(self, game: FreeGame) -> bool:
+        """Check if the tenant wants a game.
+
+        Args:
+            game: The free game.
+
+        Returns:
+            bool: True if the game passes every filter.
+        """
+        return all(predicate(game) for predicate in self.predicates)
+
+
+def split_words(value: str) -> list[str]:
+    """Split a list separated by commas, spaces or new lines.
+
+    Args:
+        value: The value from webhooks.conf.
+
+    Returns:
+        list[str]: The lowercase words.
+    """
+    return [word.lower() for word in re.split(r"[\s,]+", value) if word]
+
+
+def split_lines(value: str) -> list[str]:
+    """Split a list with one item on each line, for items that can have spaces.
+
+    Args:
+        value: The value from webhooks.conf.
+
+    Returns:
+        list[str]: The items, stripped.
+    """
+    return [line.strip() for line in value.splitlines() if line.strip()]
+
+
+def known(name: str, key: str, values: list[str], allowed: frozenset[str]) -> frozenset[str]:
+    """Keep the values we know, and warn about the others.
+
+    Args:
+        name: The name of the tenant.
+        key: The key in webhooks.conf.
+        values: The values.
+        allowed: The values we know.
+
+    Returns:
+        frozenset[str]: The values we know.
+    """
+    if unknown := sorted(set(values) - allowed):
+        logger.warning(f"Tenant {name}: ignoring unknown {key} {', '.join(unknown)}, use {', '.join(sorted(allowed))}")
+    return frozenset(values) & allowed
+
+
+def offer_type_filter(offer_types: frozenset[str]) -> Predicate:
+    """Only let through the offer types the tenant wants.
+
+    Args:
+        offer_types: The offer types, e.g. {"game", "bundle"}.
+
+    Returns:
+        Predicate: The filter.
+    """
+    return lambda game: not game.offer_type or game.offer_type in offer_types
+
+
+def min_price_filter(min_price: int) -> Predicate:
+    """Only let through games that normally cost at least a price.
+
+    Args:
+        min_price: The price in cents.
+
+    Returns:
+        Predicate: The filter.
+    """
+    return lambda game: game.original_price is None or game.original_price >= min_price
+
+
+def region_filter(regions: frozenset[str]) -> Predicate:
+    """Only let through games that are free in one of the regions.
+
+    Args:
+        regions: The uppercase country codes, e.g. {"DE", "BR"}.
+
+    Returns:
+        Predicate: The filter.
+    """
+    return lambda game: not game.regions or not regions.isdisjoint(game.regions)
+
+
+def seller_filter(sellers: frozenset[str]) -> Predicate:
+    """Don't let through games from the blocked sellers.
+
+    Args:
+        sellers: The lowercase names of the sellers.
+
+    Returns:
+        Predicate: The filter.
+    """
+    return lambda game: game.seller.lower() not in sellers
+
+
+def keyword_filter(keywords: list[str]) -> Predicate:
+    """Only let through games with one of the keywords in their name or description.
+
+    The keywords are compiled into one regex, so a game is only searched once.
+
+    Args:
+        keywords: The keywords.
+
+    Returns:
+        Predicate: The filter.
+    """
+    pattern: re.Pattern[str] = re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+    def matches(game: FreeGame) -> bool:
+        return bool(pattern.search(game.name) or pattern.search(game.embed.description or ""))
+
+    return matches
+
+
+def parse_tenant(name: str, section: configparser.SectionProxy) -> Tenant:
+    """Compile a tenant section from webhooks.conf.
+
+    Args:
+        name: The name of the tenant, without "tenant ".
+        section: The section.
+
+    Returns:
+        Tenant: The tenant, with its filters.
+
+    Raises:
+        TenantConfigError: If the tenant has no webhooks or min_original_price isn't a number.
+    """
+    webhooks: tuple[str, ...] = tuple(section.get("webhooks", "").split())
+    if not webhooks:
+        msg: str = f"Tenant {name} has no webhooks"
+        raise TenantConfigError(msg)
+
+    predicates: list[Predicate] = []
+    if offer_types := known(name, "offer_types", split_words(section.get("offer_types", "")), OFFER_TYPES):
+        predicates.append(offer_type_filter(offer_types))
+
+    if min_price := section.get("min_original_price", "").strip():
+        try:
+            predicates.append(min_price_filter(int(min_price)))
+        except ValueError as e:
+            msg = f"Tenant {name}: min_original_price should be a number of cents, not {min_price!r}"
+            raise TenantConfigError(msg) from e
+
+    if regions := frozenset(word.upper() for word in split_words(section.get("regions", ""))):
+        predicates.append(region_filter(regions))
+
+    if sellers := frozenset(seller.lower() for seller in split_lines(section.get("seller_blocklist", ""))):
+        predicates.append(seller_filter(sellers))
+
+    if keywords := split_lines(section.get("keywords", "")):
+        predicates.append(keyword_filter(keywords))
+
+    return Tenant(
+        name=name,
+        webhooks=webhooks,
+        stores=known(name, "stores", split_words(section.get("stores", "")), STORES),
+        predicates=tuple(predicates),
+    )
+
+
+def load_tenants(config: configparser.ConfigParser) -> list[Tenant]:
+    """Compile every tenant section in webhooks.conf.
+
+    A tenant that can't be used is logged and skipped.
+
+    Args:
+        config: The parsed webhooks.conf.
+
+    Returns:
+        list[Tenant]: The tenants.
+    """
+    tenants: list[Tenant] = []
+    for section in config.sections():
+        if not section.lower().startswith(TENANT_PREFIX):
+            continue
+
+        try:
+            tenants.append(parse_tenant(section[len(TENANT_PREFIX) :].strip(), config[section]))
+        except TenantConfigError as e:
+            logger.error(f"Skipping tenant in {settings.webhooks_file}: {e}")
+
+    if tenants:
+        logger.info(f"Loaded {len(tenants)} tenants from {settings.webhooks_file}")
+    return tenants
+
+
+class TenantRouter:
+    """Find the webhooks of the tenants that want a game."""
+
+    def __init__(self, tenants: Iterable[Tenant]) -> None:
+        """Index the tenants by the stores they want.
+
+        Args:
+            tenants: The tenants.
+        """
+        self.by_store: dict[str, list[Tenant]] = {}
+        self.all_stores: list[Tenant] = []
+        for tenant in tenants:
+            if not tenant.stores:
+                self.all_stores.append(tenant)
+            for store in tenant.stores:
+                self.by_store.setdefault(store, []).append(tenant)
+
+    def webhooks(self, game: FreeGame) -> list[str]:
+        """Get the webhooks of every tenant that wants a game.
+
+        Args:
+            game: The free game.
+
+        Returns:
+            list[str]: The webhooks, each one once.
+        """
+        webhooks: dict[str, None] = {}
+        for tenant in (*self.by_store.get(game.store, ()), *self.all_stores):
+            if tenant.matches(game):
+                webhooks.update(dict.fromkeys(tenant.webhooks))
+        return list(webhooks)
+
+
+router = TenantRouter(load_tenants(settings.webhooks_config))
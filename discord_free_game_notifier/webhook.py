@@ -1,8 +1,55 @@
-from discord_webhook import DiscordEmbed, DiscordWebhook
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any
+
 from loguru import logger
-from requests import Response
 
-from discord_free_game_notifier import settings
+from discord_free_game_notifier import http_client, settings
+
+if TYPE_CHECKING:
+    from discord_webhook import DiscordEmbed
+    from requests import Response
+
+# How many times we wait out a rate limit before giving up on the message.
+MAX_RATE_LIMIT_RETRIES = 5
+HTTP_TOO_MANY_REQUESTS = 429
+
+# https://discord.com/developers/docs/resources/message#embed-object-embed-limits
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_CHARACTERS = 6000
+MAX_TITLE_CHARACTERS = 256
+MAX_DESCRIPTION_CHARACTERS = 4096
+MAX_FIELDS = 25
+MAX_FIELD_NAME_CHARACTERS = 256
+MAX_FIELD_VALUE_CHARACTERS = 1024
+MAX_FOOTER_CHARACTERS = 2048
+MAX_AUTHOR_CHARACTERS = 256
+
+
+def execute_webhook(url: str, payload: dict[str, Any]) -> Response:
+    """Send a message to a Discord webhook with the shared HTTP session.
+
+    If Discord rate limits us, we wait as long as it tells us to and try again.
+
+    Args:
+        url (str): The webhook URL.
+        payload (dict[str, Any]): The message, e.g. {"content": "Hello"}.
+
+    Returns:
+        Response: The response from the webhook request.
+    """
+    response: Response = http_client.post(url, json=payload, params={"wait": "true"})
+    for _ in range(MAX_RATE_LIMIT_RETRIES):
+        if response.status_code != HTTP_TOO_MANY_REQUESTS:
+            break
+
+        retry_after: float = float(response.json().get("retry_after", 1)) + 0.15
+        logger.warning(f"Webhook rate limited: sleeping for {retry_after:.2f} seconds...")
+        time.sleep(retry_after)
+        response = http_client.post(url, json=payload, params={"wait": "true"})
+
+    return response
 
 
 def send_webhook(message: str, game_service: str = "") -> Response:
@@ -15,31 +62,21 @@ def send_webhook(message: str, game_service: str = "") -> Response:
     Returns:
         Response: The response from the webhook request.
     """
-    if get_webhook_url(game_service):
-        webhook = DiscordWebhook(
-            url=get_webhook_url(game_service),
-            content=message,
-            rate_limit_retry=True,
-        )
-        return webhook.execute()
-
-    webhook = DiscordWebhook(
-        url=settings.webhook_url,
-        content=message,
-        rate_limit_retry=True,
-    )
+    if webhook_url := get_webhook_url(game_service):
+        return execute_webhook(webhook_url, {"content": message})
+
     logger.debug(
-        f"Sending webhook: {message} to {settings.webhook_url}\n Message: {message}\n Game service: {game_service}",
+        f"Sending webhook: {message}\n Game service: {game_service}",
     )
 
-    return webhook.execute()
+    return execute_webhook(settings.webhook_url, {"content": message})
 
 
 def get_webhook_url(game_service: str) -> str:
     """Get the webhook URL for a specific game service.
 
     Args:
-        game_service (str): The name of the game service (Steam/GOG/Epic)
+        game_service (str): The name of the game service (Steam/GOG/Epic/Ubisoft)
 
     Returns:
         str: The webhook URL for the game service.
@@ -53,10 +90,29 @@ def get_webhook_url(game_service: str) -> str:
     if game_service == "Steam" and settings.steam_webhook:
         logger.info("Using Steam webhook")
         return settings.steam_webhook
+    if game_service == "Ubisoft" and settings.ubisoft_webhook:
+        logger.info("Using Ubisoft webhook")
+        return settings.ubisoft_webhook
 
     return ""
 
 
+def get_webhook_urls(game_service: str) -> list[str]:
+    """Get every webhook that should get the games from a game service.
+
+    That is the webhook from the .env file, and the ones for the store in the webhooks file.
+
+    Args:
+        game_service (str): The name of the game service (Steam/GOG/Epic/Ubisoft)
+
+    Returns:
+        list[str]: The webhook URLs, without duplicates.
+    """
+    webhook_urls: list[str] = [get_webhook_url(game_service) or settings.webhook_url]
+    webhook_urls.extend(settings.subscriptions.get(game_service.lower(), []))
+    return [url for url in dict.fromkeys(webhook_urls) if url]
+
+
 def send_embed_webhook(embed: DiscordEmbed, game_service: str = "") -> Response:
     """Send an embed to Discord.
 
@@ -67,16 +123,109 @@ def send_embed_webhook(embed: DiscordEmbed, game_service: str = "") -> Response:
     Returns:
         Response: The response from the
     """
-    if get_webhook_url(game_service):
-        webhook = DiscordWebhook(
-            url=get_webhook_url(game_service),
-            rate_limit_retry=True,
-        )
-        webhook.add_embed(embed)
-        return webhook.execute()
+    payload: dict[str, Any] = {"embeds": [limit_embed(embed).__dict__]}
+    if webhook_url := get_webhook_url(game_service):
+        return execute_webhook(webhook_url, payload)
 
-    webhook = DiscordWebhook(url=settings.webhook_url, rate_limit_retry=True)
+    return execute_webhook(settings.webhook_url, payload)
 
-    webhook.add_embed(embed)
 
-    return webhook.execute()
+def truncate(text: str, limit: int) -> str:
+    """Shorten text so it fits in an embed, without cutting a word or Markdown link in half.
+
+    Args:
+        text (str): The text to shorten.
+        limit (int): The maximum number of characters.
+
+    Returns:
+        str: The text, ending with "…" if it was shortened.
+    """
+    if len(text) <= limit:
+        return text
+
+    shortened: str = text[: limit - 1]
+
+    # Don't leave half of a [link](https://...) behind.
+    # Brackets that aren't followed by "](" are just text, e.g. "[Early Access]".
+    link_start: int = shortened.rfind("[")
+    link_middle: int = shortened.find("](", link_start) if link_start != -1 else -1
+    if link_middle != -1 and ")" not in shortened[link_middle:]:
+        shortened = shortened[:link_start]
+
+    # If we are in the middle of a word, cut at the last whitespace in the second half.
+    last_space: int = max(shortened.rfind(" "), shortened.rfind("\n"))
+    if not text[len(shortened)].isspace() and last_space > len(shortened) // 2:
+        shortened = shortened[:last_space]
+
+    return f"{shortened.rstrip()}…"
+
+
+def limit_embed(embed: DiscordEmbed) -> DiscordEmbed:
+    """Shorten the parts of an embed that are longer than Discord allows.
+
+    Args:
+        embed (DiscordEmbed): The embed, it is changed in place.
+
+    Returns:
+        DiscordEmbed: The same embed.
+    """
+    if embed.title:
+        embed.title = truncate(embed.title, MAX_TITLE_CHARACTERS)
+    if embed.description:
+        embed.description = truncate(embed.description, MAX_DESCRIPTION_CHARACTERS)
+    if embed.author and embed.author.get("name"):
+        embed.author["name"] = truncate(str(embed.author["name"]), MAX_AUTHOR_CHARACTERS)
+    if embed.footer and embed.footer.get("text"):
+        embed.footer["text"] = truncate(str(embed.footer["text"]), MAX_FOOTER_CHARACTERS)
+
+    embed.fields = embed.fields[:MAX_FIELDS]
+    for field in embed.fields:
+        field["name"] = truncate(str(field["name"]), MAX_FIELD_NAME_CHARACTERS)
+        field["value"] = truncate(str(field["value"]), MAX_FIELD_VALUE_CHARACTERS)
+
+    return embed
+
+
+def embed_length(embed: DiscordEmbed) -> int:
+    """Count the characters of an embed the way Discord does for the 6000 character limit.
+
+    Args:
+        embed (DiscordEmbed): The embed.
+
+    Returns:
+        int: The number of characters in the title, description, fields, footer and author.
+    """
+    length: int = len(embed.title or "") + len(embed.description or "")
+    length += sum(len(str(field["name"])) + len(str(field["value"])) for field in embed.fields)
+    if embed.footer:
+        length += len(str(embed.footer.get("text") or ""))
+    if embed.author:
+        length += len(str(embed.author.get("name") or ""))
+    return length
+
+
+def batch_embeds(embeds: list[DiscordEmbed]) -> list[list[DiscordEmbed]]:
+    """Pack embeds into as few messages as Discord allows, keeping their order.
+
+    Args:
+        embeds (list[DiscordEmbed]): The embeds to send.
+
+    Returns:
+        list[list[DiscordEmbed]]: The embeds for each message.
+    """
+    batches: list[list[DiscordEmbed]] = []
+    batch: list[DiscordEmbed] = []
+    batch_length: int = 0
+
+    for embed in embeds:
+        length: int = embed_length(limit_embed(embed))
+        if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or batch_length + length > MAX_MESSAGE_CHARACTERS):
+            batches.append(batch)
+            batch, batch_length = [], 0
+
+        batch.append(embed)
+        batch_length += length
+
+    if batch:
+        batches.append(batch)
+    return batches
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from discord_webhook import DiscordEmbed
+from requests import Response
+
+from discord_free_game_notifier import http_client
+from discord_free_game_notifier import ledger as ledger_module
+from discord_free_game_notifier.http_client import ValidatorCache
+from discord_free_game_notifier.ledger import Ledger
+from discord_free_game_notifier.models import FreeGame
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+    from pathlib import Path
+
+WEBHOOK_URL = "https://discord.test/webhook"
+HTTP_OK = 200
+
+
+@pytest.fixture
+def ledger(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Ledger, Any, None]:
+    """Use a ledger in tmp_path instead of the one in the app directory, and put that one back afterwards.
+
+    Yields:
+        Ledger: The ledger that get_ledger() and already_posted() use.
+    """
+    opened = Ledger(tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr(ledger_module, "ledger", opened)
+    yield opened
+    ledger_module.ledger.close()
+
+
+@pytest.fixture
+def restart_ledger(ledger: Ledger, monkeypatch: pytest.MonkeyPatch) -> Callable[[], Ledger]:
+    """Open the ledger again from its file, like the bot does after a restart.
+
+    Returns:
+        Callable[[], Ledger]: Closes the ledger and returns the reopened one.
+    """
+
+    def restart() -> Ledger:
+        ledger_module.ledger.close()
+        reopened = Ledger(ledger.path)
+        monkeypatch.setattr(ledger_module, "ledger", reopened)
+        return reopened
+
+    return restart
+
+
+@pytest.fixture
+def post_games() -> Callable[..., None]:
+    """Post games the way main does: through the outbox, and delivered when Discord accepts them.
+
+    Returns:
+        Callable[..., None]: Takes the ledger, the store and the game IDs.
+    """
+
+    def post(ledger: Ledger, store: str, *game_ids: str) -> None:
+        ledger.add_to_outbox([FreeGame(store, game_id, DiscordEmbed(title=game_id)) for game_id in game_ids], WEBHOOK_URL)
+        ledger.delivered([entry.id for entry in ledger.take_outbox() if entry.store == store and entry.game_id in game_ids])
+
+    return post
+
+
+def response(status_code: int = HTTP_OK, headers: dict[str, str] | None = None, content: bytes = b"{}") -> Response:
+    """Create a response without sending a request.
+
+    Args:
+        status_code: The HTTP status code.
+        headers: The response headers.
+        content: The body.
+
+    Returns:
+        Response: The response.
+    """
+    fake = Response()
+    fake.status_code = status_code
+    fake.headers.update(headers or {})
+    fake._content = content  # noqa: SLF001
+    return fake
+
+
+@pytest.fixture
+def make_response() -> Callable[..., Response]:
+    """Create responses without sending requests, e.g. for a fake send or get.
+
+    Returns:
+        Callable[..., Response]: Takes the status code, the headers and the body.
+    """
+    return response
+
+
+@pytest.fixture
+def serve(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Callable[..., list[str]]:
+    """Answer the requests of http_client with saved pages, and start with no HTTP validators.
+
+    Returns:
+        Callable[..., list[str]]: Takes the body for every URL, or a dict with the body of each URL,
+            and the status code. Returns the URLs that are requested.
+    """
+    monkeypatch.setattr(http_client, "validator_cache", ValidatorCache(tmp_path / "http_cache.json"))
+
+    def serve_pages(pages: bytes | dict[str, bytes], status_code: int = HTTP_OK) -> list[str]:
+        requested: list[str] = []
+
+        def get(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+            requested.append(url)
+            return response(status_code, content=pages[url] if isinstance(pages, dict) else pages)
+
+        monkeypatch.setattr(http_client.session, "get", get)
+        return requested
+
+    return serve_pages
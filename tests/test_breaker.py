@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from discord_free_game_notifier.breaker import BASE_COOLDOWN, FAILURE_THRESHOLD, CircuitBreakers
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+NOW = 1_000_000.0
+LATENCY = 30.0
+
+
+def test_opens_after_failures_and_probes(tmp_path: Path) -> None:
+    """Test that a failing source is skipped for a growing cool-down and then tried once more."""
+    breakers = CircuitBreakers(tmp_path / "breakers.json")
+    for _ in range(FAILURE_THRESHOLD):
+        assert breakers.allow("GOG", now=NOW)
+        breakers.record_failure("GOG", LATENCY, now=NOW)
+
+    assert not breakers.allow("GOG", now=NOW + BASE_COOLDOWN - 1)
+    assert breakers.allow("Steam", now=NOW)
+
+    # The probe fails, so we wait twice as long.
+    assert breakers.allow("GOG", now=NOW + BASE_COOLDOWN)
+    breakers.record_failure("GOG", LATENCY, now=NOW + BASE_COOLDOWN)
+    assert not breakers.allow("GOG", now=NOW + 2 * BASE_COOLDOWN)
+    assert breakers.allow("GOG", now=NOW + 3 * BASE_COOLDOWN)
+
+    # The state survives a restart.
+    reopened = CircuitBreakers(tmp_path / "breakers.json")
+    assert not reopened.allow("GOG", now=NOW + 2 * BASE_COOLDOWN)
+    assert reopened.state("GOG").latency == LATENCY
+
+    reopened.record_success("GOG", LATENCY)
+    assert reopened.allow("GOG", now=NOW + 2 * BASE_COOLDOWN)
+    assert reopened.state("GOG").failures == 0
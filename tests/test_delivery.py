@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from discord_free_game_notifier.delivery import MAX_ATTEMPTS, Delivery, DeliveryQueue
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from requests import Response
+
+URL = "https://discord.com/api/webhooks/1234/abc"
+OTHER_URL = "https://discord.com/api/webhooks/5678/def"
+RESET_AFTER = 0.3
+SEND_TIME = 0.2
+WEBHOOKS = 10
+MESSAGES_PER_WEBHOOK = 2
+ATTEMPTS_AFTER_429 = 2
+HTTP_NOT_FOUND = 404
+
+
+def test_waits_for_bucket_to_reset(make_response: Callable[..., Response]) -> None:
+    """Test that messages for an exhausted webhook wait, without holding up other webhooks."""
+    sent: list[tuple[str, float]] = []
+
+    def send(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        sent.append((url, time.monotonic()))
+        return make_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": str(RESET_AFTER)})
+
+    queue = DeliveryQueue(send=send, max_workers=1)
+    start: float = time.monotonic()
+    queue.put(URL, {"content": "1"})
+    queue.put(URL, {"content": "2"})
+    queue.put(OTHER_URL, {"content": "3"})
+    assert queue.join(timeout=5)
+
+    assert [url for url, _ in sent] == [URL, OTHER_URL, URL]
+    assert sent[1][1] - start < RESET_AFTER
+    assert sent[2][1] - start >= RESET_AFTER
+    assert queue.stats().depth == 0
+    assert queue.stats().sent == len(sent)
+
+
+def test_retries_after_429(make_response: Callable[..., Response]) -> None:
+    """Test that a rate limited message is sent again after the time Discord tells us."""
+    responses: list[Response] = [
+        make_response(429, {"X-RateLimit-Remaining": "0"}, b'{"retry_after": 0.1}'),
+        make_response(200, {"X-RateLimit-Remaining": "4"}),
+    ]
+    failures: list[Delivery] = []
+    queue = DeliveryQueue(send=lambda url, **kwargs: responses.pop(0), on_failure=lambda delivery, response: failures.append(delivery))  # noqa: ARG005
+
+    delivery: Delivery = queue.put(URL, {"content": "Hello"})
+    assert queue.join(timeout=5)
+    assert delivery.attempts == ATTEMPTS_AFTER_429
+    assert not failures
+
+
+def test_gives_up_after_429s(make_response: Callable[..., Response]) -> None:
+    """Test that a message that is rate limited every time is handed back to the outbox."""
+    failures: list[Delivery] = []
+    queue = DeliveryQueue(
+        send=lambda url, **kwargs: make_response(429, {}, b'{"retry_after": 0}'),  # noqa: ARG005
+        on_failure=lambda delivery, response: failures.append(delivery),  # noqa: ARG005
+    )
+
+    delivery: Delivery = queue.put(URL, {"content": "Hello"})
+    assert queue.join(timeout=5)
+    assert delivery.attempts == MAX_ATTEMPTS
+    assert failures == [delivery]
+
+
+def test_crashed_messages_are_handed_back() -> None:
+    """Test that a message that raises an unexpected error is reported as failed, so the outbox sends it again later."""
+    failures: list[Delivery] = []
+
+    def send(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        msg: str = f"Broken send for {url}"
+        raise RuntimeError(msg)
+
+    queue = DeliveryQueue(send=send, on_failure=lambda delivery, response: failures.append(delivery))  # noqa: ARG005
+    delivery: Delivery = queue.put(URL, {"content": "Hello"}, outbox_ids=[1])
+    assert queue.join(timeout=5)
+    assert failures == [delivery]
+
+
+def test_rejected_messages_are_not_retried(make_response: Callable[..., Response]) -> None:
+    """Test that a 4xx other than 429 is sent once and reported as rejected, not as a failure to retry."""
+    sent: list[str] = []
+    rejected: list[int] = []
+    failures: list[Delivery] = []
+
+    def send(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        sent.append(url)
+        return make_response(404, {}, b'{"message": "Unknown Webhook"}')
+
+    queue = DeliveryQueue(
+        send=send,
+        on_failure=lambda delivery, response: failures.append(delivery),  # noqa: ARG005
+        on_rejected=lambda delivery, response: rejected.append(response.status_code),  # noqa: ARG005
+    )
+    queue.put(URL, {"content": "Hello"})
+    assert queue.join(timeout=5)
+    assert sent == [URL]
+    assert rejected == [HTTP_NOT_FOUND]
+    assert not failures
+
+
+def test_sends_to_webhooks_at_the_same_time(make_response: Callable[..., Response]) -> None:
+    """Test that webhooks are sent to at the same time, but each webhook gets its messages one at a time, in order."""
+    lock = threading.Lock()
+    in_flight: set[str] = set()
+    overlapping: list[str] = []
+    sent: dict[str, list[str]] = {}
+
+    def send(url: str, json: dict[str, Any], **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        with lock:
+            if url in in_flight:
+                overlapping.append(url)
+            in_flight.add(url)
+        time.sleep(SEND_TIME)
+        with lock:
+            in_flight.discard(url)
+            sent.setdefault(url, []).append(json["content"])
+        return make_response(200, {"X-RateLimit-Remaining": "4"})
+
+    queue = DeliveryQueue(send=send, max_workers=WEBHOOKS)
+    start: float = time.monotonic()
+    for message in range(MESSAGES_PER_WEBHOOK):
+        for webhook in range(WEBHOOKS):
+            queue.put(f"{URL}/{webhook}", {"content": str(message)})
+    assert queue.join(timeout=10)
+
+    # Sending one at a time would take WEBHOOKS * MESSAGES_PER_WEBHOOK * SEND_TIME seconds.
+    assert time.monotonic() - start < (MESSAGES_PER_WEBHOOK + 1) * SEND_TIME
+    assert not overlapping
+    assert all(messages == ["0", "1"] for messages in sent.values())
+    assert queue.stats().webhooks == WEBHOOKS
@@ -1,18 +1,45 @@
 from __future__ import annotations
 
 import calendar
+import json
+import shutil
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import pytest
+
+from discord_free_game_notifier import epic, main
 from discord_free_game_notifier.epic import (
+    EpicGame,
+    EpicOffer,
     check_promotion,
-    game_image,
-    game_url,
-    promotion_end,
-    promotion_start,
+    classify,
+    create_free_game,
+    get_free_epic_games,
+    get_responses,
+    merge_offers,
+    parse_date,
+    parse_game,
 )
-from discord_free_game_notifier.epic_json import get_json
-from discord_free_game_notifier.utils import already_posted
+from discord_free_game_notifier.feeds import EPIC_FEED, get_feed_games, parse_feed
+from discord_free_game_notifier.ledger import Ledger
+from discord_free_game_notifier.tenants import Tenant, TenantRouter, region_filter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from requests import Response
+
+    from discord_free_game_notifier.feeds import FeedEntry
+    from discord_free_game_notifier.ledger import OutboxEntry
+    from discord_free_game_notifier.models import FreeGame
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+STORE_WEBHOOK = "https://discord.com/api/webhooks/1/store"
+US_WEBHOOK = "https://discord.com/api/webhooks/2/us"
+DE_WEBHOOK = "https://discord.com/api/webhooks/3/de"
 
 game = {
     "title": "Gloomhaven",
@@ -123,6 +150,22 @@ game = {
     },
 }
 
+NOT_DISCOUNTED: dict = {"totalPrice": {"originalPrice": 3499, "discount": 0}}
+UPCOMING: dict = {
+    "promotionalOffers": [],
+    "upcomingPromotionalOffers": [
+        {
+            "promotionalOffers": [
+                {
+                    "startDate": "2022-09-29T15:00:00.000Z",
+                    "endDate": "2022-10-06T15:00:00.000Z",
+                    "discountSetting": {"discountType": "PERCENTAGE", "discountPercentage": 0},
+                },
+            ],
+        },
+    ],
+}
+
 
 def test_promotion_start() -> None:
     """Test that the promotion start date is returned correctly."""
@@ -134,63 +177,274 @@ def test_promotion_start() -> None:
                     time.strptime(offer["startDate"], "%Y-%m-%dT%H:%M:%S.%fZ"),
                 )
 
-    result: int = promotion_start(game)
-    assert result == start_date
+    assert parse_game(game).start == start_date
 
 
 def test_promotion_end() -> None:
-    """Test that the promotion end date is returned correctly."""
-    end_date: float | None = None
+    """Test that the promotion end date is returned correctly, in UTC."""
+    end_date: int | None = None
     for promotion in game["promotions"]["promotionalOffers"]:
         for offer in promotion["promotionalOffers"]:
-            end_date = time.mktime(
+            end_date = calendar.timegm(
                 time.strptime(offer["endDate"], "%Y-%m-%dT%H:%M:%S.%fZ"),
             )
 
-    result: int = promotion_end(game)
-    assert result == end_date
+    assert parse_game(game).end == end_date
+
+
+def test_parse_date() -> None:
+    """Test that dates from the API are read as UTC, and empty dates are 0."""
+    assert parse_date("1970-01-01T00:01:00.000Z") == MINUTE
+    assert parse_date(None) == 0
+    assert parse_date("") == 0
+
+
+def test_upcoming_promotion() -> None:
+    """Test that next week's free game is found in upcomingPromotionalOffers."""
+    epic_api: dict = json.loads(Path("tests/epic-api-2023-05-29.json").read_text(encoding="utf-8"))
+    elements: list[dict] = epic_api["data"]["Catalog"]["searchStore"]["elements"]
+    games: dict[str, EpicGame] = {element["title"]: parse_game(element) for element in elements}
+
+    mystery_game: EpicGame = games["Mystery Game"]
+    assert mystery_game.upcoming_start == calendar.timegm(time.strptime("2023-06-01T15:00:00", "%Y-%m-%dT%H:%M:%S"))
+    assert mystery_game.upcoming_end == calendar.timegm(time.strptime("2023-06-08T15:00:00", "%Y-%m-%dT%H:%M:%S"))
+    assert games["Fallout: New Vegas - Ultimate Edition"].upcoming_start == 0
+    assert parse_game(game).upcoming_start == 0
 
 
 def test_game_image() -> None:
     """Test that the game image is returned correctly."""
-    result: str = game_image(game)
+    result: str = parse_game(game).image
     assert result == "https://cdn1.epicgames.com/spt-assets/ef2777467a3c49059a076e42fd9b41f0/download-gloomhaven-offer-1ho2x.jpg"
 
 
 def test_game_url() -> None:
     """Test that the game url is returned correctly."""
-    result: str = game_url(game)
+    result: str = parse_game(game).url
     assert result == "https://www.epicgames.com/en-US/p/gloomhaven-92f741"
 
 
+def test_parse_game() -> None:
+    """Test that the seller, price and vault flag are read."""
+    epic_game: EpicGame = parse_game(game)
+    assert epic_game.seller == "Asmodee"
+    assert epic_game.final_price == 0
+    assert epic_game.free
+    assert not epic_game.vaulted
+
+    epic_api: dict = json.loads(Path("tests/epic-api-2023-05-29.json").read_text(encoding="utf-8"))
+    fallout: EpicGame = parse_game(epic_api["data"]["Catalog"]["searchStore"]["elements"][0])
+    assert fallout.vaulted
+    assert not fallout.free
+    assert fallout.url == "https://www.epicgames.com/en-US/p/fallout-new-vegas--ultimate-edition"
+
+
+def test_create_free_game() -> None:
+    """Test that the embed is built from the parsed game."""
+    epic_game: EpicGame = parse_game(game)
+    free_game = create_free_game(epic_game, epic_game.start, 0)
+    assert free_game is not None
+    assert free_game.game_id == "9232fdbc352445cc820a54bdc97ed2bb"
+    assert free_game.legacy_id == "Gloomhaven"
+    assert free_game.promotion_start == epic_game.start
+    assert free_game.promotion_end is None
+    assert free_game.embed.footer["text"] == "Asmodee"
+    assert free_game.embed.image["url"] == epic_game.image
+
+    # The promotion ended in 2022.
+    assert create_free_game(epic_game) is None
+
+
 def test_check_promotion() -> None:
     """Test that the check_promotion function returns True when a game is free."""
-    assert check_promotion(game)
+    assert check_promotion(parse_game(game))
+
+
+def test_classify() -> None:
+    """Test that every element is put in exactly one group."""
+    epic_api: dict = json.loads(Path("tests/epic-api-2023-05-29.json").read_text(encoding="utf-8"))
+    elements: list[dict] = epic_api["data"]["Catalog"]["searchStore"]["elements"]
+    offers: dict[str, EpicOffer] = {element["title"]: classify(parse_game(element)) for element in elements}
+
+    assert offers == {
+        "Fallout: New Vegas - Ultimate Edition": EpicOffer.VAULTED_FREE,
+        "Mystery Game": EpicOffer.NOT_FREE,
+    }
+    assert classify(parse_game(game)) is EpicOffer.FREE_NOW
+    assert classify(parse_game({**game, "promotions": None})) is EpicOffer.NOT_FREE
+    assert classify(parse_game({**game, "title": "Upcoming", "price": NOT_DISCOUNTED, "promotions": UPCOMING})) is EpicOffer.UPCOMING
+
+
+@pytest.mark.usefixtures("ledger")
+def test_get_free_epic_games_once_per_offer(monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]) -> None:
+    """Test that an offer that is in the response twice, and vaulted in two ways, is only created once."""
+    epic_api: dict = json.loads(Path("tests/epic-api-2023-05-29.json").read_text(encoding="utf-8"))
+    elements: list[dict] = epic_api["data"]["Catalog"]["searchStore"]["elements"]
+    fallout: dict = {**elements[0], "keyImages": [*elements[0]["keyImages"], {"type": "VaultOpened", "url": ""}]}
+    elements[:] = [fallout, *elements, game, game]
+
+    response: Response = make_response(content=json.dumps(epic_api).encode())
+    monkeypatch.setattr(epic, "get_response", lambda country: response)  # noqa: ARG005
+
+    created: list[str] = []
 
+    def record(epic_game: EpicGame, *args: int) -> None:  # noqa: ARG001
+        created.append(epic_game.title)
 
-def test_already_posted() -> None:
+    monkeypatch.setattr(epic, "create_free_game", record)
+
+    list(get_free_epic_games())
+    assert created == ["Fallout: New Vegas - Ultimate Edition", "Gloomhaven"]
+
+
+def test_merge_offers() -> None:
+    """Test that an offer from several countries is kept once, with the countries it is free in."""
+    not_free: dict = {**game, "promotions": None}
+    payloads: dict = {
+        country: {"data": {"Catalog": {"searchStore": {"elements": elements}}}}
+        for country, elements in {"US": [not_free], "DE": [game, game], "BR": [game]}.items()
+    }
+
+    merged: list[tuple[EpicGame, EpicOffer]] = merge_offers(payloads)
+    assert [(merged_game.title, offer, merged_game.regions) for merged_game, offer in merged] == [
+        ("Gloomhaven", EpicOffer.FREE_NOW, ("DE", "BR")),
+    ]
+    assert not merge_offers({"US": payloads["US"]})[0][0].regions
+
+
+def test_get_responses(monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]) -> None:
+    """Test that the countries that haven't changed are downloaded again when another one has."""
+
+    def response(country: str) -> Response:
+        return make_response(content=country.encode())
+
+    monkeypatch.setattr(epic, "get_response", lambda country: response(country) if country == "DE" else None)
+    monkeypatch.setattr(epic, "download", response)
+    responses: dict[str, Response] | None = get_responses(["US", "DE", "BR"])
+    assert responses is not None
+    assert {country: response.content for country, response in responses.items()} == {"US": b"US", "DE": b"DE", "BR": b"BR"}
+
+    monkeypatch.setattr(epic, "get_response", lambda country: None)  # noqa: ARG005
+    assert get_responses(["US", "DE"]) is None
+
+
+def test_already_posted(tmp_path: Path) -> None:
     """Test that the function returns True when a game has already been posted."""
-    file_path = Path("tests/games.txt")
-    result: bool = already_posted(file_path, "Half Life 3")
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    ledger.import_text_file("epic", Path("tests/games.txt"))
+    result: bool = ledger.already_posted("epic", "Half Life 3")
     assert result
 
-    result2: bool = already_posted(file_path, "Half Life 4")
+    result2: bool = ledger.already_posted("epic", "Half Life 4")
     assert not result2
 
-    result3: bool = already_posted("Not_a_file", "Sharks")  # type: ignore  # noqa: PGH003
+    assert ledger.import_text_file("epic", Path("Not_a_file")) == 0
+    result3: bool = ledger.already_posted("epic", "Sharks")
     assert not result3
 
 
-def test_get_json() -> None:
-    """Test that the get_json function returns a dict."""
-    json = get_json()
-    assert isinstance(json, dict)
-    assert json["free_games"]
+@pytest.mark.usefixtures("ledger")
+def test_epic_feed(tmp_path: Path, serve: Callable[..., list[str]]) -> None:
+    """Test that every game in an Epic feed can be read, and only the one that is still free is sent."""
+    feed: Path = tmp_path / "epic.json"
+    shutil.copy("tests/epic-feed.json", feed)
+    entries: list[FeedEntry] = parse_feed(EPIC_FEED, feed.read_bytes())
+    assert [entry.game_id for entry in entries] == ["the_sims_4_my_first_pet_stuff", "fall_guys_giddy_gift"]
+
+    serve(feed.read_bytes())
+    assert [game.game_id for game in get_feed_games(EPIC_FEED)] == ["fall_guys_giddy_gift"]
+
+
+def promotion(start: float, end: float) -> list[dict]:
+    """Make the promotional offers of a game that is free between two times.
+
+    Args:
+        start: The Unix time the promotion starts.
+        end: The Unix time the promotion ends.
+
+    Returns:
+        list[dict]: The promotional offers, like in the API.
+    """
+    return [
+        {
+            "promotionalOffers": [
+                {
+                    "startDate": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(start)),
+                    "endDate": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(end)),
+                    "discountSetting": {"discountType": "PERCENTAGE", "discountPercentage": 0},
+                },
+            ],
+        },
+    ]
+
+
+def test_new_regions_are_sent_to_the_tenants_that_want_them(
+    monkeypatch: pytest.MonkeyPatch,
+    make_response: Callable[..., Response],
+    ledger: Ledger,
+) -> None:
+    """Test that an offer that becomes free in another country after we posted it is sent to that country's tenant only."""
+    now: float = time.time()
+    free: dict = {**game, "promotions": {"promotionalOffers": promotion(now - DAY, now + 7 * DAY), "upcomingPromotionalOffers": []}}
+    upcoming: dict = {
+        **game,
+        "price": NOT_DISCOUNTED,
+        "promotions": {"promotionalOffers": [], "upcomingPromotionalOffers": promotion(now + DAY, now + 7 * DAY)},
+    }
+
+    monkeypatch.setattr(epic.settings, "epic_countries", ["US", "DE"])
+    monkeypatch.setattr(main, "get_webhook_urls", lambda _: [STORE_WEBHOOK])
+    monkeypatch.setattr(main, "drain_outbox", lambda: 0)
+    monkeypatch.setattr(
+        main,
+        "router",
+        TenantRouter([
+            Tenant("us", (US_WEBHOOK,), predicates=(region_filter(frozenset({"US"})),)),
+            Tenant("de", (DE_WEBHOOK,), predicates=(region_filter(frozenset({"DE"})),)),
+        ]),
+    )
+
+    def cycle(elements: dict[str, dict]) -> list[str]:
+        payloads: dict[str, bytes] = {
+            country: json.dumps({"data": {"Catalog": {"searchStore": {"elements": [element]}}}}).encode()
+            for country, element in elements.items()
+        }
+        monkeypatch.setattr(
+            epic, "get_responses", lambda countries: {country: make_response(content=payloads[country]) for country in countries}
+        )
+        main.send_games([free_game for free_game in get_free_epic_games() if free_game], "Epic")
+
+        entries: list[OutboxEntry] = ledger.take_outbox()
+        ledger.delivered([entry.id for entry in entries])
+        return sorted(entry.webhook for entry in entries)
+
+    assert cycle({"US": upcoming, "DE": free}) == sorted([STORE_WEBHOOK, DE_WEBHOOK])
+    assert cycle({"US": free, "DE": free}) == [US_WEBHOOK]
+    assert cycle({"US": free, "DE": free}) == []
+
+
+def test_offers_with_the_same_title_are_sent_separately(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_response: Callable[..., Response],
+    ledger: Ledger,
+) -> None:
+    """Test that the ledger tells offers apart by their ID, and still knows the titles from the old epic.txt."""
+    now: float = time.time()
+    free: dict = {**game, "promotions": {"promotionalOffers": promotion(now - DAY, now + 7 * DAY), "upcomingPromotionalOffers": []}}
+    edition: dict = {**free, "id": "0d6d5e3b3c8a4b1d9c4e2f7a8b9c0d1e"}
+    other: dict = {**free, "id": "7c1f2e3d4b5a69788796a5b4c3d2e1f0", "title": "Celeste"}
+    elements: bytes = json.dumps({"data": {"Catalog": {"searchStore": {"elements": [free, edition, other]}}}}).encode()
+
+    monkeypatch.setattr(epic.settings, "epic_countries", ["US"])
+    monkeypatch.setattr(epic, "get_responses", lambda countries: {country: make_response(content=elements) for country in countries})
+    games: list[FreeGame] = [free_game for free_game in get_free_epic_games() if free_game]
+    assert [free_game.game_id for free_game in games] == [free["id"], edition["id"], other["id"]]
+
+    # Celeste was posted before the ledger, when epic.txt had one title per line.
+    previous_games: Path = tmp_path / "epic.txt"
+    previous_games.write_text("Celeste\n", encoding="utf-8")
+    ledger.import_text_file("epic", previous_games)
 
-    assert json["free_games"][0]["id"]
-    assert json["free_games"][0]["game_name"]
-    assert json["free_games"][0]["game_url"]
-    assert json["free_games"][0]["start_date"]
-    assert json["free_games"][0]["end_date"]
-    assert json["free_games"][0]["description"]
-    assert json["free_games"][0]["image_link"]
+    assert ledger.add_to_outbox(games, STORE_WEBHOOK, "Epic") == len(games) - 1
+    assert [entry.game_id for entry in ledger.take_outbox()] == [free["id"], edition["id"]]
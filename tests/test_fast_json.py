@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from discord_free_game_notifier import fast_json
+from discord_free_game_notifier.epic import parse_game
+from discord_free_game_notifier.epic_schema import FreeGamesPromotions
+
+if TYPE_CHECKING:
+    import pytest
+
+EPIC_API: bytes = Path("tests/epic-api-2023-05-29.json").read_bytes()
+
+
+def test_decode_epic_api() -> None:
+    """Test that the pruned payload is read the same way as the whole payload."""
+    pruned: FreeGamesPromotions = fast_json.decode(EPIC_API, FreeGamesPromotions)
+    full: dict = json.loads(EPIC_API)
+
+    assert [parse_game(element) for element in pruned["data"]["Catalog"]["searchStore"]["elements"]] == [
+        parse_game(element) for element in full["data"]["Catalog"]["searchStore"]["elements"]
+    ]
+
+
+def test_decode_falls_back_when_schema_does_not_match() -> None:
+    """Test that JSON that doesn't match the schema is still decoded."""
+    assert fast_json.decode(b'{"data": {"Catalog": null}}', FreeGamesPromotions) == {"data": {"Catalog": None}}
+
+
+def test_decode_without_fast_libraries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the standard library is used when msgspec and orjson aren't installed."""
+    monkeypatch.setattr(fast_json, "msgspec", None)
+    monkeypatch.setattr(fast_json, "orjson", None)
+
+    assert fast_json.decode(EPIC_API, FreeGamesPromotions) == json.loads(EPIC_API)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import gzip
+import json
+from typing import TYPE_CHECKING, Any
+
+from discord_free_game_notifier import feed_builder
+from discord_free_game_notifier.feed_builder import build_feed, load_games, prune_pages
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+MAX_DELTAS = 2
+NOW = 1_717_200_000  # 2024-06-01
+SECOND_VERSION = 2
+
+
+def game(store: str, game_id: str, description: str = "Free for a while.") -> dict[str, Any]:
+    """Make a game like the ones in pages/*.json.
+
+    Args:
+        store: The store, e.g. "epic".
+        game_id: The ID of the game.
+        description: The description.
+
+    Returns:
+        dict[str, Any]: The game JSON.
+    """
+    return {"store": store, "id": game_id, "game_name": game_id.title(), "description": description}
+
+
+def read(path: Path) -> dict[str, Any]:
+    """Read a JSON file the builder wrote, and check the gzip copy has the same content.
+
+    Args:
+        path: The file.
+
+    Returns:
+        dict[str, Any]: The JSON.
+    """
+    data: bytes = path.read_bytes()
+    assert gzip.decompress(path.with_name(f"{path.name}.gz").read_bytes()) == data
+    return json.loads(data)
+
+
+def test_build_feed(tmp_path: Path) -> None:
+    """Test that only changes make a new version, and the delta only has the changes."""
+    assert build_feed([game("epic", "a"), game("steam", "b")], tmp_path) == 1
+    assert build_feed([game("steam", "b"), game("epic", "a")], tmp_path) == 1
+
+    assert build_feed([game("epic", "a", "Changed"), game("steam", "b"), game("ubisoft", "c")], tmp_path) == SECOND_VERSION
+    delta: dict[str, Any] = read(tmp_path / "delta-2.json")
+    assert delta["since"] == 1
+    assert [entry["id"] for entry in delta["games"]] == ["a", "c"]
+    assert delta["removed"] == []
+
+    build_feed([game("epic", "a", "Changed"), game("ubisoft", "c")], tmp_path)
+    assert read(tmp_path / "delta-3.json")["removed"] == [{"store": "steam", "id": "b"}]
+
+    feed: dict[str, Any] = read(tmp_path / "feed.json")
+    assert [entry["id"] for entry in feed["games"]] == ["a", "c"]
+    assert read(tmp_path / "index.json") == {"version": 3, "feed": "feed.json", "deltas": [1, 2, 3]}
+
+
+def test_old_deltas_are_removed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only the newest deltas are kept."""
+    monkeypatch.setattr(feed_builder, "MAX_DELTAS", MAX_DELTAS)
+    for version in range(1, 5):
+        build_feed([game("epic", str(version))], tmp_path)
+
+    assert read(tmp_path / "index.json")["deltas"] == [3, 4]
+    assert sorted(path.name for path in tmp_path.glob("delta-*.json")) == ["delta-3.json", "delta-4.json"]
+    assert not (tmp_path / "delta-1.json.gz").exists()
+
+
+def test_load_games(tmp_path: Path) -> None:
+    """Test that the games from every curated feed are read with their store."""
+    for store in ("epic", "steam", "ubisoft"):
+        (tmp_path / f"{store}.json").write_text(json.dumps({"free_games": [dated(store, None, None)]}), encoding="utf-8")
+
+    assert [(entry["store"], entry["id"]) for entry in load_games(tmp_path)] == [
+        ("epic", "epic"),
+        ("steam", "steam"),
+        ("ubisoft", "ubisoft"),
+    ]
+
+
+def dated(game_id: str, start_date: str | None, end_date: str | None) -> dict[str, Any]:
+    """Make a curated game with a start and end date.
+
+    Args:
+        game_id: The ID of the game.
+        start_date: When the game becomes free.
+        end_date: When the game stops being free.
+
+    Returns:
+        dict[str, Any]: The game JSON.
+    """
+    return {"id": game_id, "start_date": start_date, "end_date": end_date}
+
+
+def test_prune_pages(tmp_path: Path) -> None:
+    """Test that ended games are archived, and the rest are sorted by start date."""
+    pages: Path = tmp_path / "pages"
+    archive: Path = pages / "archive"
+    pages.mkdir()
+    for name in ("epic.json", "ubisoft.json"):
+        (pages / name).write_text('{"free_games": []}', encoding="utf-8")
+    (pages / "steam.json").write_text(
+        json.dumps({
+            "free_games": [
+                dated("upcoming", "2024-06-10T00:00:00+00:00", "2024-06-20T00:00:00+00:00"),
+                dated("ended", "2024-01-01T00:00:00+00:00", "2024-01-10T00:00:00+00:00"),
+                dated("active", "2024-05-25T00:00:00+00:00", "2024-06-05T00:00:00+00:00"),
+                dated("no_end", None, None),
+            ],
+        }),
+        encoding="utf-8",
+    )
+
+    assert prune_pages(pages, archive, NOW) == 1
+    steam: list[dict[str, Any]] = json.loads((pages / "steam.json").read_text(encoding="utf-8"))["free_games"]
+    assert [game["id"] for game in steam] == ["no_end", "active", "upcoming"]
+    assert json.loads((archive / "steam.json").read_text(encoding="utf-8"))["free_games"] == [
+        dated("ended", "2024-01-01T00:00:00+00:00", "2024-01-10T00:00:00+00:00"),
+    ]
+    assert not (archive / "epic.json").exists()
+
+    # A game that was added back by create_json_file() isn't archived twice.
+    steam.append(dated("ended", "2024-01-01T00:00:00+00:00", "2024-01-10T00:00:00+00:00"))
+    (pages / "steam.json").write_text(json.dumps({"free_games": steam}), encoding="utf-8")
+    assert prune_pages(pages, archive, NOW) == 1
+    assert len(json.loads((archive / "steam.json").read_text(encoding="utf-8"))["free_games"]) == 1
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import datetime
+import json
+from typing import TYPE_CHECKING, Any
+
+import pytest
+import requests
+
+from discord_free_game_notifier.feeds import STEAM_FEED, UBISOFT_FEED, FeedEntry, FeedError, get_feed_games, parse_feed
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from discord_free_game_notifier.ledger import Ledger
+    from discord_free_game_notifier.models import FreeGame
+
+NEXT_YEAR: int = datetime.datetime.now(tz=datetime.UTC).year + 1
+START = "2023-12-01T11:00:00+00:00"
+END = f"{NEXT_YEAR}-01-09T18:00:00+00:00"
+HTTP_SERVER_ERROR = 500
+
+
+def feed_game(game_id: str, end_date: str | None = END) -> dict[str, Any]:
+    """Make a game like the ones in pages/*.json.
+
+    Args:
+        game_id: The ID of the game.
+        end_date: When the game stops being free.
+
+    Returns:
+        dict[str, Any]: The game JSON.
+    """
+    return {
+        "id": game_id,
+        "game_name": game_id.replace("_", " ").title(),
+        "game_url": f"https://store.steampowered.com/app/{game_id}/",
+        "start_date": START,
+        "end_date": end_date,
+        "image_link": f"https://thelovinator1.github.io/discord-free-game-notifier/images/{game_id}.jpg",
+        "description": "Free for a while.",
+        "developer": "Someone",
+    }
+
+
+def test_parse_feed() -> None:
+    """Test that the dates are parsed once into Unix times, and invalid games are skipped."""
+    content: bytes = json.dumps(
+        {"free_games": [feed_game("portal"), {"id": 1, "game_name": "Broken"}, feed_game("half_life", end_date=None)]},
+    ).encode()
+
+    entries: list[FeedEntry] = parse_feed(STEAM_FEED, content)
+    assert [entry.game_id for entry in entries] == ["portal", "half_life"]
+    assert entries[0].start == int(datetime.datetime.fromisoformat(START).timestamp())
+    assert entries[0].end == int(datetime.datetime.fromisoformat(END).timestamp())
+    assert entries[1].end >= entries[0].start
+
+
+def test_parse_feed_without_free_games() -> None:
+    """Test that a feed without a list of games is an error, not a crash later on."""
+    with pytest.raises(FeedError):
+        parse_feed(STEAM_FEED, b'{"games": []}')
+
+
+def test_get_feed_games(serve: Callable[..., list[str]], post_games: Callable[..., None], ledger: Ledger) -> None:
+    """Test that posted and expired games are skipped, and an unchanged feed isn't read again."""
+    post_games(ledger, "ubisoft", "posted")
+    content: bytes = json.dumps(
+        {"free_games": [feed_game("posted"), feed_game("expired", end_date="2020-01-01T00:00:00+00:00"), feed_game("new")]},
+    ).encode()
+    serve(content)
+
+    games: list[FreeGame] = list(get_feed_games(UBISOFT_FEED))
+    assert [game.game_id for game in games] == ["new"]
+    assert games[0].store == "ubisoft"
+    assert games[0].embed.footer["text"] == "Ubisoft"
+    assert games[0].promotion_end == int(datetime.datetime.fromisoformat(END).timestamp())
+
+    assert list(get_feed_games(UBISOFT_FEED)) == []
+
+
+@pytest.mark.usefixtures("ledger")
+def test_get_feed_games_when_fetch_fails(serve: Callable[..., list[str]]) -> None:
+    """Test that a failed fetch is raised, so the circuit breaker sees it."""
+    serve(b"Server error", HTTP_SERVER_ERROR)
+
+    with pytest.raises(requests.HTTPError):
+        list(get_feed_games(STEAM_FEED))
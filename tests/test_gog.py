@@ -1,14 +1,91 @@
 from __future__ import annotations
 
+import json
 from collections.abc import Generator
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+import pytest
+import requests
 from discord_webhook import DiscordEmbed
 
+from discord_free_game_notifier import gog
 from discord_free_game_notifier.gog import (
+    catalog_url,
     get_free_gog_game,
     get_free_gog_game_from_store,
+    get_free_gog_game_from_store_page,
+    get_free_gog_games_from_catalog,
 )
+from discord_free_game_notifier.models import FreeGame
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from discord_free_game_notifier.ledger import Ledger
+
+
+CATALOG_PAGES: dict[str, bytes] = {catalog_url(page): Path(f"tests/gog-catalog-page-{page}.json").read_bytes() for page in (1, 2)}
+
+
+def test_get_free_gog_games_from_catalog(serve: Callable[..., list[str]], post_games: Callable[..., None], ledger: Ledger) -> None:
+    """Test that every page of the catalog is read, and posted games are skipped."""
+    post_games(ledger, "gog", "Absolute Drift")
+    serve(CATALOG_PAGES)
+
+    games: list[FreeGame] | None = get_free_gog_games_from_catalog()
+    assert games is not None
+    assert [game.game_id for game in games] == ["The Witcher: Enhanced Edition", "Thief Gold"]
+    assert games[0].embed.author["url"] == "https://www.gog.com/en/game/the_witcher_enhanced_edition"
+    assert games[0].embed.image["url"].startswith("https://images.gog-statics.com/")
+
+    # No page has changed, so nothing is parsed.
+    assert get_free_gog_games_from_catalog() is None
+
+    # A new game on the second page is found, even though the first page is the same.
+    second_page: dict = json.loads(CATALOG_PAGES[catalog_url(2)])
+    second_page["products"].append({**second_page["products"][0], "id": "1", "title": "Thief II: The Metal Age", "slug": "thief_2"})
+    requested: list[str] = serve({**CATALOG_PAGES, catalog_url(2): json.dumps(second_page).encode()})
+    games = get_free_gog_games_from_catalog()
+    assert games is not None
+    assert [game.game_id for game in games] == ["The Witcher: Enhanced Edition", "Thief Gold", "Thief II: The Metal Age"]
+    assert requested == [catalog_url(1), catalog_url(2)]
+
+
+@pytest.mark.usefixtures("ledger")
+def test_falls_back_to_store_page(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the HTML store page is used when the catalog API doesn't work."""
+
+    def broken_catalog() -> list[FreeGame]:
+        msg = "Catalog is down"
+        raise requests.ConnectionError(msg)
+
+    store_page_game = FreeGame("gog", "From the store page", DiscordEmbed(title="From the store page"))
+    monkeypatch.setattr(gog, "get_free_gog_games_from_catalog", broken_catalog)
+    monkeypatch.setattr(gog, "get_free_gog_game_from_store_page", lambda: iter([store_page_game]))
+
+    assert list(get_free_gog_game_from_store()) == [store_page_game]
+
+
+@pytest.mark.usefixtures("ledger")
+def test_get_free_gog_game_from_front_page(serve: Callable[..., list[str]]) -> None:
+    """Test that the giveaway is read from the front page."""
+    serve(Path("tests/gog-front-page.html").read_bytes())
+
+    game: FreeGame | None = get_free_gog_game()
+    assert game is not None
+    assert game.game_id == "Example Game"
+    assert game.embed.author["url"] == "https://www.gog.com/en/game/gog_giveaway_example"
+    assert game.embed.image["url"] == "https://images.gog-statics.com/example_giveaway_1600.webp"
+
+
+def test_get_free_gog_game_from_store_page(serve: Callable[..., list[str]], post_games: Callable[..., None], ledger: Ledger) -> None:
+    """Test that the games are read from the HTML store page."""
+    post_games(ledger, "gog", "Absolute Drift")
+    serve(Path("tests/gog-store-page.html").read_bytes())
+
+    games: list[FreeGame | None] = list(get_free_gog_game_from_store_page())
+    assert [game.game_id for game in games if game] == ["The Witcher: Enhanced Edition", "Thief Gold"]
 
 
 def test_get_free_gog_game() -> None:
@@ -23,15 +100,16 @@ def test_get_free_gog_game_from_list() -> None:
     Raises:
         AssertionError: If the game has no author, image, or description.
     """
-    free_game: Generator[DiscordEmbed | None, Any, None] = get_free_gog_game_from_store()
+    free_game: Generator[FreeGame | None, Any, None] = get_free_gog_game_from_store()
 
     # Make sure we get a generator.
     assert free_game is not None
     assert isinstance(free_game, Generator)
 
     # Loop through the generator.
-    for game in free_game:
-        assert isinstance(game, DiscordEmbed)
+    for gog_game in free_game:
+        assert isinstance(gog_game, FreeGame)
+        game: DiscordEmbed = gog_game.embed
 
         if game.author is None:
             # If the author is None, we can't do any tests.
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from discord_free_game_notifier import http_client
+from discord_free_game_notifier.http_client import ValidatorCache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from requests import Response
+
+URL = "https://thelovinator1.github.io/discord-free-game-notifier/epic.json"
+
+
+def test_validators_are_saved_on_commit(tmp_path: Path, make_response: Callable[..., Response]) -> None:
+    """Test that validators are only used after they have been committed."""
+    cache = ValidatorCache(tmp_path / "http_cache.json")
+    cache.stage(URL, make_response(200, {"ETag": '"abc"', "Last-Modified": "Wed, 29 May 2024 12:00:00 GMT"}))
+    assert cache.headers(URL) == {}
+
+    cache.commit(URL)
+    expected: dict[str, str] = {"If-None-Match": '"abc"', "If-Modified-Since": "Wed, 29 May 2024 12:00:00 GMT"}
+    assert cache.headers(URL) == expected
+    assert ValidatorCache(tmp_path / "http_cache.json").headers(URL) == expected
+
+
+def test_get_if_modified(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]) -> None:
+    """Test that a 304 Not Modified response is returned as None."""
+    monkeypatch.setattr(http_client, "validator_cache", ValidatorCache(tmp_path / "http_cache.json"))
+    sent_headers: list[dict[str, str]] = []
+    responses: list[Response] = [make_response(200, {"ETag": '"abc"'}), make_response(304)]
+
+    def fake_get(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        sent_headers.append(kwargs["headers"])
+        return responses.pop(0)
+
+    monkeypatch.setattr(http_client.session, "get", fake_get)
+
+    assert http_client.get_if_modified(URL) is not None
+    http_client.commit_validators(URL)
+    assert http_client.get_if_modified(URL) is None
+    assert sent_headers == [{}, {"If-None-Match": '"abc"'}]
+
+
+def test_get_if_modified_compares_fingerprints(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]
+) -> None:
+    """Test that a server without validators is skipped when it sends the same body again."""
+    monkeypatch.setattr(http_client, "validator_cache", ValidatorCache(tmp_path / "http_cache.json"))
+    monkeypatch.setattr(http_client.session, "get", lambda url, **kwargs: make_response(200))  # noqa: ARG005
+    token = http_client.current_source.set("Steam")
+
+    assert http_client.get_if_modified(URL) is not None
+    assert http_client.source_changed["Steam"]
+
+    # Nothing is skipped until the response has been handled.
+    assert http_client.get_if_modified(URL) is not None
+    http_client.commit_validators(URL)
+
+    del http_client.source_changed["Steam"]
+    assert http_client.get_if_modified(URL) is None
+    assert not http_client.source_changed["Steam"]
+    http_client.current_source.reset(token)
+
+
+def test_validators_are_not_saved_after_deadline(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]
+) -> None:
+    """Test that a source that ran out of time doesn't save its validators, so its games are found again."""
+    monkeypatch.setattr(http_client, "validator_cache", ValidatorCache(tmp_path / "http_cache.json"))
+    monkeypatch.setattr(http_client.session, "get", lambda url, **kwargs: make_response(200, {"ETag": '"abc"'}))  # noqa: ARG005
+
+    http_client.source_deadline.set(time.monotonic() + 60)
+    assert http_client.get_if_modified(URL) is not None
+
+    http_client.source_deadline.set(time.monotonic())
+    http_client.commit_validators(URL)
+    assert http_client.validator_cache.headers(URL) == {}
+    with pytest.raises(http_client.DeadlineExceededError):
+        http_client.get(URL)
+
+    http_client.source_deadline.set(None)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import TYPE_CHECKING
+
+from discord_webhook import DiscordEmbed
+
+from discord_free_game_notifier import ledger as ledger_module
+from discord_free_game_notifier.ledger import Ledger, OutboxEntry
+from discord_free_game_notifier.models import FreeGame
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+GAMES_IN_FILE = 2
+GAMES_RUNNING = 2
+WEBHOOK_URL = "https://discord.test/webhook"
+OTHER_WEBHOOK_URL = "https://discord.test/other-webhook"
+HTTP_NOT_FOUND = 404
+
+
+def test_import_text_file_once(tmp_path: Path) -> None:
+    """Test that an old text file is only imported the first time."""
+    previous_games: Path = tmp_path / "gog.txt"
+    previous_games.write_text("Half Life 3\nLeft 4 Dead 3\n\n", encoding="utf-8")
+
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    assert ledger.import_text_file("gog", previous_games) == GAMES_IN_FILE
+    assert ledger.import_text_file("gog", previous_games) == 0
+    assert ledger.already_posted("gog", "Left 4 Dead 3")
+    assert not ledger.already_posted("gog", "")
+
+
+def test_history(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the history can be filtered by store and running promotions."""
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    for posted_at, game in [
+        (100, FreeGame("epic", "old", DiscordEmbed(title="old"), promotion_start=100, promotion_end=200)),
+        (300, FreeGame("epic", "new", DiscordEmbed(title="new"), promotion_start=300, promotion_end=400)),
+        (300, FreeGame("steam", "other", DiscordEmbed(title="other"), promotion_start=300, promotion_end=400)),
+    ]:
+        monkeypatch.setattr(ledger_module.time, "time", lambda posted_at=posted_at: posted_at)
+        ledger.add_to_outbox([game], WEBHOOK_URL)
+        ledger.delivered([entry.id for entry in ledger.take_outbox()])
+
+    assert [game.game_id for game in ledger.history(store="epic")] == ["new", "old"]
+    assert [game.game_id for game in ledger.history(store="epic", active_at=350)] == ["new"]
+    assert len(ledger.history(active_at=350)) == GAMES_RUNNING
+
+
+def test_outbox(tmp_path: Path) -> None:
+    """Test that games are only marked as posted after they have been delivered."""
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    games: list[FreeGame] = [
+        FreeGame("epic", "Gloomhaven", DiscordEmbed(title="Gloomhaven"), promotion_start=100, promotion_end=200),
+        FreeGame("epic", "Celeste", DiscordEmbed(title="Celeste")),
+    ]
+    ledger.add_to_outbox(games, WEBHOOK_URL, "Epic")
+    ledger.add_to_outbox(games, WEBHOOK_URL, "Epic")
+    assert ledger.outbox_size() == len(games)
+
+    entries: list[OutboxEntry] = ledger.take_outbox()
+    assert [entry.embed["title"] for entry in entries] == ["Gloomhaven", "Celeste"]
+    assert ledger.take_outbox() == []
+
+    # A failed message is kept, but not sent again right away.
+    ledger.delivery_failed([entries[1].id])
+    assert ledger.take_outbox() == []
+
+    ledger.delivered([entries[0].id], message_id="123")
+    assert ledger.outbox_size() == 1
+    assert [(game.game_id, game.message_id, game.promotion_end) for game in ledger.history()] == [("Gloomhaven", "123", 200)]
+
+    # The failed game is still in the outbox after a restart.
+    reopened = Ledger(tmp_path / "ledger.sqlite3")
+    assert reopened.already_posted("epic", "Celeste")
+    assert reopened.outbox_size() == 1
+
+
+def test_rejected_games_are_not_sent_again(tmp_path: Path) -> None:
+    """Test that a game Discord rejected for a webhook isn't added to its outbox again."""
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    game = FreeGame("epic", "Gloomhaven", DiscordEmbed(title="Gloomhaven"))
+    ledger.add_to_outbox([game], WEBHOOK_URL, "Epic")
+
+    ledger.delivery_rejected([entry.id for entry in ledger.take_outbox()], HTTP_NOT_FOUND)
+    assert ledger.outbox_size() == 0
+    assert not ledger.already_posted("epic", "Gloomhaven")
+
+    ledger.add_to_outbox([game], WEBHOOK_URL, "Epic")
+    ledger.add_to_outbox([game], OTHER_WEBHOOK_URL, "Epic")
+    assert [entry.webhook for entry in ledger.take_outbox()] == [OTHER_WEBHOOK_URL]
+
+
+def test_failed_games_are_given_up_on(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a game that keeps failing is moved to the rejected games, and that the backoff stays at an hour."""
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    ledger.add_to_outbox([FreeGame("epic", "Gloomhaven", DiscordEmbed(title="Gloomhaven"))], WEBHOOK_URL, "Epic")
+
+    now: int = 0
+    for _ in range(ledger_module.OUTBOX_MAX_ATTEMPTS - 1):
+        monkeypatch.setattr(ledger_module.time, "time", lambda now=now: now)
+        entries: list[OutboxEntry] = ledger.take_outbox()
+        assert len(entries) == 1
+        ledger.delivery_failed([entries[0].id])
+        now += ledger_module.OUTBOX_MAX_RETRY_DELAY
+
+    next_attempt_at: int = ledger.connection.execute("SELECT next_attempt_at FROM outbox").fetchone()[0]
+    assert next_attempt_at == now
+
+    monkeypatch.setattr(ledger_module.time, "time", lambda: now)
+    ledger.delivery_failed([entry.id for entry in ledger.take_outbox()])
+    assert ledger.outbox_size() == 0
+    assert not ledger.already_posted("epic", "Gloomhaven")
+    assert ledger.connection.execute("SELECT status_code FROM rejected").fetchall() == [(ledger_module.GAVE_UP_STATUS_CODE,)]
+
+
+def test_outbox_without_sources_is_upgraded(tmp_path: Path) -> None:
+    """Test that a ledger from before the outbox had a source column can still be used."""
+    path: Path = tmp_path / "ledger.sqlite3"
+    connection: sqlite3.Connection = sqlite3.connect(path)
+    connection.executescript(ledger_module.SCHEMA.replace("    source TEXT NOT NULL DEFAULT '',\n", ""))
+    connection.close()
+
+    ledger = Ledger(path)
+    assert ledger.add_to_outbox([FreeGame("epic", "Gloomhaven", DiscordEmbed(title="Gloomhaven"))], WEBHOOK_URL, "Epic", "Epic") == 1
+
+
+def test_posted_games_are_not_added_again(tmp_path: Path) -> None:
+    """Test that a game two sources find is only sent once, even if the first copy was delivered already."""
+    ledger = Ledger(tmp_path / "ledger.sqlite3")
+    store_page = FreeGame("gog", "Gloomhaven", DiscordEmbed(title="Gloomhaven"))
+    front_page = FreeGame("gog", "Gloomhaven", DiscordEmbed(title="Gloomhaven", description="From the front page"))
+
+    assert ledger.add_to_outbox([store_page], WEBHOOK_URL) == 1
+    ledger.delivered([entry.id for entry in ledger.take_outbox()])
+    assert ledger.add_to_outbox([front_page], WEBHOOK_URL) == 0
+    assert ledger.outbox_size() == 0
+
+    # Games from the old text files count as posted to every webhook.
+    previous_games: Path = tmp_path / "gog.txt"
+    previous_games.write_text("Celeste\n", encoding="utf-8")
+    ledger.import_text_file("gog", previous_games)
+    assert ledger.add_to_outbox([FreeGame("gog", "Celeste", DiscordEmbed(title="Celeste"))], OTHER_WEBHOOK_URL) == 0
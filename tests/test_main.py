@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from discord_webhook import DiscordEmbed
+
+from discord_free_game_notifier import main
+from discord_free_game_notifier.breaker import FAILURE_THRESHOLD, CircuitBreakers
+from discord_free_game_notifier.delivery import DeliveryQueue
+from discord_free_game_notifier.main import CycleReport, Source, check_free_games, post_upcoming, schedule_upcoming, send_games
+from discord_free_game_notifier.models import FreeGame
+from discord_free_game_notifier.scheduler import PollSchedule
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from requests import Response
+
+    from discord_free_game_notifier.ledger import Ledger
+
+SOURCE_TIMEOUT = 0.3
+UPCOMING_DELAY = 2
+DAY = 24 * 60 * 60
+
+
+def free_game(title: str) -> FreeGame:
+    """Create a free game with an embed that only has a title.
+
+    Args:
+        title: The game name.
+
+    Returns:
+        FreeGame: The game.
+    """
+    return FreeGame("epic", title, DiscordEmbed(title=title))
+
+
+@pytest.mark.usefixtures("ledger")
+def test_check_free_games_sends_fast_sources_first(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a slow or broken source doesn't hold back the other sources."""
+    monkeypatch.setattr(main, "breakers", CircuitBreakers(tmp_path / "breakers.json"))
+
+    def slow() -> list[FreeGame]:
+        time.sleep(0.2)
+        return [free_game("Slow")]
+
+    def fast() -> list[FreeGame | None]:
+        return [free_game("Fast 1"), None, free_game("Fast 2")]
+
+    def broken() -> list[FreeGame]:
+        msg = "Store is down"
+        raise ValueError(msg)
+
+    sent: list[tuple[list[str], str]] = []
+    monkeypatch.setattr(main, "send_games", lambda games, game_service, *_: sent.append(([game.game_id for game in games], game_service)))
+    monkeypatch.setattr(main, "sources", [Source("Slow", "GOG", slow), Source("Broken", "Steam", broken), Source("Fast", "Epic", fast)])
+
+    check_free_games()
+
+    assert sent == [(["Fast 1", "Fast 2"], "Epic"), (["Slow"], "GOG")]
+
+
+def test_games_are_posted_after_delivery(monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response], ledger: Ledger) -> None:
+    """Test that a game that Discord didn't accept stays in the outbox."""
+    status_codes: list[int] = [200, 500]
+
+    def send(url: str, json: dict[str, Any], **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        return make_response(status_codes.pop(0) if "embeds" in json else 200, content=b'{"id": "42"}')
+
+    queue = DeliveryQueue(send=send, on_failure=main.report_failure, on_success=main.mark_delivered)
+    monkeypatch.setattr(main, "delivery_queue", queue)
+
+    send_games([free_game("Delivered")], "Epic")
+    assert queue.join(timeout=5)
+    send_games([free_game("Failed")], "Epic")
+    assert queue.join(timeout=5)
+
+    assert [(game.game_id, game.message_id) for game in ledger.history()] == [("Delivered", "42")]
+    assert ledger.outbox_size() == 1
+    assert ledger.already_posted("epic", "Failed")
+
+
+def test_games_are_released_when_queueing_fails(monkeypatch: pytest.MonkeyPatch, ledger: Ledger) -> None:
+    """Test that games taken from the outbox are taken again next time if they never reached the delivery queue."""
+    ledger.add_to_outbox([free_game("Gloomhaven")], "https://discord.test/webhook", "Epic")
+
+    def broken_put(*args: Any, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+        msg: str = f"Broken queue for {args[0]}"
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(main.delivery_queue, "put", broken_put)
+    with pytest.raises(RuntimeError):
+        main.drain_outbox()
+    assert [entry.game_id for entry in ledger.take_outbox()] == ["Gloomhaven"]
+
+
+def test_upcoming_games_are_sent_when_they_start(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_response: Callable[..., Response],
+    restart_ledger: Callable[[], Ledger],
+) -> None:
+    """Test that a game that hasn't started waits in the outbox, also after a restart, and is sent when it starts."""
+    monkeypatch.setattr(main, "breakers", CircuitBreakers(tmp_path / "breakers.json"))
+    sent: list[str] = []
+
+    def send(url: str, json: dict[str, Any], **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        sent.extend(embed["title"] for embed in json.get("embeds", []))
+        return make_response(content=b'{"id": "42"}')
+
+    queue = DeliveryQueue(send=send, on_failure=main.report_failure, on_success=main.mark_delivered)
+    monkeypatch.setattr(main, "delivery_queue", queue)
+
+    promotion_start: int = int(time.time()) + UPCOMING_DELAY
+    upcoming = FreeGame("epic", "Soon", DiscordEmbed(title="Soon"), promotion_start=promotion_start)
+    monkeypatch.setattr(main, "sources", [Source("Epic", "Epic", lambda: [upcoming, free_game("Now")])])
+    check_free_games()
+    assert queue.join(timeout=5)
+    assert sent == ["Now"]
+    assert main.sched.get_job(f"upcoming-{promotion_start}") is not None
+
+    # After a restart the store answers 304 Not Modified, so the source finds nothing.
+    main.sched.remove_all_jobs()
+    ledger: Ledger = restart_ledger()
+    monkeypatch.setattr(main, "sources", [Source("Epic", "Epic", list)])
+    check_free_games()
+    schedule_upcoming(ledger.upcoming_starts())
+    assert main.sched.get_job(f"upcoming-{promotion_start}") is not None
+
+    time.sleep(max(0.0, promotion_start - time.time()))
+    post_upcoming()
+    assert queue.join(timeout=5)
+    assert sent == ["Now", "Soon"]
+    assert ledger.outbox_size() == 0
+
+
+def test_withdrawn_upcoming_games_are_not_sent(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_response: Callable[..., Response],
+    ledger: Ledger,
+) -> None:
+    """Test that an upcoming game the store no longer has when the promotion starts is dropped, and a moved one waits again."""
+    monkeypatch.setattr(main, "breakers", CircuitBreakers(tmp_path / "breakers.json"))
+    monkeypatch.setattr(main, "get_webhook_urls", lambda _: ["https://discord.test/webhook"])
+    sent: list[str] = []
+
+    def send(url: str, json: dict[str, Any], **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        sent.extend(embed["title"] for embed in json.get("embeds", []))
+        return make_response(content=b'{"id": "42"}')
+
+    queue = DeliveryQueue(send=send, on_failure=main.report_failure, on_success=main.mark_delivered)
+    monkeypatch.setattr(main, "delivery_queue", queue)
+
+    promotion_start: int = int(time.time()) + UPCOMING_DELAY
+    withdrawn = FreeGame("epic", "Withdrawn", DiscordEmbed(title="Withdrawn"), promotion_start=promotion_start)
+    moved = FreeGame("epic", "Moved", DiscordEmbed(title="Moved"), promotion_start=promotion_start)
+    found: list[list[FreeGame]] = [[withdrawn, moved], [replace(moved, promotion_start=promotion_start + DAY)]]
+    monkeypatch.setattr(main, "sources", [Source("Epic", "Epic", lambda: found.pop(0), complete=True)])
+    check_free_games()
+    assert ledger.outbox_size() == len([withdrawn, moved])
+
+    time.sleep(max(0.0, promotion_start - time.time()))
+    post_upcoming()
+    assert queue.join(timeout=5)
+    assert sent == []
+    assert [entry.game_id for entry in ledger.take_outbox()] == []
+    assert ledger.upcoming_starts() == [promotion_start + DAY]
+    assert not ledger.already_posted("epic", "Withdrawn")
+
+
+@pytest.mark.usefixtures("ledger")
+def test_slow_sources_are_abandoned(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a source that runs past its deadline is reported and its games are thrown away."""
+    monkeypatch.setattr(main, "breakers", CircuitBreakers(tmp_path / "breakers.json"))
+    monkeypatch.setattr(main.settings, "source_timeout", SOURCE_TIMEOUT)
+    monkeypatch.setattr(main, "running", {})
+    calls: list[str] = []
+
+    def stuck() -> list[FreeGame]:
+        calls.append("Stuck")
+        time.sleep(SOURCE_TIMEOUT * 5)
+        return [free_game("Too late")]
+
+    sent: list[str] = []
+    monkeypatch.setattr(main, "send_games", lambda games, game_service, *_: sent.extend(game.game_id for game in games))  # noqa: ARG005
+    monkeypatch.setattr(main, "sources", [Source("Stuck", "GOG", stuck), Source("Fast", "Epic", lambda: [free_game("Fast")])])
+
+    start: float = time.monotonic()
+    report: CycleReport = check_free_games()
+
+    assert time.monotonic() - start < SOURCE_TIMEOUT * 5
+    assert report.timed_out == ["Stuck"]
+    assert report.games == {"Fast": 1}
+    assert sent == ["Fast"]
+    assert main.breakers.state("Stuck").failures == 1
+
+    # The stuck check still has its worker, so it isn't started a second time.
+    assert check_free_games().still_running == ["Stuck"]
+    assert calls == ["Stuck"]
+
+
+@pytest.mark.usefixtures("ledger")
+def test_open_circuits_are_not_checked_until_they_close(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a source with an open circuit isn't due again before its cool-down is over."""
+    monkeypatch.setattr(main, "breakers", CircuitBreakers(tmp_path / "breakers.json"))
+    monkeypatch.setattr(main, "poll_schedule", PollSchedule())
+    for _ in range(FAILURE_THRESHOLD):
+        main.breakers.record_failure("Down", 0.1)
+
+    down = Source("Down", "GOG", lambda: [free_game("Down")])
+    report: CycleReport = check_free_games([down])
+
+    assert report.skipped == ["Down"]
+    assert main.poll_schedule.schedule(down).next_run == main.breakers.state("Down").retry_at()
+    assert not main.poll_schedule.due([down])
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime
+
+import pytz
+
+from discord_free_game_notifier.models import Source
+from discord_free_game_notifier.scheduler import (
+    BACKOFF_FACTOR,
+    HOT_INTERVAL,
+    HOT_WINDOW_BEFORE,
+    JITTER,
+    PollSchedule,
+    epic_rotations,
+)
+
+INTERVAL = 600
+MAX_INTERVAL = 1200
+
+# Thursday 2023-06-01 11:00 in New York.
+ROTATION: float = pytz.timezone("America/New_York").localize(datetime(2023, 6, 1, 11)).timestamp()  # noqa: DTZ001
+WEEK = 7 * 24 * 60 * 60
+
+
+def no_games() -> list[None]:
+    """Return no games.
+
+    Returns:
+        list[None]: Nothing.
+    """
+    return []
+
+
+def test_epic_rotations() -> None:
+    """Test that the Epic rotations are on Thursdays at 11:00 in New York."""
+    assert epic_rotations(ROTATION - 3 * 24 * 60 * 60) == [ROTATION - WEEK, ROTATION, ROTATION + WEEK]
+    assert ROTATION + WEEK in epic_rotations(ROTATION + 60)
+
+
+def test_backs_off_when_unchanged() -> None:
+    """Test that the interval grows while a source doesn't change, and is reset when it does."""
+    source = Source("Test", "Test", no_games, interval=INTERVAL, max_interval=MAX_INTERVAL)
+    schedule = PollSchedule(rng=random.Random(0))  # noqa: S311
+    now = 1_000_000.0
+
+    assert schedule.due([source], now) == [source]
+    intervals: list[float] = [schedule.record(source, changed=False, now=now) - now for _ in range(3)]
+    assert INTERVAL * BACKOFF_FACTOR <= intervals[0] <= INTERVAL * BACKOFF_FACTOR * (1 + JITTER)
+    assert MAX_INTERVAL <= intervals[2] <= MAX_INTERVAL * (1 + JITTER)
+    assert schedule.due([source], now) == []
+
+    assert schedule.record(source, changed=True, now=now) - now <= INTERVAL * (1 + JITTER)
+
+
+def test_checks_often_around_rotations() -> None:
+    """Test that we don't sleep through a rotation, and check every minute until it has happened."""
+    source = Source("Epic", "Epic", no_games, interval=INTERVAL, max_interval=MAX_INTERVAL, rotations=epic_rotations)
+    schedule = PollSchedule(rng=random.Random(0))  # noqa: S311
+
+    assert schedule.record(source, changed=False, now=ROTATION - 300) == ROTATION - HOT_WINDOW_BEFORE
+    assert schedule.record(source, changed=False, now=ROTATION) - ROTATION <= HOT_INTERVAL * (1 + JITTER)
+
+    # When the new games have been found we go back to the normal interval.
+    assert schedule.record(source, changed=True, now=ROTATION + 120) - ROTATION - 120 >= INTERVAL
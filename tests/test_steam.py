@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+from requests import HTTPError
+
+from discord_free_game_notifier import steam
+from discord_free_game_notifier.steam import get_free_steam_games, get_free_steam_games_from_page, search_url
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from discord_free_game_notifier.ledger import Ledger
+    from discord_free_game_notifier.models import FreeGame
+
+PAGE_SIZE = 2
+HTTP_SERVICE_UNAVAILABLE = 503
+
+
+def test_get_free_steam_games(
+    monkeypatch: pytest.MonkeyPatch,
+    serve: Callable[..., list[str]],
+    post_games: Callable[..., None],
+    ledger: Ledger,
+) -> None:
+    """Test that the search results are read page by page until a page isn't full."""
+    post_games(ledger, "steam", "Dead Island 2")
+    monkeypatch.setattr(steam, "STEAM_SEARCH_PAGE_SIZE", PAGE_SIZE)
+
+    pages: dict[str, bytes] = {
+        search_url(0): Path("tests/steam-search-page-1.json").read_bytes(),
+        search_url(PAGE_SIZE): Path("tests/steam-search-page-2.json").read_bytes(),
+    }
+    requested: list[str] = serve(pages)
+
+    games: list[FreeGame] = list(get_free_steam_games())
+    assert [game.game_id for game in games] == ["Hogwarts Legacy + Deluxe Edition Upgrade", "Portal 2"]
+    assert games[0].embed.author["url"] == "https://store.steampowered.com/bundle/30358/"
+    assert games[1].embed.author["url"] == "https://store.steampowered.com/app/620/"
+    assert games[1].embed.image["url"] == "https://cdn.cloudflare.steamstatic.com/steam/apps/620/header.jpg"
+    assert requested == list(pages)
+
+    # The first page hasn't changed, so we stop there.
+    assert list(get_free_steam_games()) == []
+    assert len(requested) == len(pages) + 1
+
+
+@pytest.mark.usefixtures("ledger")
+def test_get_free_steam_games_from_page(serve: Callable[..., list[str]]) -> None:
+    """Test that the games are read from the HTML search page."""
+    serve(Path("tests/steam-search-page.html").read_bytes())
+
+    games: list[FreeGame] = list(get_free_steam_games_from_page())
+    assert [game.game_id for game in games] == ["Dead Island 2", "Portal 2"]
+    assert games[1].embed.author["url"].startswith("https://store.steampowered.com/app/620/")
+    assert games[1].embed.image["url"] == "https://cdn.cloudflare.steamstatic.com/steam/apps/620/header.jpg"
+
+
+def test_get_free_steam_games_from_page_raises_when_steam_is_down(serve: Callable[..., list[str]]) -> None:
+    """Test that an error page isn't read as a page without free games, so the circuit breaker sees the failure."""
+    serve(b"<html>Service Unavailable</html>", HTTP_SERVICE_UNAVAILABLE)
+
+    with pytest.raises(HTTPError):
+        list(get_free_steam_games_from_page())
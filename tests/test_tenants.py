@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import configparser
+from pathlib import Path
+
+import pytest
+from discord_webhook import DiscordEmbed
+
+from discord_free_game_notifier import main
+from discord_free_game_notifier.feeds import STEAM_FEED, feed_game, parse_feed
+from discord_free_game_notifier.models import FreeGame
+from discord_free_game_notifier.tenants import Tenant, TenantRouter, load_tenants, offer_type_filter
+
+COZY_WEBHOOK = "https://discord.com/api/webhooks/1/cozy"
+DEALS_WEBHOOK = "https://discord.com/api/webhooks/2/deals"
+STORE_WEBHOOK = "https://discord.com/api/webhooks/3/store"
+
+WEBHOOKS_CONF = f"""
+[epic]
+webhooks = {STORE_WEBHOOK}
+
+[tenant cozy]
+webhooks = {COZY_WEBHOOK}
+stores = epic, gog
+offer_types = game
+min_original_price = 1000
+regions = de, br
+seller_blocklist =
+    Shady Games Ltd
+keywords =
+    puzzle
+    cozy farm
+
+[tenant deals]
+webhooks =
+    {DEALS_WEBHOOK}
+    {COZY_WEBHOOK}
+
+[tenant broken]
+webhooks = {DEALS_WEBHOOK}
+min_original_price = ten dollars
+
+[tenant nobody]
+stores = steam
+"""
+
+
+def game(  # noqa: PLR0913
+    name: str = "A Puzzle Game",
+    *,
+    store: str = "epic",
+    description: str = "",
+    offer_type: str = "game",
+    original_price: int | None = 1999,
+    seller: str = "Good Games",
+    regions: tuple[str, ...] = (),
+) -> FreeGame:
+    """Create a free game with the fields the filters look at.
+
+    Args:
+        name: The game name.
+        store: The store.
+        description: The description in the embed.
+        offer_type: The offer type.
+        original_price: The normal price in cents.
+        seller: The seller.
+        regions: The countries the game is free in.
+
+    Returns:
+        FreeGame: The game.
+    """
+    embed = DiscordEmbed(description=description)
+    embed.set_author(name=name)
+    return FreeGame(store, name, embed, offer_type=offer_type, original_price=original_price, seller=seller, regions=regions)
+
+
+def load() -> list[Tenant]:
+    """Load the tenants in WEBHOOKS_CONF.
+
+    Returns:
+        list[Tenant]: The tenants.
+    """
+    config = configparser.ConfigParser()
+    config.read_string(WEBHOOKS_CONF)
+    return load_tenants(config)
+
+
+def cozy_router() -> TenantRouter:
+    """Create a router with only the cozy tenant, which has every filter.
+
+    Returns:
+        TenantRouter: The router.
+    """
+    return TenantRouter(tenant for tenant in load() if tenant.name == "cozy")
+
+
+def test_load_tenants() -> None:
+    """Test that the store sections and the broken tenants are skipped."""
+    loaded: list[Tenant] = load()
+
+    assert [tenant.name for tenant in loaded] == ["cozy", "deals"]
+    assert loaded[0].stores == frozenset({"epic", "gog"})
+    assert loaded[1].webhooks == (DEALS_WEBHOOK, COZY_WEBHOOK)
+    assert not loaded[1].predicates
+
+
+def test_filters() -> None:
+    """Test that a game has to pass every filter of a tenant."""
+    cozy: TenantRouter = cozy_router()
+
+    assert cozy.webhooks(game()) == [COZY_WEBHOOK]
+    assert cozy.webhooks(game(name="Shooter", description="A Cozy Farm with guns")) == [COZY_WEBHOOK]
+    assert not cozy.webhooks(game(store="steam"))
+    assert not cozy.webhooks(game(offer_type="dlc"))
+    assert not cozy.webhooks(game(original_price=999))
+    assert not cozy.webhooks(game(seller="SHADY GAMES LTD"))
+    assert not cozy.webhooks(game(regions=("US",)))
+    assert cozy.webhooks(game(regions=("US", "BR"))) == [COZY_WEBHOOK]
+    assert not cozy.webhooks(game(name="Shooter"))
+
+
+def test_unknown_data_passes() -> None:
+    """Test that a filter doesn't remove games the store didn't tell us enough about."""
+    assert cozy_router().webhooks(game(offer_type="", original_price=None, seller="")) == [COZY_WEBHOOK]
+
+
+def test_curated_packs_are_not_sent_to_game_tenants() -> None:
+    """Test that the Wargaming packs from steam_json.py, now in the archive, don't reach a tenant that only wants games."""
+    packs: list[FreeGame] = [
+        feed_game(STEAM_FEED, entry) for entry in parse_feed(STEAM_FEED, Path("pages/archive/steam.json").read_bytes())
+    ]
+    games_only = TenantRouter([Tenant("games", (COZY_WEBHOOK,), predicates=(offer_type_filter(frozenset({"game"})),))])
+
+    assert any(pack.seller == "Wargaming Group Limited" for pack in packs)
+    assert not [pack.game_id for pack in packs if games_only.webhooks(pack)]
+
+
+def test_webhooks_are_not_repeated() -> None:
+    """Test that a webhook in two tenants that want a game gets it once."""
+    assert TenantRouter(load()).webhooks(game()) == [COZY_WEBHOOK, DEALS_WEBHOOK]
+
+
+def test_only_tenants_for_the_store_are_checked() -> None:
+    """Test that a game is only checked against the tenants that want its store."""
+    checked: list[str] = []
+
+    def check(name: str) -> Tenant:
+        return Tenant(name, (f"https://discord.com/api/webhooks/{name}",), frozenset({name}), (lambda _: checked.append(name) or True,))
+
+    store_router = TenantRouter([check("epic"), check("gog"), check("steam")])
+
+    assert store_router.webhooks(game(store="gog")) == ["https://discord.com/api/webhooks/gog"]
+    assert checked == ["gog"]
+
+
+@pytest.mark.usefixtures("ledger")
+def test_send_games_routes_to_tenants(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the store webhooks get every game and the tenants only the ones they want."""
+    added: dict[str, list[str]] = {}
+    monkeypatch.setattr(main, "router", cozy_router())
+    monkeypatch.setattr(main, "get_webhook_urls", lambda _: [STORE_WEBHOOK])
+    monkeypatch.setattr(main, "drain_outbox", lambda: 0)
+    monkeypatch.setattr(
+        main.get_ledger(),
+        "add_to_outbox",
+        lambda games, webhook_url, *_: added.setdefault(webhook_url, []).extend(game.game_id for game in games),
+    )
+
+    main.send_games([game(), game(name="Shooter")], "Epic")
+
+    assert added == {STORE_WEBHOOK: ["A Puzzle Game", "Shooter"], COZY_WEBHOOK: ["A Puzzle Game"]}
@@ -1,6 +1,19 @@
+from __future__ import annotations
+
+import shutil
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from discord_free_game_notifier.feeds import UBISOFT_FEED, get_feed_games, parse_feed
+from discord_free_game_notifier.ubisoft import create_json_file
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
-from discord_free_game_notifier.ubisoft import create_json_file, get_json
+    from discord_free_game_notifier.feeds import FeedEntry
+    from discord_free_game_notifier.models import FreeGame
 
 
 def test_create_json_file() -> None:
@@ -16,16 +29,15 @@ def test_create_json_file() -> None:
     assert Path("pages/ubisoft.json").exists()
 
 
-def test_get_json() -> None:
-    """Test that the get_json function returns a dict."""
-    json = get_json()
-    assert isinstance(json, dict)
-    assert json["free_games"]
+@pytest.mark.usefixtures("ledger")
+def test_ubisoft_feed(tmp_path: Path, serve: Callable[..., list[str]]) -> None:
+    """Test that every game in a Ubisoft feed can be read, and only the one that is still free is sent."""
+    feed: Path = tmp_path / "ubisoft.json"
+    shutil.copy("tests/ubisoft-feed.json", feed)
+    entries: list[FeedEntry] = parse_feed(UBISOFT_FEED, feed.read_bytes())
+    assert [entry.game_id for entry in entries] == ["ac_syndicate", "ac_syndicate_2099"]
 
-    assert json["free_games"][0]["id"]
-    assert json["free_games"][0]["game_name"]
-    assert json["free_games"][0]["game_url"]
-    assert json["free_games"][0]["start_date"]
-    assert json["free_games"][0]["end_date"]
-    assert json["free_games"][0]["description"]
-    assert json["free_games"][0]["image_link"]
+    serve(feed.read_bytes())
+    games: list[FreeGame] = list(get_feed_games(UBISOFT_FEED))
+    assert [game.game_id for game in games] == ["ac_syndicate_2099"]
+    assert games[0].offer_type == "game"
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from discord_webhook import DiscordEmbed
+
+from discord_free_game_notifier.models import FreeGame
+from discord_free_game_notifier.utils import already_posted
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from discord_free_game_notifier.ledger import Ledger
+
+
+def test_already_posted_is_exact(post_games: Callable[..., None], ledger: Ledger) -> None:
+    """Test that a game name that is part of a posted game name is not seen as posted."""
+    post_games(ledger, "steam", "Portal 2")
+
+    assert already_posted("steam", "Portal 2")
+    assert not already_posted("steam", "Portal")
+    assert not already_posted("epic", "Portal 2")
+
+
+def test_already_posted_in_outbox(ledger: Ledger, restart_ledger: Callable[[], Ledger]) -> None:
+    """Test that a game waiting in the outbox is not found again, also after a restart."""
+    ledger.add_to_outbox([FreeGame("epic", "Gloomhaven", DiscordEmbed(title="Gloomhaven"))], "https://discord.test/webhook")
+    assert already_posted("epic", "Gloomhaven")
+
+    restart_ledger()
+    assert already_posted("epic", "Gloomhaven")
@@ -1,12 +1,25 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+import pytest
 from discord_webhook import DiscordEmbed
 
-from discord_free_game_notifier.webhook import send_embed_webhook, send_webhook
+from discord_free_game_notifier import http_client, settings, webhook
+from discord_free_game_notifier.webhook import (
+    MAX_DESCRIPTION_CHARACTERS,
+    batch_embeds,
+    execute_webhook,
+    get_webhook_urls,
+    limit_embed,
+    send_embed_webhook,
+    send_webhook,
+    truncate,
+)
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from requests import Response
 
 STATUS_OK = 200
@@ -29,3 +42,56 @@ def test_send_embed_webhook() -> None:
     result: Response = send_embed_webhook(embed)
     assert result.status_code == STATUS_OK
     assert result.ok
+
+
+def test_execute_webhook_waits_for_rate_limit(monkeypatch: pytest.MonkeyPatch, make_response: Callable[..., Response]) -> None:
+    """Send the message again after the time Discord tells us to wait."""
+    responses: list[Response] = [make_response(429, content=b'{"retry_after": 0.5}'), make_response(200, content=b'{"id": "1"}')]
+
+    posted: list[dict] = []
+    sleeps: list[float] = []
+
+    def fake_post(url: str, **kwargs: Any) -> Response:  # noqa: ANN401, ARG001
+        posted.append(kwargs["json"])
+        return responses.pop(0)
+
+    monkeypatch.setattr(http_client, "post", fake_post)
+    monkeypatch.setattr(webhook.time, "sleep", sleeps.append)
+
+    result: Response = execute_webhook("https://discord.com/api/webhooks/1/abc", {"content": "Hello"})
+    assert result.status_code == STATUS_OK
+    assert posted == [{"content": "Hello"}, {"content": "Hello"}]
+    assert sleeps == [pytest.approx(0.65)]
+
+
+def test_batch_embeds() -> None:
+    """Pack up to 10 embeds and 6000 characters in each message."""
+    small: list[DiscordEmbed] = [DiscordEmbed(title=f"Game {i}", description="Free") for i in range(12)]
+    assert [len(batch) for batch in batch_embeds(small)] == [10, 2]
+
+    large: list[DiscordEmbed] = [DiscordEmbed(description="a" * 4000) for _ in range(3)]
+    assert [len(batch) for batch in batch_embeds(large)] == [1, 1, 1]
+
+
+def test_truncate() -> None:
+    """Shorten long text without cutting words or links in half."""
+    assert truncate("Short", 10) == "Short"
+    assert truncate("Claim the free game today", 20) == "Claim the free game…"
+
+    description = "Free stuff:\n- [Fall Guys - Soda Crown](https://store.epicgames.com/en-US/p/fall-guys--soda-crown)"
+    assert truncate(description, 60) == "Free stuff:\n-…"
+    assert truncate("[Early Access] A roguelike deckbuilder", 30) == "[Early Access] A roguelike…"
+
+    embed: DiscordEmbed = limit_embed(DiscordEmbed(description="word " * 1000))
+    assert embed.description
+    assert len(embed.description) <= MAX_DESCRIPTION_CHARACTERS
+
+
+def test_get_webhook_urls(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a store gets its own webhook and the ones from the webhooks file, once each."""
+    monkeypatch.setattr(settings, "webhook_url", "https://discord.test/default")
+    monkeypatch.setattr(settings, "ubisoft_webhook", "https://discord.test/ubisoft")
+    monkeypatch.setattr(settings, "subscriptions", {"ubisoft": ["https://discord.test/other", "https://discord.test/ubisoft"]})
+
+    assert get_webhook_urls("Ubisoft") == ["https://discord.test/ubisoft", "https://discord.test/other"]
+    assert get_webhook_urls("GOG") == ["https://discord.test/default"]